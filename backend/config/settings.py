@@ -84,6 +84,98 @@ class Settings:
         value = self.raw.get("parameters", {})
         return value if isinstance(value, dict) else {}
 
+    @property
+    def http_pool(self) -> Dict[str, Any]:
+        value = self.raw.get("http_pool", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def async_engine(self) -> Dict[str, Any]:
+        value = self.raw.get("async_engine", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def async_engine_enabled(self) -> bool:
+        value = self.async_engine.get("enabled", False)
+        if isinstance(value, str):
+            return value.strip().lower() in {"true", "1", "yes", "y"}
+        return bool(value)
+
+    @property
+    def poller(self) -> Dict[str, Any]:
+        value = self.raw.get("poller", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def rate_limit(self) -> Dict[str, Any]:
+        value = self.raw.get("rate_limit", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def retry(self) -> Dict[str, Any]:
+        value = self.raw.get("retry", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def circuit_breaker(self) -> Dict[str, Any]:
+        value = self.raw.get("circuit_breaker", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def timeouts(self) -> Dict[str, Any]:
+        value = self.raw.get("timeouts", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def refine_cache(self) -> Dict[str, Any]:
+        value = self.raw.get("refine_cache", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def deadlines(self) -> Dict[str, Any]:
+        value = self.raw.get("deadlines", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def translate_batch(self) -> Dict[str, Any]:
+        value = self.raw.get("translate_batch", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def prompt_variation(self) -> Dict[str, Any]:
+        value = self.raw.get("prompt_variation", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def qwen_batch(self) -> Dict[str, Any]:
+        value = self.raw.get("qwen_batch", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def cache_warmup(self) -> Dict[str, Any]:
+        value = self.raw.get("cache_warmup", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def dispatcher(self) -> Dict[str, Any]:
+        value = self.raw.get("dispatcher", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def job_store(self) -> Dict[str, Any]:
+        value = self.raw.get("job_store", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def task_status(self) -> Dict[str, Any]:
+        value = self.raw.get("task_status", {})
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def zh_enrichment(self) -> Dict[str, Any]:
+        value = self.raw.get("zh_enrichment", {})
+        return value if isinstance(value, dict) else {}
+
     @property
     def enable_prompt_update_request(self) -> bool:
         params = self.parameters
@@ -92,6 +184,21 @@ class Settings:
             return value.strip().lower() in {"true", "1", "yes", "y"}
         return bool(value)
 
+    @property
+    def wan_batch_size(self) -> int:
+        """Images requested per wan call (parameters.n) when prompt inheritance is off; 1 disables batching."""
+        try:
+            n = int(self.parameters.get("wan_batch_size", 1))
+        except (TypeError, ValueError):
+            n = 1
+        return max(1, min(n, 4))
+
+    @property
+    def refine_mode(self) -> str:
+        """"bilingual": one Qwen call returns en + zh prompts; "separate": zh via two extra translate calls."""
+        value = str(self.parameters.get("refine_mode", "separate") or "").strip().lower()
+        return value if value in {"bilingual", "separate"} else "separate"
+
     @property
     def prompt_delta_ratio(self) -> float:
         params = self.parameters
@@ -4,7 +4,9 @@ from backend.services.runtime_config_service import get_runtime_config
 from backend.services.category_service import create_category, list_categories
 from backend.services.prompt_service import upsert_prompt, list_prompts
 from backend.config.settings import load_settings, reload_settings, CONFIG_LOCAL_PATH
-from backend.services.model_service import list_models, get_model_id_by_model_name, update_model, update_limit_by_model_name
+from backend.services.model_service import list_models, get_model_id_by_model_name, update_model, update_limit_by_model_name, get_model_limits
+from backend.services.model_admission_service import reload_model_limits
+from backend.services.cache_warmup_service import start_warmup
 from typing import Dict, Any
 import os
 import json
@@ -26,16 +28,7 @@ def put_global(payload: dict):
 
 @router.get("/api/config/limits")
 def get_limits():
-    limits: Dict[str, int] = {}
-    try:
-        for m in list_models():
-            if m.get("model_name"):
-                limits[m["model_name"]] = int(m.get("max_limit") or 0)
-    except Exception:
-        pass
-    if not limits:
-        limits = {"wan2.6-t2i": 2, "z-image-turbo": 4}
-    return {"model_limits": limits}
+    return {"model_limits": get_model_limits()}
 
 @router.post("/api/config/update")
 def update_all(payload: dict):
@@ -67,6 +60,8 @@ def update_all(payload: dict):
                     update_limit_by_model_name(str(model_name), int(v))
                 except Exception:
                     pass
+            reload_model_limits()
+        start_warmup("config update")
         # return merged view
         return {
             "status": "ok",
@@ -81,6 +76,7 @@ def update_all(payload: dict):
 @router.post("/api/config/reload")
 def force_reload():
     reload_settings()
+    start_warmup("config reload")
     return {"status": "ok", "runtime": get_runtime_config()}
 
 @router.get("/api/config/flags")
@@ -11,6 +11,9 @@ import random
 from backend.models.generate_request_model import GenerateRequest
 from backend.services import DashScopeClient
 from backend.services.background_task_service import submit_job_request
+from backend.services.job_store_service import register_kind
+from backend.services.deadline_service import JobDeadline
+from backend.services.dashscope_async_client_service import async_engine_enabled, get_async_engine
 from backend.config import load_settings
 from backend.utils.validators import is_valid_uuid
 import uuid
@@ -61,24 +64,11 @@ def _task_generator(context: dict):
     tasks = []
     inherit_enabled = bool(settings.enable_prompt_update_request)
     delta_ratio = float(getattr(settings, "prompt_delta_ratio", 0.1))
-    prev_positive = final_positive_prompt
-    for idx in range(req_count):
-        if inherit_enabled and idx >= 1:
-            # Variant: ~10% adjustments based on previous positive prompt
-            refined2 = client.refine_prompt_with_delta(
-                base_positive=prev_positive,
-                category=req_category,
-                default_style=default_style,
-                default_negative_prompt=current_negative,
-                role=role,
-                change_ratio=delta_ratio
-            )
-            final_positive_prompt = refined2["positive_prompt"]
-            final_negative_prompt = refined2["negative_prompt"]
-            final_positive_prompt_zh = refined2.get("positive_prompt_zh")
-            final_negative_prompt_zh = refined2.get("negative_prompt_zh")
-            prev_positive = final_positive_prompt
-        seed = random.randint(0, 4294967295)
+    # 不继承提示词时 wan 的多张图片合并为一次请求（parameters.n），结果由执行器按张拆分
+    batch_size = settings.wan_batch_size if (not inherit_enabled and context.get("service") == "wan") else 1
+    for idx in range(0, req_count, batch_size):
+        n = min(batch_size, req_count - idx)
+        seed = random.randint(0, 4294967295 - (n - 1))
         temperature = random.uniform(temp_min, temp_max)
         top_p = random.uniform(top_p_min, top_p_max)
         
@@ -101,15 +91,23 @@ def _task_generator(context: dict):
             "refined_negative_zh": final_negative_prompt_zh,
         }
         if inherit_enabled and idx >= 1:
+            # the ~10% variant of the previous prompt is computed once by the chain executor,
+            # overlapping with the previous images' generation
             task_params["inherited_prompt"] = True
             task_params["delta_ratio"] = delta_ratio
+            task_params["chain_pending"] = True
+        if n > 1:
+            task_params["n"] = n
         tasks.append(task_params)
     return tasks
 
 def _process_single_image(params):
     """
     Worker function to process a single image generation request.
+    With async_engine.enabled the call is driven by the shared event loop instead.
     """
+    if async_engine_enabled():
+        return get_async_engine().run(_process_single_image_async(params))
     service = params.get("service")
     resolution = params.get("resolution", "1K")
     prompt = params.get("prompt")
@@ -136,6 +134,43 @@ def _process_single_image(params):
             seed=params.get("seed"),
             temperature=params.get("temperature"),
             top_p=params.get("top_p"),
+            n=params.get("n", 1),
+        )
+    return client.to_data_url_if_local(result)
+
+
+async def _process_single_image_async(params):
+    """
+    Coroutine variant of _process_single_image, executed on the async generation engine.
+    """
+    aclient = get_async_engine().client
+    service = params.get("service")
+    resolution = params.get("resolution", "1K")
+    prompt = params.get("prompt")
+
+    if service == "z_image":
+        result = await aclient.call_z_image(
+            prompt=prompt,
+            category=params.get("category", "default"),
+            size=params.get("size", "1024*1024"),
+            prompt_extend=params.get("prompt_extend", False),
+            resolution=resolution,
+            seed=params.get("seed"),
+            temperature=params.get("temperature"),
+            top_p=params.get("top_p"),
+        )
+    else:
+        result = await aclient.call_wan(
+            prompt=prompt,
+            model=params.get("model"),
+            category=params.get("category", "default"),
+            size=params.get("size", "1024*1024"),
+            negative_prompt=params.get("negative_prompt", ""),
+            resolution=resolution,
+            seed=params.get("seed"),
+            temperature=params.get("temperature"),
+            top_p=params.get("top_p"),
+            n=params.get("n", 1),
         )
     return client.to_data_url_if_local(result)
 
@@ -175,8 +210,11 @@ def generate(req: GenerateRequest, request: Request):
         "model_name": req.model or "",
     })
     
+    # The deadline starts now: queueing, refinement and generation all count against it
+    deadline = JobDeadline.from_config(load_settings().deadlines, req.deadline_seconds)
+
     # Submit Job Request (Non-blocking)
-    submit_job_request(job_id, job_context, _task_generator, _process_single_image)
+    submit_job_request(job_id, job_context, _task_generator, _process_single_image, async_process_func=_process_single_image_async, deadline=deadline, kind="generate")
     
     return {
         "status": "submitted",
@@ -184,3 +222,8 @@ def generate(req: GenerateRequest, request: Request):
         "task_count": req.count,
         "message": "Job submitted to background queue."
     }
+
+
+# Persisted "generate" jobs are run with these again after a restart (job_store_service)
+register_kind("generate", _task_generator, _process_single_image, _process_single_image_async)
+
@@ -35,12 +35,50 @@ def health():
     # Determine overall status
     is_healthy = all(api_keys_status.values()) and all(fs_status.values())
 
+    from backend.services.http_session_service import get_http_pool
+    from backend.services.dashscope_async_client_service import async_engine_enabled, get_async_engine
+    from backend.services.task_poller_service import get_task_poller
+    from backend.services.model_admission_service import get_model_admission
+    from backend.services.background_task_service import dispatcher_stats, status_store_stats
+    from backend.services.job_store_service import get_job_store, store_enabled
+    from backend.services.rate_limit_service import get_rate_limiter
+    from backend.services.circuit_breaker_service import OPEN, get_circuit_breakers
+    from backend.services.prompt_cache_service import get_refine_cache
+    from backend.services.cache_warmup_service import get_cache_warmup
+    from backend.services.qwen_batch_service import batching_enabled, get_qwen_batcher
+    from backend.services.single_flight_service import single_flight_stats
+    from backend.services.translation_service import translation_cache_stats
+    from backend.services.zh_enrichment_service import enrichment_enabled, get_zh_enrichment
+
+    breakers = get_circuit_breakers().stats()
+    if any(b["state"] == OPEN for b in breakers.values()):
+        is_healthy = False
+
     return {
         "status": "ok" if is_healthy else "degraded",
         "checks": {
             "api_keys": api_keys_status,
             "filesystem": fs_status
-        }
+        },
+        "upstream": {
+            "http_pool": get_http_pool().stats(),
+            "async_engine": get_async_engine().stats() if async_engine_enabled() else {"running": False},
+            "task_poller": get_task_poller().stats(),
+            "model_admission": get_model_admission().stats(),
+            "dispatcher": dispatcher_stats(),
+            "task_status": status_store_stats(),
+            "job_store": get_job_store().stats() if store_enabled() else {"enabled": False},
+            "rate_limit": get_rate_limiter().stats(),
+            "circuit_breakers": breakers,
+            "qwen_batch": get_qwen_batcher().stats() if batching_enabled() else {"enabled": False},
+        },
+        "caches": {
+            "refine": get_refine_cache().stats(),
+            "warmup": get_cache_warmup().progress(),
+            "single_flight": single_flight_stats(),
+            "translate": translation_cache_stats(),
+        },
+        "zh_enrichment": get_zh_enrichment().stats() if enrichment_enabled() else {"enabled": False},
     }
 
 
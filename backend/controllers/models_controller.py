@@ -9,7 +9,8 @@ from fastapi import APIRouter, HTTPException
 
 from backend.services import list_available_models
 from backend.config import load_settings
-from backend.services.model_service import list_models as db_list_models, create_model, update_model, delete_model, update_limit_by_model_name
+from backend.services.model_service import list_models as db_list_models, create_model, update_model, delete_model, update_limit_by_model_name, get_model_limits
+from backend.services.model_admission_service import reload_model_limits
 from backend.services.runtime_config_service import get_runtime_config
 from typing import Dict, Any
 
@@ -41,6 +42,8 @@ def put_model(model_id: str, payload: dict):
     if not model_id:
         raise HTTPException(status_code=400, detail={"error": "id required"})
     update_model(model_id, payload or {})
+    if "max_limit" in (payload or {}) or "model_name" in (payload or {}):
+        reload_model_limits()
     return {"status": "ok"}
 
 @router.delete("/api/models/{model_id}")
@@ -53,16 +56,7 @@ def remove_model(model_id: str):
 # Compatibility aliases for environments missing config_controller
 @router.get("/api/config/limits")
 def compat_get_limits():
-    limits: Dict[str, int] = {}
-    try:
-        for m in db_list_models():
-            if m.get("model_name"):
-                limits[m["model_name"]] = int(m.get("max_limit") or 0)
-    except Exception:
-        pass
-    if not limits:
-        limits = {"wan2.6-t2i": 2, "z-image-turbo": 4}
-    return {"model_limits": limits}
+    return {"model_limits": get_model_limits()}
 
 @router.post("/api/config/update")
 def compat_update_all(payload: dict):
@@ -73,6 +67,7 @@ def compat_update_all(payload: dict):
                 update_limit_by_model_name(str(model_name), int(v))
             except Exception:
                 pass
+        reload_model_limits()
     cfg = get_runtime_config()
     return {
         "status": "ok",
@@ -1,11 +1,23 @@
 from fastapi import APIRouter, HTTPException
-from backend.services.background_task_service import get_job_status
+from backend.services.background_task_service import cancel_job, dispatcher_stats, get_job_status
 
 router = APIRouter()
 
+@router.get("/api/tasks/queue")
+def get_queue_depth():
+    return dispatcher_stats()
+
 @router.get("/api/tasks/group/{job_id}")
 def get_group_status(job_id: str):
     status = get_job_status(job_id)
     if not status:
         raise HTTPException(status_code=404, detail="Job not found")
     return status
+
+@router.post("/api/tasks/group/{job_id}/cancel")
+def cancel_group(job_id: str):
+    result = cancel_job(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return result
+
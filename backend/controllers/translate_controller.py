@@ -7,8 +7,8 @@
 
 from fastapi import APIRouter, HTTPException
 
-from backend.models.translate_request_model import TranslateRequest
-from backend.services import translate_zh_en
+from backend.models.translate_request_model import TranslateBatchRequest, TranslateRequest
+from backend.services import translate_zh_en, translate_zh_en_batch
 
 
 router = APIRouter()
@@ -30,3 +30,14 @@ def translate(req: TranslateRequest):
         raise HTTPException(status_code=status_code, detail=result)
         
     raise HTTPException(status_code=500, detail={"status": "error", "message": "Unknown error", "result": str(result)})
+
+
+@router.post("/api/translate/batch")
+def translate_batch(req: TranslateBatchRequest):
+    result = translate_zh_en_batch(req.texts, model=req.model)
+    if result.get("status") == "success":
+        return result
+    code = result.get("code", 500)
+    status_code = code if isinstance(code, int) and 100 <= code <= 599 else 500
+    print(f"Batch translation failed: {result.get('message')}")
+    raise HTTPException(status_code=status_code, detail=result)
@@ -15,7 +15,6 @@ def init_db():
         conn.executescript(
             """
             DROP INDEX IF EXISTS uniq_items_rel_abs;
-            CREATE UNIQUE INDEX IF NOT EXISTS uniq_records_hash ON records(content_hash);
             CREATE TABLE IF NOT EXISTS records (
                 id INTEGER PRIMARY KEY,
                 job_id TEXT UNIQUE,
@@ -36,6 +35,7 @@ def init_db():
                 item_count INTEGER DEFAULT 0,
                 content_hash TEXT
             );
+            CREATE UNIQUE INDEX IF NOT EXISTS uniq_records_hash ON records(content_hash);
             CREATE INDEX IF NOT EXISTS idx_records_created ON records(created_at);
             CREATE INDEX IF NOT EXISTS idx_records_cat_model ON records(category_prompt, model_name);
             
@@ -79,6 +79,65 @@ def init_db():
                 global_style TEXT,
                 negative_prompt TEXT
             );
+
+            CREATE TABLE IF NOT EXISTS upstream_tasks (
+                task_id TEXT PRIMARY KEY,
+                job_id TEXT,
+                task_index INTEGER,
+                model TEXT,
+                prefix TEXT,
+                category TEXT,
+                resolution TEXT,
+                n INTEGER DEFAULT 1,
+                meta TEXT,
+                status TEXT,
+                result TEXT,
+                created_at REAL,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_upstream_tasks_status ON upstream_tasks(status);
+            CREATE INDEX IF NOT EXISTS idx_upstream_tasks_job ON upstream_tasks(job_id);
+
+            CREATE TABLE IF NOT EXISTS refine_cache (
+                cache_key TEXT PRIMARY KEY,
+                positive TEXT,
+                negative TEXT,
+                positive_zh TEXT,
+                negative_zh TEXT,
+                model TEXT,
+                created_at REAL,
+                hits INTEGER DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_refine_cache_created ON refine_cache(created_at);
+
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT,
+                user_id TEXT,
+                priority TEXT,
+                context TEXT,
+                state TEXT,
+                total_tasks INTEGER DEFAULT 0,
+                completed_tasks INTEGER DEFAULT 0,
+                results TEXT,
+                attempts INTEGER DEFAULT 0,
+                lease_owner TEXT,
+                lease_until REAL,
+                created_at REAL,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_state_lease ON jobs(state, lease_until);
+            CREATE INDEX IF NOT EXISTS idx_jobs_state_updated ON jobs(state, updated_at);
+
+            CREATE TABLE IF NOT EXISTS job_tasks (
+                job_id TEXT REFERENCES jobs(job_id) ON DELETE CASCADE,
+                task_index INTEGER,
+                state TEXT,
+                result TEXT,
+                params TEXT,
+                updated_at REAL,
+                PRIMARY KEY (job_id, task_index)
+            );
             """
         )
     finally:
@@ -108,6 +167,11 @@ def init_db():
         if "negative_zh" not in rcols:
             conn.execute("ALTER TABLE records ADD COLUMN negative_zh TEXT")
             conn.commit()
+        # job_tasks keeps the task's prompt / seed so a recovered job can skip finished steps
+        cur = conn.execute("PRAGMA table_info(job_tasks)")
+        if "params" not in [r[1] for r in cur.fetchall()]:
+            conn.execute("ALTER TABLE job_tasks ADD COLUMN params TEXT")
+            conn.commit()
         # indexes for zh columns
         conn.execute("CREATE INDEX IF NOT EXISTS idx_records_pos_zh ON records(positive_zh)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_records_neg_zh ON records(negative_zh)")
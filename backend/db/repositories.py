@@ -195,6 +195,44 @@ class RecordsRepo:
             row = cur.fetchone()
             return int(row[0]) if row else None
 
+    def by_content_hash(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        with get_conn() as conn:
+            cur = conn.execute("SELECT * FROM records WHERE content_hash=?", (content_hash,))
+            row = cur.fetchone()
+            if not row:
+                return None
+            cols = [c[0] for c in cur.description]
+            return dict(zip(cols, row))
+
+    def fill_zh(self, record_id: int, positive_zh: Optional[str], negative_zh: Optional[str]) -> None:
+        """Set zh prompts only where the record has none yet."""
+        with get_conn() as conn:
+            conn.execute(
+                """
+                UPDATE records SET
+                    positive_zh = COALESCE(NULLIF(positive_zh, ''), ?),
+                    negative_zh = COALESCE(NULLIF(negative_zh, ''), ?)
+                WHERE id=?
+                """,
+                (positive_zh, negative_zh, record_id),
+            )
+
+    def missing_zh(self, limit: int, after_id: int = 0) -> List[Dict[str, Any]]:
+        with get_conn() as conn:
+            cur = conn.execute(
+                """
+                SELECT id, job_id, content_hash, refined_positive, refined_negative, positive_zh, negative_zh
+                FROM records
+                WHERE id > ?
+                  AND ((positive_zh IS NULL OR positive_zh = '') AND COALESCE(refined_positive, '') != ''
+                    OR (negative_zh IS NULL OR negative_zh = '') AND COALESCE(refined_negative, '') != '')
+                ORDER BY id LIMIT ?
+                """,
+                (after_id, limit),
+            )
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+
 class ItemsRepo:
     def count_by_record(self, record_id: int) -> int:
         with get_conn() as conn:
@@ -290,3 +328,240 @@ class ItemsRepo:
     def delete(self, record_id: int, item_id: int) -> None:
         with get_conn() as conn:
             conn.execute("DELETE FROM items WHERE id=? AND record_id=?", (item_id, record_id))
+
+
+class UpstreamTasksRepo:
+    """DashScope task_ids submitted but not yet recorded; survives restarts."""
+
+    def insert(self, data: Dict[str, Any]) -> None:
+        with get_conn() as conn:
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO upstream_tasks(task_id,job_id,task_index,model,prefix,category,resolution,n,meta,status,result,created_at,updated_at)
+                VALUES(?,?,?,?,?,?,?,?,?,?,NULL,?,?)
+                """,
+                (
+                    data.get("task_id"),
+                    data.get("job_id"),
+                    data.get("task_index"),
+                    data.get("model"),
+                    data.get("prefix"),
+                    data.get("category"),
+                    data.get("resolution"),
+                    data.get("n", 1),
+                    data.get("meta"),
+                    data.get("status", "submitted"),
+                    data.get("created_at"),
+                    data.get("created_at"),
+                ),
+            )
+
+    def mark(self, task_id: str, status: str, result: Optional[str], updated_at: float) -> None:
+        with get_conn() as conn:
+            conn.execute(
+                "UPDATE upstream_tasks SET status=?, result=?, updated_at=? WHERE task_id=?",
+                (status, result, updated_at, task_id),
+            )
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with get_conn() as conn:
+            cur = conn.execute("SELECT * FROM upstream_tasks WHERE task_id=?", (task_id,))
+            row = cur.fetchone()
+            if not row:
+                return None
+            cols = [c[0] for c in cur.description]
+            return dict(zip(cols, row))
+
+    def list_all(self) -> List[Dict[str, Any]]:
+        with get_conn() as conn:
+            cur = conn.execute("SELECT * FROM upstream_tasks ORDER BY created_at, task_index")
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+    def delete(self, task_id: str) -> None:
+        with get_conn() as conn:
+            conn.execute("DELETE FROM upstream_tasks WHERE task_id=?", (task_id,))
+
+    def delete_by_job(self, job_id: str) -> int:
+        with get_conn() as conn:
+            cur = conn.execute("DELETE FROM upstream_tasks WHERE job_id=?", (job_id,))
+            return cur.rowcount
+
+    def by_job(self, job_id: str) -> List[Dict[str, Any]]:
+        with get_conn() as conn:
+            cur = conn.execute("SELECT * FROM upstream_tasks WHERE job_id=? ORDER BY task_index", (job_id,))
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+    def ids_by_job(self, job_id: str, status: str) -> List[str]:
+        with get_conn() as conn:
+            cur = conn.execute("SELECT task_id FROM upstream_tasks WHERE job_id=? AND status=?", (job_id, status))
+            return [r[0] for r in cur.fetchall()]
+
+
+class RefineCacheRepo:
+    """Second tier of the prompt refinement cache (see services/prompt_cache_service.py)."""
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        with get_conn() as conn:
+            cur = conn.execute("SELECT * FROM refine_cache WHERE cache_key=?", (cache_key,))
+            row = cur.fetchone()
+            if not row:
+                return None
+            cols = [c[0] for c in cur.description]
+            conn.execute("UPDATE refine_cache SET hits=hits+1 WHERE cache_key=?", (cache_key,))
+            return dict(zip(cols, row))
+
+    def upsert(self, cache_key: str, data: Dict[str, Any]) -> None:
+        with get_conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO refine_cache(cache_key,positive,negative,positive_zh,negative_zh,model,created_at,hits)
+                VALUES(?,?,?,?,?,?,?,0)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    positive=excluded.positive,
+                    negative=excluded.negative,
+                    positive_zh=excluded.positive_zh,
+                    negative_zh=excluded.negative_zh,
+                    model=excluded.model,
+                    created_at=excluded.created_at
+                """,
+                (
+                    cache_key,
+                    data.get("positive"),
+                    data.get("negative"),
+                    data.get("positive_zh"),
+                    data.get("negative_zh"),
+                    data.get("model"),
+                    data.get("created_at"),
+                ),
+            )
+
+    def delete_older_than(self, ts: float) -> int:
+        with get_conn() as conn:
+            cur = conn.execute("DELETE FROM refine_cache WHERE created_at < ?", (ts,))
+            return cur.rowcount
+
+    def count(self) -> int:
+        with get_conn() as conn:
+            return conn.execute("SELECT COUNT(*) FROM refine_cache").fetchone()[0]
+
+
+class JobsRepo:
+    """Durable job queue (see services/job_store_service.py)."""
+
+    _PATCHABLE = ("state", "total_tasks", "completed_tasks", "results", "lease_owner", "lease_until", "updated_at")
+
+    def insert(self, data: Dict[str, Any]) -> None:
+        with get_conn() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO jobs(job_id,kind,user_id,priority,context,state,total_tasks,completed_tasks,results,attempts,lease_owner,lease_until,created_at,updated_at)
+                VALUES(?,?,?,?,?,?,?,0,NULL,0,?,?,?,?)
+                """,
+                (
+                    data.get("job_id"),
+                    data.get("kind"),
+                    data.get("user_id"),
+                    data.get("priority"),
+                    data.get("context"),
+                    data.get("state"),
+                    int(data.get("total_tasks") or 0),
+                    data.get("lease_owner"),
+                    data.get("lease_until"),
+                    data.get("created_at"),
+                    data.get("created_at"),
+                ),
+            )
+
+    def apply_batch(self, jobs: List[Tuple[str, Dict[str, Any]]], tasks: List[Tuple[Any, ...]]) -> None:
+        """One transaction for a batch of job patches and (job_id, task_index, state, result, params, updated_at) rows."""
+        with get_conn() as conn:
+            for job_id, patch in jobs:
+                cols = [c for c in self._PATCHABLE if c in patch]
+                if cols:
+                    conn.execute(
+                        f"UPDATE jobs SET {', '.join(f'{c}=?' for c in cols)} WHERE job_id=?",
+                        [patch[c] for c in cols] + [job_id],
+                    )
+            if tasks:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO job_tasks(job_id,task_index,state,result,params,updated_at) VALUES(?,?,?,?,?,?)",
+                    tasks,
+                )
+
+    def claim(self, job_id: str, owner: str, lease_until: float) -> int:
+        """Take the lease for a run of the job; returns the attempt number."""
+        with get_conn() as conn:
+            conn.execute(
+                "UPDATE jobs SET attempts=attempts+1, lease_owner=?, lease_until=? WHERE job_id=?",
+                (owner, lease_until, job_id),
+            )
+            row = conn.execute("SELECT attempts FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+            return int(row[0]) if row else 0
+
+    def renew(self, owner: str, lease_until: float, states: Tuple[str, ...]) -> int:
+        with get_conn() as conn:
+            cur = conn.execute(
+                f"UPDATE jobs SET lease_until=? WHERE lease_owner=? AND state IN ({','.join('?' * len(states))})",
+                (lease_until, owner, *states),
+            )
+            return cur.rowcount
+
+    def expired(self, now: float, states: Tuple[str, ...]) -> List[Dict[str, Any]]:
+        with get_conn() as conn:
+            cur = conn.execute(
+                f"SELECT * FROM jobs WHERE state IN ({','.join('?' * len(states))}) AND COALESCE(lease_until, 0) < ? ORDER BY created_at",
+                (*states, now),
+            )
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+    def take_over(self, job_id: str, owner: str, lease_until: float, old_lease_until: Optional[float]) -> bool:
+        """Compare-and-set on the old lease so only one process reclaims an expired job."""
+        with get_conn() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_owner=?, lease_until=? WHERE job_id=? AND COALESCE(lease_until, 0)=COALESCE(?, 0)",
+                (owner, lease_until, job_id, old_lease_until),
+            )
+            return cur.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with get_conn() as conn:
+            cur = conn.execute("SELECT * FROM jobs WHERE job_id=?", (job_id,))
+            row = cur.fetchone()
+            if not row:
+                return None
+            cols = [c[0] for c in cur.description]
+            return dict(zip(cols, row))
+
+    def tasks(self, job_id: str) -> List[Dict[str, Any]]:
+        with get_conn() as conn:
+            cur = conn.execute("SELECT * FROM job_tasks WHERE job_id=? ORDER BY task_index", (job_id,))
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+    def purge_finished(self, active_states: Tuple[str, ...], before: float, keep: int) -> int:
+        """
+        Delete finished jobs (state not in active_states) with their job_tasks rows: those last
+        updated before `before`, and any beyond the newest `keep` (keep <= 0: no row cap).
+        """
+        marks = ",".join("?" * len(active_states))
+        with get_conn() as conn:
+            ids = [r[0] for r in conn.execute(
+                f"""
+                SELECT job_id FROM jobs WHERE state NOT IN ({marks}) AND (
+                    COALESCE(updated_at, created_at, 0) < ?
+                    OR job_id NOT IN (
+                        SELECT job_id FROM jobs WHERE state NOT IN ({marks})
+                        ORDER BY COALESCE(updated_at, created_at, 0) DESC LIMIT ?
+                    )
+                )
+                """,
+                (*active_states, before, *active_states, keep if keep > 0 else -1),
+            ).fetchall()]
+            if ids:
+                conn.executemany("DELETE FROM job_tasks WHERE job_id=?", [(i,) for i in ids])
+                conn.executemany("DELETE FROM jobs WHERE job_id=?", [(i,) for i in ids])
+            return len(ids)
+
@@ -14,8 +14,11 @@ import os
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from backend.config import load_settings, reload_settings, CONFIG_PATH, CONFIG_LOCAL_PATH
-from backend.services.background_task_service import start_job_dispatcher
+from backend.services.background_task_service import start_job_dispatcher, start_job_store
 from backend.services.record_service import RecordService
+from backend.services.upstream_task_service import start_resume
+from backend.services.cache_warmup_service import start_warmup
+from backend.services.dashscope_async_client_service import shutdown_async_engine
 from backend.db.connection import init_db
 
 from backend.controllers import generate_router, health_router, images_router, models_router, translate_router, tasks_router, download_router, db_router, ingest_router
@@ -34,6 +37,8 @@ class ConfigEventHandler(FileSystemEventHandler):
         if event.src_path == CONFIG_PATH or event.src_path == CONFIG_LOCAL_PATH:
             try:
                 reload_settings()
+                start_job_dispatcher()  # picks up a raised dispatcher.job_slots
+                start_warmup("config reload")
             except Exception:
                 pass
 
@@ -48,11 +53,21 @@ async def startup_event():
         print(f"Failed to init db: {e}")
     # Start job dispatcher in background
     start_job_dispatcher()
+    # Persisted jobs: batched status writes, lease renewal, recovery of unfinished jobs
+    try:
+        start_job_store()
+    except Exception as e:
+        print(f"Failed to start job store: {e}")
     # Start record service
     try:
         RecordService.instance().start()
     except Exception as e:
         print(f"Failed to start record service: {e}")
+    # Resume DashScope tasks left in flight by the previous process
+    try:
+        start_resume()
+    except Exception as e:
+        print(f"Failed to resume upstream tasks: {e}")
     # Start Watchdog Observer
     try:
         event_handler = ConfigEventHandler()
@@ -65,6 +80,11 @@ async def startup_event():
         print(f"Failed to start config watcher: {e}")
     # Initial load
     load_settings()
+    # Pre-refine the configured category prompts so first requests hit the cache
+    try:
+        start_warmup("startup")
+    except Exception as e:
+        print(f"Failed to start cache warm-up: {e}")
     
 
 @app.on_event("shutdown")
@@ -78,6 +98,10 @@ async def shutdown_event():
         RecordService.instance().shutdown()
     except Exception as e:
         print(f"Failed to stop record service: {e}")
+    try:
+        shutdown_async_engine()
+    except Exception as e:
+        print(f"Failed to stop async engine: {e}")
 
 app.add_middleware(
     CORSMiddleware,
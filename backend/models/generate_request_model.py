@@ -27,6 +27,9 @@ class GenerateRequest(BaseModel):
     negative_prompt: str = ""
     prompt_extend: bool = False
     count: int = Field(1, ge=1, le=50)
+    deadline_seconds: Optional[float] = Field(None, gt=0, le=3600)  # 作业整体期限，缺省取 deadlines.job
+    delta_engine: Optional[str] = Field(None, pattern="^(qwen|local)$")  # 继承模式下第 2 张起的变体方式，缺省取 prompt_variation.engine
+    priority: Optional[str] = Field(None, pattern="^(interactive|normal|bulk)$")  # 调度优先级，缺省取 dispatcher.default_priority
 
     @staticmethod
     def create(key: str, value: Dict[str, Any]) -> None:
@@ -8,12 +8,17 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class TranslateRequest(BaseModel):
     text: str
     model: Optional[str] = None
 
+
+
+class TranslateBatchRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=500)
+    model: Optional[str] = None
@@ -0,0 +1,234 @@
+"""
+/**
+ * @file backend/scripts/bench_generate.py
+ * @description /api/generate 端到端吞吐与延迟压测：按并发数、作业数与服务配比提交作业，轮询
+ *              /api/tasks/group/{job_id} 直到完成，汇总 jobs/s、images/s、p50/p95/p99 与各阶段耗时，
+ *              结果写入 JSON 便于跨提交对比（--compare 指定基线文件）。
+ *
+ * 用法（后端 endpoints 指向 backend/scripts/fake_dashscope_server.py）：
+ *   python -m backend.scripts.bench_generate --base-url http://127.0.0.1:8000 --jobs 50 --concurrency 8 \
+ *       --count 4 --mix wan:0.5,z_image:0.5 --output bench.json [--compare bench_prev.json]
+ */
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+STAGES = ("queue_wait", "refine_prompt", "translate", "submit", "poll", "download", "add_record")
+READY_STATES = {"completed", "failed", "cancelled", "timeout"}
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(math.ceil(p / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def distribution(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "mean": round(sum(values) / len(values), 1),
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "max": round(max(values), 1),
+    }
+
+
+def parse_mix(spec: str) -> List[tuple]:
+    pairs = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, weight = part.partition(":")
+        pairs.append((name.strip(), float(weight or 1)))
+    return pairs or [("wan", 1.0)]
+
+
+def pick_service(mix: List[tuple], rng: random.Random) -> str:
+    total = sum(w for _, w in mix)
+    r = rng.uniform(0, total)
+    for name, w in mix:
+        r -= w
+        if r <= 0:
+            return name
+    return mix[-1][0]
+
+
+def run_job(session: requests.Session, args: argparse.Namespace, index: int, service: str) -> Dict[str, Any]:
+    body = {
+        "service": service,
+        "prompt": f"{args.prompt} #{index}" if args.unique_prompts else args.prompt,
+        "category": args.category,
+        "count": args.count,
+        "resolution": args.resolution,
+        "size": args.size,
+    }
+    headers = {"X-User-ID": f"bench-{index % max(1, args.users)}"}
+    t0 = time.perf_counter()
+    try:
+        r = session.post(f"{args.base_url}/api/generate", json=body, headers=headers, timeout=30)
+        r.raise_for_status()
+        job_id = r.json()["job_id"]
+    except Exception as e:
+        return {"index": index, "service": service, "status": "submit_error", "error": str(e)}
+    submit_ms = (time.perf_counter() - t0) * 1000
+    deadline = time.perf_counter() + args.timeout
+    status: Dict[str, Any] = {}
+    ready_at = None
+    while time.perf_counter() < deadline:
+        try:
+            status = session.get(f"{args.base_url}/api/tasks/group/{job_id}", timeout=30).json()
+        except Exception:
+            status = {}
+        if ready_at is None and (status.get("ready") or status.get("status") in READY_STATES):
+            ready_at = time.perf_counter()
+        timings = status.get("timings") or {}
+        # 作业标记完成后记录写入仍可能在进行，等 timings.finished 以拿到 add_record 耗时
+        if ready_at is not None and (timings.get("finished") or time.perf_counter() - ready_at > 5):
+            break
+        time.sleep(args.poll_interval)
+    if ready_at is None:
+        return {"index": index, "service": service, "job_id": job_id, "status": "client_timeout", "submit_ms": submit_ms}
+    results = status.get("results") or []
+    images = sum(1 for x in results if isinstance(x, dict) and x.get("status") == "success")
+    return {
+        "index": index,
+        "service": service,
+        "job_id": job_id,
+        "status": status.get("status"),
+        "submit_ms": round(submit_ms, 1),
+        "latency_ms": round((ready_at - t0) * 1000, 1),
+        "images": images,
+        "requested": args.count,
+        "timings": status.get("timings"),
+    }
+
+
+def summarize(jobs: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    done = [j for j in jobs if "latency_ms" in j]
+    images = sum(j.get("images", 0) for j in done)
+    stage_totals: Dict[str, List[float]] = {s: [] for s in STAGES}
+    for j in done:
+        stages = ((j.get("timings") or {}).get("stages")) or {}
+        for name in STAGES:
+            if name in stages:
+                stage_totals[name].append(float(stages[name].get("total_ms", 0)))
+    by_status: Dict[str, int] = {}
+    for j in jobs:
+        by_status[j.get("status") or "unknown"] = by_status.get(j.get("status") or "unknown", 0) + 1
+    return {
+        "jobs": len(jobs),
+        "elapsed_s": round(elapsed, 2),
+        "jobs_per_s": round(len(done) / elapsed, 3) if elapsed else 0.0,
+        "images_per_s": round(images / elapsed, 3) if elapsed else 0.0,
+        "images": images,
+        "images_requested": sum(j.get("requested", 0) for j in jobs),
+        "status": by_status,
+        "job_latency_ms": distribution([j["latency_ms"] for j in done]),
+        "submit_ms": distribution([j["submit_ms"] for j in jobs if "submit_ms" in j]),
+        "stages_ms": {name: distribution(v) for name, v in stage_totals.items() if v},
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=root, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def print_report(summary: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    def delta(cur, prev):
+        if prev in (None, 0) or cur is None:
+            return ""
+        return f"  ({(cur - prev) / prev * 100:+.1f}%)"
+
+    base = (baseline or {}).get("summary") or {}
+    print(f"jobs={summary['jobs']} elapsed={summary['elapsed_s']}s status={summary['status']}")
+    print(f"jobs/s   {summary['jobs_per_s']}{delta(summary['jobs_per_s'], base.get('jobs_per_s'))}")
+    print(f"images/s {summary['images_per_s']}{delta(summary['images_per_s'], base.get('images_per_s'))}")
+    lat, blat = summary["job_latency_ms"], base.get("job_latency_ms") or {}
+    for p in ("p50", "p95", "p99"):
+        print(f"latency {p} {lat.get(p)} ms{delta(lat.get(p), blat.get(p))}")
+    print(f"{'stage':<14}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, d in summary["stages_ms"].items():
+        print(f"{name:<14}{d['n']:>6}{d['p50']:>10}{d['p95']:>10}{d['p99']:>10}{d['max']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark POST /api/generate end to end")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--jobs", type=int, default=20, help="total jobs to submit")
+    parser.add_argument("--concurrency", type=int, default=4, help="jobs in flight from the client")
+    parser.add_argument("--count", type=int, default=1, help="images per job")
+    parser.add_argument("--mix", default="wan:1", help="service mix, e.g. wan:0.7,z_image:0.3")
+    parser.add_argument("--prompt", default="a lighthouse on a cliff at dusk")
+    parser.add_argument("--unique-prompts", action="store_true", help="suffix the job index so prompt caches miss")
+    parser.add_argument("--category", default="环境")
+    parser.add_argument("--resolution", default="1K")
+    parser.add_argument("--size", default="1024*1024")
+    parser.add_argument("--users", type=int, default=1, help="spread jobs over N X-User-ID values")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--timeout", type=float, default=600, help="per-job client timeout (s)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None, help="write JSON results here")
+    parser.add_argument("--compare", default=None, help="baseline JSON from a previous run")
+    args = parser.parse_args()
+    args.base_url = args.base_url.rstrip("/")
+
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    services = [pick_service(mix, rng) for _ in range(args.jobs)]
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=max(10, args.concurrency * 2)))
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        jobs = list(pool.map(lambda i: run_job(session, args, i, services[i]), range(args.jobs)))
+    elapsed = time.perf_counter() - started
+
+    summary = summarize(jobs, elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(summary, baseline)
+
+    if args.output:
+        result = {
+            "meta": {
+                "git_revision": git_revision(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": sys.version.split()[0],
+                "args": {k: v for k, v in vars(args).items() if k not in {"output", "compare"}},
+            },
+            "summary": summary,
+            "jobs": jobs,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+/**
+ * @file backend/scripts/fake_dashscope_server.py
+ * @description 离线 DashScope 替身服务：模拟 Qwen（OpenAI 兼容 chat/completions，按请求要求返回纯文本、
+ *              提示词优化 JSON 或按编号的批量 JSON）、wan / z_image
+ *              多模态生成（同步结果或异步 task_id）、/api/v1/tasks/{id} 任务查询与图片下载，
+ *              支持可配置的延迟分布、错误率、429 注入与载荷大小，用于压测与延迟测试。
+ *
+ * 用法：
+ *   python -m backend.scripts.fake_dashscope_server --port 9100 [--config profile.json] [--seed 1]
+ * 后端 config.local.json 中把 endpoints 指向本服务（启动时会打印可直接粘贴的 endpoints）。
+ */
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+# 每个 route 的配置：latency 为延迟分布，error_rate / rate_429 为注入比例（0~1），retry_after 为 429 时的 Retry-After 秒数
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "qwen": {
+        "latency": {"dist": "lognormal", "median": 1.5, "sigma": 0.4},
+        "error_rate": 0.0,
+        "rate_429": 0.0,
+        "retry_after": 1,
+        "content_chars": 400,
+    },
+    "generation": {
+        "latency": {"dist": "uniform", "min": 0.2, "max": 0.5},
+        "error_rate": 0.0,
+        "rate_429": 0.0,
+        "retry_after": 2,
+        # 按模型名选择返回方式：async 返回 task_id，sync 直接返回图片地址；未列出的模型取 default
+        "modes": {"default": "async", "z-image-turbo": "sync"},
+        # 同步模式下生成本身的耗时，以及异步任务从提交到 SUCCEEDED 的耗时
+        "render_latency": {"dist": "lognormal", "median": 8.0, "sigma": 0.3},
+        "task_fail_rate": 0.0,
+    },
+    "tasks": {
+        "latency": {"dist": "fixed", "value": 0.05},
+        "error_rate": 0.0,
+        "rate_429": 0.0,
+        "retry_after": 1,
+    },
+    "download": {
+        "latency": {"dist": "fixed", "value": 0.1},
+        "error_rate": 0.0,
+        "image_bytes": {"dist": "uniform", "min": 300000, "max": 1200000},
+    },
+}
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+def merge_profile(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    out = copy.deepcopy(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = merge_profile(out[key], value)
+        else:
+            out[key] = value
+    return out
+
+
+def sample(spec: Any, rng: random.Random) -> float:
+    """
+    Draw one value from a distribution spec: a plain number, or
+    {"dist": "fixed", "value"}, {"dist": "uniform", "min", "max"},
+    {"dist": "normal", "mean", "stddev"}, {"dist": "lognormal", "median", "sigma"}.
+    Negative draws are clamped to 0.
+    """
+    if isinstance(spec, (int, float)):
+        return max(0.0, float(spec))
+    if not isinstance(spec, dict):
+        return 0.0
+    dist = spec.get("dist", "fixed")
+    if dist == "uniform":
+        value = rng.uniform(float(spec.get("min", 0)), float(spec.get("max", 0)))
+    elif dist == "normal":
+        value = rng.gauss(float(spec.get("mean", 0)), float(spec.get("stddev", 0)))
+    elif dist == "lognormal":
+        median = float(spec.get("median", 0))
+        value = median * math.exp(rng.gauss(0, float(spec.get("sigma", 0)))) if median > 0 else 0.0
+    else:
+        value = float(spec.get("value", 0))
+    return max(0.0, value)
+
+
+class FakeDashScope:
+    """State shared by the routes: profile, RNG, in-flight tasks and counters."""
+
+    def __init__(self, profile: Optional[Dict[str, Any]] = None, seed: Optional[int] = None):
+        self.profile = merge_profile(DEFAULT_PROFILE, profile or {})
+        self.rng = random.Random(seed)
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self._blobs: Dict[int, bytes] = {}
+
+    def count(self, route: str, name: str) -> None:
+        with self.lock:
+            c = self.counters.setdefault(route, {"requests": 0, "errors": 0, "throttled": 0})
+            c[name] = c.get(name, 0) + 1
+
+    def roll(self, rate: Any) -> bool:
+        try:
+            return self.rng.random() < float(rate or 0)
+        except (TypeError, ValueError):
+            return False
+
+    async def gate(self, route: str) -> Optional[Response]:
+        """Apply latency and fault injection for `route`; returns an error response or None."""
+        cfg = self.profile.get(route, {})
+        self.count(route, "requests")
+        delay = sample(cfg.get("latency"), self.rng)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.roll(cfg.get("rate_429")):
+            self.count(route, "throttled")
+            return JSONResponse(
+                {"code": "Throttling.RateQuota", "message": "Requests rate limit exceeded.", "request_id": str(uuid.uuid4())},
+                status_code=429,
+                headers={"Retry-After": str(cfg.get("retry_after", 1))},
+            )
+        if self.roll(cfg.get("error_rate")):
+            self.count(route, "errors")
+            return JSONResponse({"code": "InternalError", "message": "Injected upstream failure.", "request_id": str(uuid.uuid4())}, status_code=500)
+        return None
+
+    def image_bytes(self, size: int) -> bytes:
+        size = max(len(PNG_HEADER), int(size))
+        # 按 64KB 粒度缓存，避免每次下载重新生成大块内存
+        bucket = ((size + 65535) // 65536) * 65536
+        blob = self._blobs.get(bucket)
+        if blob is None:
+            blob = self._blobs[bucket] = PNG_HEADER + bytes(bucket - len(PNG_HEADER))
+        return blob[:size]
+
+
+def _chat_content(prompt: str, chars: int) -> str:
+    text = (prompt or "").strip() or "a detailed scene"
+    if len(text) >= chars:
+        return text[:chars]
+    filler = ", highly detailed, cinematic lighting, sharp focus"
+    while len(text) < chars:
+        text += filler
+    return text[:chars]
+
+
+FAKE_NEGATIVE = "blurry, low quality, distorted, watermark"
+
+
+def _translated(text: str) -> str:
+    return f"译文：{text}"
+
+
+def _subject(prompt: str) -> str:
+    """The text a refine / delta instruction is about."""
+    match = re.search(r"User Prompt:\s*(.+)", prompt) or re.search(r'Base Positive Prompt:\s*"(.*?)"', prompt, re.DOTALL)
+    return match.group(1).strip() if match else prompt
+
+
+def _numbered(prompt: str) -> Optional[Dict[str, Any]]:
+    """Items of a numbered multi-request prompt (qwen_batch / translation packing), else None."""
+    if "keyed by number" not in prompt and "same numeric keys" not in prompt:
+        return None
+    try:
+        data = json.loads(prompt.rsplit("\n", 1)[-1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _chat_answer(prompt: str, chars: int) -> str:
+    """
+    Answer in the shape the backend asked for: a numbered JSON object for packed requests,
+    the positive / negative (and _zh when requested) JSON for refine instructions, a bare
+    translation for translate prompts, and filler text for anything else.
+    """
+    items = _numbered(prompt)
+    if items is not None:
+        translate = prompt.startswith("Translate each value")
+        answers: Dict[str, Any] = {}
+        for key, value in items.items():
+            if translate:
+                answers[key] = _translated(str(value))
+                continue
+            answer = _chat_answer(str(value), chars)
+            try:
+                answers[key] = json.loads(answer)
+            except ValueError:
+                answers[key] = answer
+        return json.dumps(answers, ensure_ascii=False)
+    if '"positive_prompt"' in prompt:
+        out = {"positive_prompt": _chat_content(_subject(prompt), chars), "negative_prompt": FAKE_NEGATIVE}
+        if '"positive_prompt_zh"' in prompt:
+            out["positive_prompt_zh"] = _translated(out["positive_prompt"])
+            out["negative_prompt_zh"] = _translated(FAKE_NEGATIVE)
+        return json.dumps(out, ensure_ascii=False)
+    match = re.match(r'Translate the following text to Chinese.*?"(.*)"\s*$', prompt, re.DOTALL)
+    if match:
+        return _translated(match.group(1))
+    return _chat_content(prompt, chars)
+
+
+def create_app(profile: Optional[Dict[str, Any]] = None, seed: Optional[int] = None) -> FastAPI:
+    fake = FakeDashScope(profile, seed)
+    app = FastAPI(title="fake-dashscope")
+    app.state.fake = fake
+
+    def base_url(request: Request) -> str:
+        return str(request.base_url).rstrip("/")
+
+    @app.post("/compatible-mode/v1/chat/completions")
+    async def chat_completions(request: Request):
+        err = await fake.gate("qwen")
+        if err is not None:
+            return err
+        body = await request.json()
+        messages = body.get("messages") or []
+        prompt = messages[-1].get("content", "") if messages and isinstance(messages[-1], dict) else ""
+        if isinstance(prompt, list):
+            prompt = " ".join(p.get("text", "") for p in prompt if isinstance(p, dict))
+        content = _chat_answer(str(prompt), int(fake.profile["qwen"].get("content_chars", 400)))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "qwen-max"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(str(prompt)), "completion_tokens": len(content), "total_tokens": len(str(prompt)) + len(content)},
+        }
+
+    async def _generation(request: Request):
+        err = await fake.gate("generation")
+        if err is not None:
+            return err
+        body = await request.json()
+        cfg = fake.profile["generation"]
+        model = body.get("model", "")
+        params = body.get("parameters") or {}
+        n = max(1, int(params.get("n", 1) or 1))
+        modes = cfg.get("modes") or {}
+        mode = modes.get(model, modes.get("default", "async"))
+        request_id = str(uuid.uuid4())
+        if mode == "sync" or request.headers.get("X-DashScope-Async", "").lower() == "disable":
+            await asyncio.sleep(sample(cfg.get("render_latency"), fake.rng))
+            if fake.roll(cfg.get("task_fail_rate")):
+                fake.count("generation", "errors")
+                return JSONResponse({"code": "DataInspectionFailed", "message": "Injected generation failure.", "request_id": request_id}, status_code=400)
+            urls = [f"{base_url(request)}/files/{uuid.uuid4().hex}.png" for _ in range(n)]
+            return {
+                "request_id": request_id,
+                "output": {"choices": [{"finish_reason": "stop", "message": {"role": "assistant", "content": [{"image": u} for u in urls]}}]},
+                "usage": {"image_count": n},
+            }
+        task_id = str(uuid.uuid4())
+        with fake.lock:
+            fake.tasks[task_id] = {
+                "submitted": time.monotonic(),
+                "ready_at": time.monotonic() + sample(cfg.get("render_latency"), fake.rng),
+                "fail": fake.roll(cfg.get("task_fail_rate")),
+                "n": n,
+                "base": base_url(request),
+            }
+        return {"request_id": request_id, "output": {"task_id": task_id, "task_status": "PENDING"}}
+
+    app.post("/api/v1/services/aigc/multimodal-generation/generation")(_generation)
+    app.post("/api/v1/services/aigc/text2image/image-synthesis")(_generation)
+
+    @app.get("/api/v1/tasks/{task_id}")
+    async def get_task(task_id: str):
+        err = await fake.gate("tasks")
+        if err is not None:
+            return err
+        with fake.lock:
+            task = fake.tasks.get(task_id)
+        if task is None:
+            return {"request_id": str(uuid.uuid4()), "output": {"task_id": task_id, "task_status": "UNKNOWN"}}
+        now = time.monotonic()
+        if now < task["ready_at"]:
+            status = "PENDING" if now - task["submitted"] < 0.5 else "RUNNING"
+            return {"request_id": str(uuid.uuid4()), "output": {"task_id": task_id, "task_status": status}}
+        if task["fail"]:
+            return {"request_id": str(uuid.uuid4()), "output": {"task_id": task_id, "task_status": "FAILED", "code": "InternalError", "message": "Injected task failure."}}
+        results = [{"url": f"{task['base']}/files/{task_id}_{i}.png"} for i in range(task["n"])]
+        return {
+            "request_id": str(uuid.uuid4()),
+            "output": {"task_id": task_id, "task_status": "SUCCEEDED", "results": results},
+            "usage": {"image_count": task["n"]},
+        }
+
+    @app.post("/api/v1/tasks/{task_id}/cancel")
+    async def cancel_task(task_id: str):
+        with fake.lock:
+            task = fake.tasks.pop(task_id, None)
+        if task is None:
+            return JSONResponse({"code": "UnsupportedOperation", "message": "task not found or finished"}, status_code=400)
+        return {"request_id": str(uuid.uuid4())}
+
+    @app.get("/files/{name}")
+    async def download(name: str):
+        err = await fake.gate("download")
+        if err is not None:
+            return err
+        size = int(sample(fake.profile["download"].get("image_bytes"), fake.rng))
+        return Response(fake.image_bytes(size), media_type="image/png")
+
+    @app.get("/_stats")
+    def stats():
+        with fake.lock:
+            return {"counters": copy.deepcopy(fake.counters), "tasks": len(fake.tasks)}
+
+    return app
+
+
+def endpoints_for(base: str) -> Dict[str, str]:
+    return {
+        "qwen": f"{base}/compatible-mode/v1/chat/completions",
+        "z_image": f"{base}/api/v1/services/aigc/multimodal-generation/generation",
+        "wan": f"{base}/api/v1/services/aigc/multimodal-generation/generation",
+        "wan_image": f"{base}/api/v1/services/aigc/text2image/image-synthesis",
+        "tasks": f"{base}/api/v1/tasks",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline DashScope stand-in for load and latency testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--config", help="JSON profile merged over the defaults")
+    parser.add_argument("--seed", type=int, default=None, help="seed latency / fault sampling for reproducible runs")
+    parser.add_argument("--error-rate", type=float, default=None, help="override error_rate on every route")
+    parser.add_argument("--rate-429", type=float, default=None, help="override rate_429 on every route")
+    args = parser.parse_args()
+
+    profile: Dict[str, Any] = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    for route in ("qwen", "generation", "tasks", "download"):
+        if args.error_rate is not None:
+            profile.setdefault(route, {})["error_rate"] = args.error_rate
+        if args.rate_429 is not None and route != "download":
+            profile.setdefault(route, {})["rate_429"] = args.rate_429
+
+    import uvicorn
+
+    base = f"http://{args.host}:{args.port}"
+    print("Point the backend at this server with (config.local.json):")
+    print(json.dumps({"endpoints": endpoints_for(base)}, ensure_ascii=False, indent=2))
+    uvicorn.run(create_app(profile, args.seed), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,7 @@
 from .dashscope_client_service import DashScopeClient
 from .bankmcp_connector_service import connect_qwen, connect_wan, connect_z_image
 from .model_registry_service import list_available_models
-from .translation_service import translate_zh_en
+from .translation_service import translate_zh_en, translate_zh_en_batch
 
 __all__ = [
     "DashScopeClient",
@@ -17,4 +17,5 @@ __all__ = [
     "connect_z_image",
     "list_available_models",
     "translate_zh_en",
+    "translate_zh_en_batch",
 ]
@@ -1,64 +1,264 @@
 import concurrent.futures
+import contextvars
 import os
 import uuid
 import time
 import logging
 import threading
-import queue
 from typing import Dict, Any, List, Optional, Callable
-from dataclasses import dataclass, field
+
+from backend.services import deadline_service as deadlines
+from backend.services import fair_queue_service as fair_queue
+from backend.services import job_status_service as job_status
+from backend.services import job_store_service as job_store
+from backend.services import job_metrics_service as job_metrics
+from backend.services import prompt_variation_service as prompt_variation
+from backend.services import upstream_task_service as upstream_tasks
+from backend.services.model_admission_service import get_model_admission
 
 logger = logging.getLogger(__name__)
 
-@dataclass
 class TaskStatus:
-    job_id: str
-    status: str  # "submitted", "processing", "running", "completed", "failed"
-    total_tasks: int
-    completed_tasks: int = 0
-    results: List[Dict[str, Any]] = field(default_factory=list)
-    created_at: float = field(default_factory=time.time)
-
-# In-memory storage for task status
-_TASK_STORE: Dict[str, TaskStatus] = {}
+    # slots keep the thousands of entries a busy day holds small (no per-instance __dict__)
+    __slots__ = ("job_id", "status", "total_tasks", "completed_tasks", "results", "created_at",
+                 "timings", "deadline", "queue_wait_s", "persisted", "cancel_requested")
+
+    def __init__(self, job_id: str, status: str, total_tasks: int, completed_tasks: int = 0,
+                 results: Optional[List[Dict[str, Any]]] = None, created_at: Optional[float] = None,
+                 timings: Optional[job_metrics.JobTimings] = None, deadline: Optional[deadlines.JobDeadline] = None,
+                 queue_wait_s: Optional[float] = None, persisted: bool = False):
+        self.job_id = job_id
+        self.status = status  # "submitted", "processing", "running", "completed", "failed", "timeout", "cancelled"
+        self.total_tasks = total_tasks
+        self.completed_tasks = completed_tasks
+        self.results = results if results is not None else []
+        self.created_at = created_at if created_at is not None else time.time()
+        self.timings = timings if timings is not None else job_metrics.JobTimings()
+        self.deadline = deadline
+        self.queue_wait_s = queue_wait_s  # time spent waiting for a dispatcher slot
+        self.persisted = persisted  # mirrored to the jobs table (job_store_service)
+        self.cancel_requested = False  # set by cancel_job; the job ends as "cancelled"
+
+FINAL_STATES = ("completed", "failed", "timeout", "cancelled")
+
+# In-memory storage for task status: bounded, finished jobs expire after task_status.ttl_seconds
+_TASK_STORE = job_status.JobStatusStore()
 _STATUS_LOCK = threading.Lock()
 
-# Job Queue for asynchronous processing
-_JOB_QUEUE = queue.Queue()
+# Job Queue for asynchronous processing: per-user sub-queues served by deficit round robin
+_JOB_QUEUE = fair_queue.FairJobQueue()
 
 # Thread pools
 _DEFAULT_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=4)
 _IMAGE_GEN_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=8)
 
+# Dispatcher slots: each slot runs one job lifecycle (refine -> execute) at a time
+DEFAULT_JOB_SLOTS = 4
+_DISPATCHERS: List[threading.Thread] = []
+_DISPATCH_LOCK = threading.Lock()
+_BUSY_SLOTS = 0
+
+def _job_slots() -> int:
+    from backend.config import load_settings
+    try:
+        return max(1, int(load_settings().dispatcher.get("job_slots", DEFAULT_JOB_SLOTS)))
+    except (TypeError, ValueError):
+        return DEFAULT_JOB_SLOTS
+
+def _configure_queue() -> None:
+    from backend.config import load_settings
+    cfg = load_settings().dispatcher
+    try:
+        _JOB_QUEUE.configure(
+            int(cfg.get("quantum", fair_queue.DEFAULT_QUANTUM)),
+            int(cfg.get("max_running_per_user", fair_queue.DEFAULT_MAX_RUNNING_PER_USER)),
+        )
+    except (TypeError, ValueError):
+        logger.warning("invalid dispatcher.quantum / max_running_per_user, keeping previous values")
+
+def _configure_status_store() -> None:
+    from backend.config import load_settings
+    cfg = load_settings().task_status
+    try:
+        with _STATUS_LOCK:
+            _TASK_STORE.configure(
+                int(cfg.get("max_jobs", job_status.DEFAULT_MAX_JOBS)),
+                float(cfg.get("ttl_seconds", job_status.DEFAULT_TTL_SECONDS)),
+            )
+    except (TypeError, ValueError):
+        logger.warning("invalid task_status.max_jobs / ttl_seconds, keeping previous values")
+
+def default_priority() -> str:
+    from backend.config import load_settings
+    return fair_queue.normalize_priority(load_settings().dispatcher.get("default_priority"))
+
 def start_job_dispatcher():
-    """Start the background thread that consumes jobs from the queue."""
-    t = threading.Thread(target=_job_dispatcher_loop, daemon=True)
-    t.start()
+    """
+    Start the background threads that consume jobs from the queue, one per job slot, so one
+    job's refinement overlaps another's image generation. Calling again after the config
+    raised dispatcher.job_slots adds the missing slots and applies the fair-queue settings.
+    """
+    _configure_queue()
+    _configure_status_store()
+    with _DISPATCH_LOCK:
+        _DISPATCHERS[:] = [t for t in _DISPATCHERS if t.is_alive()]
+        for _ in range(_job_slots() - len(_DISPATCHERS)):
+            t = threading.Thread(target=_job_dispatcher_loop, daemon=True, name=f"job-dispatcher-{len(_DISPATCHERS)}")
+            t.start()
+            _DISPATCHERS.append(t)
+
+def dispatcher_stats() -> Dict[str, Any]:
+    with _DISPATCH_LOCK:
+        slots = sum(1 for t in _DISPATCHERS if t.is_alive())
+        busy = _BUSY_SLOTS
+    return {"slots": slots, "busy": busy, "queued": _JOB_QUEUE.qsize(), "users": _JOB_QUEUE.depths()}
 
-def submit_job_request(job_id: str, job_context: Dict[str, Any], task_generator_func: Callable, process_func: Callable) -> None:
+def status_store_stats() -> Dict[str, Any]:
+    with _STATUS_LOCK:
+        _TASK_STORE.sweep()
+        return _TASK_STORE.stats()
+
+def submit_job_request(job_id: str, job_context: Dict[str, Any], task_generator_func: Callable, process_func: Callable, async_process_func: Optional[Callable] = None, deadline: Optional[deadlines.JobDeadline] = None, kind: Optional[str] = None) -> None:
     """
     Submit a job request to the queue. 
     The job will be processed asynchronously: Refine Prompt -> Generate Tasks -> Execute Tasks.
+    async_process_func (coroutine function) is used instead of process_func for parallel
+    execution when async_engine.enabled is set. `deadline` caps every upstream call of the job.
+    The job is queued under job_context["user_id"] with job_context["priority"] (interactive /
+    normal / bulk, default dispatcher.default_priority); its image count is its scheduling cost.
+    Jobs of a `kind` registered with job_store_service.register_kind are written to the jobs
+    table first, so they are run again if this process dies before they finish.
     """
+    user = job_context.get("user_id") or "-1"
+    priority = job_context.get("priority") or default_priority()
+    persisted = False
+    if kind and job_store.handlers(kind) and job_store.store_enabled():
+        try:
+            job_store.get_job_store().create(job_id, kind, job_context, user, priority, job_context.get("count", 1))
+            persisted = True
+        except Exception as e:
+            logger.error(f"persist job {job_id} failed, keeping it in memory only: {e}")
     with _STATUS_LOCK:
         _TASK_STORE[job_id] = TaskStatus(
             job_id=job_id,
             status="submitted",
-            total_tasks=job_context.get("count", 1)
+            total_tasks=job_context.get("count", 1),
+            deadline=deadline,
+            persisted=persisted,
         )
-    
+    _enqueue(job_id, job_context, task_generator_func, process_func, async_process_func, user, priority)
+
+def _enqueue(job_id, context, generator, processor, async_processor, user, priority, recovered=None) -> None:
     _JOB_QUEUE.put({
         "job_id": job_id,
-        "context": job_context,
-        "generator": task_generator_func,
-        "processor": process_func
-    })
+        "context": context,
+        "generator": generator,
+        "processor": processor,
+        "async_processor": async_processor,
+        "recovered": recovered or {},
+        "enqueued_at": time.monotonic(),
+    }, user=user, priority=priority, cost=context.get("count", 1))
+
+def _recover_job(row: Dict[str, Any], finished: Dict[int, Dict[str, Any]]) -> None:
+    """
+    Queue a job taken over from an expired lease. Tasks that already succeeded keep their
+    result; tasks the old process had already submitted to DashScope (upstream_tasks) are
+    collected by task_id instead of being generated again. upstream_task_service.resume_pending
+    leaves such jobs alone, so this is the only place they are recovered.
+    """
+    from backend.config import load_settings
+    generator, processor, async_processor = job_store.handlers(row["kind"])
+    context = row["context"]
+    job_id = row["job_id"]
+    recovered: Dict[int, Dict[str, Any]] = dict(finished)
+    for up in upstream_tasks.rows_for_job(job_id):
+        index = up.get("task_index")
+        if index is None or int(index) in recovered or up.get("status") == upstream_tasks.FAILED:
+            continue
+        recovered[int(index)] = {"upstream": up, "params": upstream_tasks.task_fields(up)}
+    # the old deadline died with the old process; the retry gets a fresh budget
+    deadline = deadlines.JobDeadline.from_config(load_settings().deadlines, context.get("deadline_seconds"))
+    with _STATUS_LOCK:
+        _TASK_STORE[job_id] = TaskStatus(
+            job_id=job_id,
+            status="submitted",
+            total_tasks=int(row.get("total_tasks") or context.get("count", 1)),
+            deadline=deadline,
+            persisted=True,
+        )
+    _enqueue(job_id, context, generator, processor, async_processor,
+             row.get("user_id") or "-1", row.get("priority") or default_priority(), recovered)
+
+def start_job_store() -> None:
+    """Start the batched writer and take over jobs left unfinished by a previous process."""
+    if job_store.store_enabled():
+        job_store.get_job_store().start(_recover_job)
+
+def _persist(job_id: str, final: bool = False) -> None:
+    """
+    Queue the job's current state for the next batched write to the jobs table. The final
+    write carries the results and starts the job's TTL in the in-memory status store.
+    """
+    with _STATUS_LOCK:
+        task = _TASK_STORE.get(job_id)
+        if task is None:
+            return
+        if final:
+            _TASK_STORE.mark_finished(job_id)
+        if not task.persisted:
+            return
+        fields = {"state": task.status, "total_tasks": task.total_tasks, "completed_tasks": task.completed_tasks}
+        if final:
+            fields["results"] = job_status.compact_results(task.results)
+    job_store.get_job_store().update(job_id, **fields)
+
+# task fields a recovered run reapplies to a task it does not run again
+_RECOVERY_FIELDS = (
+    "prompt", "negative_prompt", "seed", "temperature", "top_p",
+    "refined_positive", "refined_negative", "refined_positive_zh", "refined_negative_zh",
+    "inherited_prompt", "delta_ratio", "delta_engine",
+)
+
+def _persist_task(job_id: str, index: int, result: Any, task_params: Optional[Dict[str, Any]] = None) -> None:
+    with _STATUS_LOCK:
+        task = _TASK_STORE.get(job_id)
+        if task is None or not task.persisted:
+            return
+    params = {k: task_params[k] for k in _RECOVERY_FIELDS if k in task_params} if task_params else None
+    job_store.get_job_store().task_done(job_id, index, result, params)
+
+def _recovered_future(job_id: str, entry: Dict[str, Any], task_params: Dict[str, Any]) -> concurrent.futures.Future:
+    """Result of a task an interrupted run got to: saved, or collected from its DashScope task_id."""
+    task_params.update(entry.get("params") or {})
+    task_params.pop("chain_pending", None)
+    if "result" in entry:
+        done = concurrent.futures.Future()
+        done.set_result(entry["result"])
+        return done
+    ctx = contextvars.copy_context()
+    return _IMAGE_GEN_EXECUTOR.submit(ctx.run, _collect_recovered, job_id, entry["upstream"])
+
+def _collect_recovered(job_id: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    from backend.services.dashscope_client_service import DashScopeClient
+
+    token = job_metrics.bind(_job_timings(job_id))
+    deadline_token = deadlines.bind(_job_deadline(job_id))
+    try:
+        client = DashScopeClient()
+        return client.to_data_url_if_local(upstream_tasks.collect(row, client))
+    except Exception as e:
+        logger.error(f"collect task {row.get('task_id')} of job {job_id} failed: {e}")
+        return {"status": "failed", "message": str(e)}
+    finally:
+        deadlines.unbind(deadline_token)
+        job_metrics.unbind(token)
 
 def _job_dispatcher_loop():
     """
     Consumer loop that processes jobs from the queue.
     """
-    logger.info("Job Dispatcher started.")
+    global _BUSY_SLOTS
+    logger.info(f"Job Dispatcher started ({threading.current_thread().name}).")
     while True:
         try:
             item = _JOB_QUEUE.get()
@@ -66,16 +266,52 @@ def _job_dispatcher_loop():
             context = item["context"]
             generator_func = item["generator"]
             process_func = item["processor"]
+            async_process_func = item.get("async_processor")
+            timings = _job_timings(job_id)
+            if item.get("enqueued_at") is not None:
+                waited = time.monotonic() - item["enqueued_at"]
+                if timings is not None:
+                    timings.add("queue_wait", waited)
+                with _STATUS_LOCK:
+                    if job_id in _TASK_STORE:
+                        _TASK_STORE[job_id].queue_wait_s = waited
             
-            _process_job_lifecycle(job_id, context, generator_func, process_func)
+            with _DISPATCH_LOCK:
+                _BUSY_SLOTS += 1
+            try:
+                # the user's running slot is handed back below whatever the claim does
+                if _claim(job_id):
+                    _process_job_lifecycle(job_id, context, generator_func, process_func, async_process_func, item.get("recovered"))
+            finally:
+                with _DISPATCH_LOCK:
+                    _BUSY_SLOTS -= 1
+                _JOB_QUEUE.done(item)
             
             _JOB_QUEUE.task_done()
         except Exception as e:
             logger.error(f"Error in job dispatcher: {e}")
 
-def _process_job_lifecycle(job_id: str, context: Dict[str, Any], generator_func: Callable, process_func: Callable):
+def _claim(job_id: str) -> bool:
+    """Take the lease on a persisted job before running it; a failed claim fails the job."""
+    if not _is_persisted(job_id):
+        return True
+    try:
+        job_store.get_job_store().claim(job_id)
+        return True
+    except Exception as e:
+        logger.error(f"claim job {job_id} failed: {e}")
+        with _STATUS_LOCK:
+            if job_id in _TASK_STORE:
+                _TASK_STORE[job_id].status = "failed"
+                _TASK_STORE[job_id].results = [{"status": "failed", "message": f"claim failed: {e}"}]
+        _persist(job_id, final=True)
+        return False
+
+def _process_job_lifecycle(job_id: str, context: Dict[str, Any], generator_func: Callable, process_func: Callable, async_process_func: Optional[Callable] = None, recovered: Optional[Dict[int, Dict[str, Any]]] = None):
     """
     Handle the full lifecycle of a job: Refine -> Split -> Execute.
+    `recovered` maps task index -> {"result" or "upstream", "params"} for tasks a previous
+    (interrupted) run completed or had already submitted; see _recover_job.
     """
     logger.info(f"Starting lifecycle for job {job_id}")
     
@@ -83,10 +319,18 @@ def _process_job_lifecycle(job_id: str, context: Dict[str, Any], generator_func:
     with _STATUS_LOCK:
         if job_id in _TASK_STORE:
             _TASK_STORE[job_id].status = "processing"
+    _persist(job_id)
 
+    timings = _job_timings(job_id)
+    token = job_metrics.bind(timings)
+    deadline_token = deadlines.bind(_job_deadline(job_id))
     try:
+        if _cancel_requested(job_id):  # cancelled between leaving the queue and starting
+            raise deadlines.JobCancelled("queue")
         # 2. Generate Tasks (This includes synchronous Qwen call for prompt refinement)
         tasks = generator_func(context)
+        if _cancel_requested(job_id):
+            raise deadlines.JobCancelled("refine")
         
         if not tasks:
             raise ValueError("No tasks generated")
@@ -94,27 +338,65 @@ def _process_job_lifecycle(job_id: str, context: Dict[str, Any], generator_func:
         # Update total tasks count if changed (e.g. generator might return different count)
         with _STATUS_LOCK:
             if job_id in _TASK_STORE:
-                _TASK_STORE[job_id].total_tasks = len(tasks)
+                _TASK_STORE[job_id].total_tasks = sum(_task_images(t) for t in tasks)
                 _TASK_STORE[job_id].status = "running"
+        _persist(job_id)
 
         # 3. Execute Tasks (Parallel or Serial depending on config)
         from backend.config import load_settings
         s = load_settings()
         if bool(getattr(s, "enable_prompt_update_request", False)):
-            _execute_tasks_serial(job_id, tasks, process_func, context, s)
+            _execute_tasks_serial(job_id, tasks, process_func, context, s, recovered=recovered)
         else:
-            _execute_tasks_parallel(job_id, tasks, process_func, context)
+            _execute_tasks_parallel(job_id, tasks, process_func, context, async_process_func=async_process_func, recovered=recovered)
         
+    except deadlines.DeadlineExceeded as e:
+        cancelled = isinstance(e, deadlines.JobCancelled)
+        logger.error(f"Job {job_id} {'was cancelled' if cancelled else 'ran out of time'} during {e.stage}")
+        with _STATUS_LOCK:
+            if job_id in _TASK_STORE:
+                _TASK_STORE[job_id].status = "cancelled" if cancelled else "timeout"
+                _TASK_STORE[job_id].results = [e.as_result()]
+        _persist(job_id, final=True)
     except Exception as e:
         logger.error(f"Job {job_id} failed during lifecycle: {e}")
         with _STATUS_LOCK:
             if job_id in _TASK_STORE:
                 _TASK_STORE[job_id].status = "failed"
                 _TASK_STORE[job_id].results = [{"status": "failed", "message": str(e)}]
+        _persist(job_id, final=True)
+    finally:
+        deadlines.unbind(deadline_token)
+        job_metrics.unbind(token)
+        if timings is not None:
+            timings.finish()
+
+def _job_timings(job_id: str) -> Optional[job_metrics.JobTimings]:
+    with _STATUS_LOCK:
+        task = _TASK_STORE.get(job_id)
+        return task.timings if task else None
+
+def _is_persisted(job_id: str) -> bool:
+    with _STATUS_LOCK:
+        task = _TASK_STORE.get(job_id)
+        return bool(task and task.persisted)
+
+def _job_deadline(job_id: str) -> Optional[deadlines.JobDeadline]:
+    with _STATUS_LOCK:
+        task = _TASK_STORE.get(job_id)
+        return task.deadline if task else None
+
+def _final_status(results: List[Any]) -> str:
+    """"timeout" when the deadline cut the job short and nothing succeeded."""
+    statuses = [r.get("status") for r in results if isinstance(r, dict)]
+    if "timeout" in statuses and "success" not in statuses:
+        return "timeout"
+    return "completed"
 
-def _execute_tasks_parallel(job_id: str, tasks: List[Dict[str, Any]], process_func, context: Dict[str, Any]):
+def _execute_tasks_parallel(job_id: str, tasks: List[Dict[str, Any]], process_func, context: Dict[str, Any], async_process_func: Optional[Callable] = None, recovered: Optional[Dict[int, Dict[str, Any]]] = None):
     """
     Execute list of tasks using appropriate executor.
+    Tasks listed in `recovered` reuse their saved result or DashScope task instead of running again.
     """
     logger.info(f"Executing job {job_id} with {len(tasks)} tasks")
     
@@ -124,31 +406,49 @@ def _execute_tasks_parallel(job_id: str, tasks: List[Dict[str, Any]], process_fu
         if service in ["wan", "z_image"]:
             is_image_gen = True
     
+    engine = None
+    if is_image_gen and async_process_func is not None:
+        from backend.services.dashscope_async_client_service import async_engine_enabled, get_async_engine
+        if async_engine_enabled():
+            engine = get_async_engine()
+
     executor = _IMAGE_GEN_EXECUTOR if is_image_gen else _DEFAULT_EXECUTOR
-    executor_name = "ImageGen" if is_image_gen else "Default"
+    executor_name = "Async" if engine else ("ImageGen" if is_image_gen else "Default")
     logger.info(f"Job {job_id} using {executor_name} Executor")
     
+    # Image tasks pass through per-model admission (models.max_limit) before they
+    # reach the executor / async engine; queued tasks hold no thread while waiting and
+    # are admitted round robin per (priority, user), so other users' images interleave.
+    admission = get_model_admission() if is_image_gen else None
+    flow = _job_flow(context)
     futures = []
+    recovered = recovered or {}
     for i, task_params in enumerate(tasks):
-        futures.append(executor.submit(_process_single_task_wrapper, job_id, i, task_params, process_func))
+        if i in recovered:
+            fut = _recovered_future(job_id, recovered[i], task_params)
+            fut.add_done_callback(lambda f, i=i, tp=task_params: _step_done(job_id, i, f, _task_images(tp), tp))
+            futures.append(fut)
+            continue
+        if engine:
+            launch = lambda i=i, tp=task_params: engine.submit(_process_single_task_async(job_id, i, tp, async_process_func, context))
+        else:
+            launch = lambda i=i, tp=task_params: executor.submit(_process_single_task_wrapper, job_id, i, tp, process_func, context)
+        futures.append(admission.submit(_task_model(task_params), launch, flow, _task_images(task_params)) if admission else launch())
     
     concurrent.futures.wait(futures)
     
     # Collect results
     results = []
-    completed_count = 0
-    
     for f in futures:
         try:
-            res = f.result()
-            if isinstance(res, dict) and res.get("status") == "success" and res.get("url"):
-                results.append(res)
-                completed_count += 1
-            else:
-                results.append(res)
+            results.append(f.result())
         except Exception as e:
             logger.error(f"Task execution failed: {e}")
             results.append({"status": "failed", "message": str(e)})
+    # Batched (n>1) tasks come back as one result carrying several images: split them
+    # into one task / result per image so status, progress and record items stay per image.
+    tasks, results = _fan_out_batches(tasks, results)
+    completed_count = sum(1 for r in results if isinstance(r, dict) and r.get("status") == "success" and r.get("url"))
 
     # Update final status
     with _STATUS_LOCK:
@@ -156,12 +456,12 @@ def _execute_tasks_parallel(job_id: str, tasks: List[Dict[str, Any]], process_fu
             task_status = _TASK_STORE[job_id]
             task_status.results = results
             task_status.completed_tasks = len(tasks)
-            task_status.status = "completed"
+            task_status.status = "cancelled" if task_status.cancel_requested else _final_status(results)
+    _persist(job_id, final=True)
  
     logger.info(f"Job {job_id} completed. Success: {completed_count}/{len(tasks)}")
     try:
         # Assemble record items and meta
-        from backend.services.record_service import RecordService
         # Prefer refined prompts from first task
         refined_pos = None
         refined_neg = None
@@ -213,7 +513,7 @@ def _execute_tasks_parallel(job_id: str, tasks: List[Dict[str, Any]], process_fu
                     "relative_url": rel_url,
                     "absolute_path": abs_path,
                 })
-        if not items:
+        if not items and not _cancel_requested(job_id):
             try:
                 # Fallback: scan output directory for latest files in category
                 cat = safe_dir_name(context.get("category", "default"))
@@ -254,20 +554,29 @@ def _execute_tasks_parallel(job_id: str, tasks: List[Dict[str, Any]], process_fu
             "resolution": context.get("resolution"),
             "count": context.get("count", len(tasks)),
             "model": model_name,
+            "status": "cancelled" if _cancel_requested(job_id) else "completed",
         }
         logger.info(f"Job {job_id} record items collected: {len(items)}")
-        RecordService.instance().add_record(job_meta, items, job_id=job_id)
+        with job_metrics.job_stage("add_record"):
+            _add_record(job_meta, items, job_id)
+        upstream_tasks.forget_job(job_id)
     except Exception as e:
         logger.error(f"record write failed for job {job_id}: {e}")
 
-def _execute_tasks_serial(job_id: str, tasks: List[Dict[str, Any]], process_func, context: Dict[str, Any], settings):
+def _execute_tasks_serial(job_id: str, tasks: List[Dict[str, Any]], process_func, context: Dict[str, Any], settings, recovered: Optional[Dict[int, Dict[str, Any]]] = None):
     """
-    Execute tasks strictly one by one with dependency on previous refined prompt.
-    Ensures two or more Qwen requests appear in logs when inheritance is enabled.
+    Execute an inherited prompt chain as a pipeline: step i's prompt is a delta of step i-1's
+    refined prompt, so the Qwen chain runs one step at a time while each step's image is
+    generated in the background (admitted against the model's concurrency limit).
+    Deltas the generator left pending are computed here exactly once. Steps listed in
+    `recovered` keep their saved prompt and result (or DashScope task), and the chain
+    continues from that prompt. Steps cut off by the deadline or a cancel end as
+    timeout / cancelled, as in the parallel path.
     """
-    logger.info(f"Executing job {job_id} in SERIAL mode with {len(tasks)} tasks")
+    logger.info(f"Executing job {job_id} in SERIAL (pipelined) mode with {len(tasks)} tasks")
+    futures: List[concurrent.futures.Future] = []
     results = []
-    completed_count = 0
+    recovered = recovered or {}
     try:
         from backend.services.dashscope_client_service import DashScopeClient
         client = DashScopeClient(settings=settings)
@@ -275,20 +584,41 @@ def _execute_tasks_serial(job_id: str, tasks: List[Dict[str, Any]], process_func
         default_negative = settings.prompts.get("default_negative_prompt", "")
         current_negative = context.get("negative_prompt") or default_negative
         role = settings.role
+        engine = prompt_variation.select_engine(context.get("delta_engine"), settings)
         for i, t in enumerate(tasks):
-            if i >= 1:
+            if _cancel_requested(job_id):
+                logger.info(f"Job {job_id} cancelled after {i} of {len(tasks)} steps")
+                results.extend(dict(_CANCELLED_RESULT) for _ in tasks[i:])
+                break
+            if i in recovered:
+                fut = _recovered_future(job_id, recovered[i], t)
+                fut.add_done_callback(lambda f, i=i, n=_task_images(t), tp=t: _step_done(job_id, i, f, n, tp))
+                futures.append(fut)
+                continue
+            if i >= 1 and t.pop("chain_pending", False):
                 # Build next prompt based on previous refined positive
                 prev_pos = tasks[i-1].get("refined_positive") or tasks[i-1].get("prompt") or context.get("prompt")
-                delta_ratio = float(getattr(settings, "prompt_delta_ratio", 0.1))
-                print(f"[serial_chain] job={job_id} step={i} base_prev_pos={str(prev_pos)[:120]} delta_ratio={delta_ratio}")
-                refined2 = client.refine_prompt_with_delta(
-                    base_positive=prev_pos or "",
-                    category=context.get("category", ""),
-                    default_style=default_style,
-                    default_negative_prompt=current_negative,
-                    role=role,
-                    change_ratio=delta_ratio
-                )
+                delta_ratio = float(t.get("delta_ratio") or getattr(settings, "prompt_delta_ratio", 0.1))
+                print(f"[serial_chain] job={job_id} step={i} engine={engine} base_prev_pos={str(prev_pos)[:120]} delta_ratio={delta_ratio}")
+                if engine == "local":
+                    # deterministic local modifiers: no Qwen round trip after the first image
+                    refined2 = prompt_variation.vary(
+                        prev_pos or "",
+                        context.get("category", ""),
+                        change_ratio=delta_ratio,
+                        seed=t.get("seed"),
+                        negative_prompt=tasks[i-1].get("refined_negative") or current_negative,
+                        settings=settings,
+                    )
+                else:
+                    refined2 = client.refine_prompt_with_delta(
+                        base_positive=prev_pos or "",
+                        category=context.get("category", ""),
+                        default_style=default_style,
+                        default_negative_prompt=current_negative,
+                        role=role,
+                        change_ratio=delta_ratio
+                    )
                 t["prompt"] = refined2["positive_prompt"]
                 t["negative_prompt"] = refined2["negative_prompt"]
                 t["refined_positive"] = refined2["positive_prompt"]
@@ -297,27 +627,43 @@ def _execute_tasks_serial(job_id: str, tasks: List[Dict[str, Any]], process_func
                 t["refined_negative_zh"] = refined2.get("negative_prompt_zh")
                 t["inherited_prompt"] = True
                 t["delta_ratio"] = delta_ratio
-            # Execute
-            res = process_func(t)
-            results.append(res)
-            completed_count += 1
-            with _STATUS_LOCK:
-                if job_id in _TASK_STORE:
-                    _TASK_STORE[job_id].completed_tasks += 1
-        logger.info(f"Job {job_id} SERIAL completed. Success: {sum(1 for r in results if isinstance(r, dict) and r.get('status')=='success')}/{len(tasks)}")
+                t["delta_engine"] = engine
+            # Start this step's image and move on to the next delta without waiting for it
+            token = upstream_tasks.bind(job_id, i, t, context)
+            try:
+                fut = _submit_admitted(t, process_func, job_id, _job_flow(context))
+            finally:
+                upstream_tasks.unbind(token)
+            fut.add_done_callback(lambda f, i=i, n=_task_images(t), tp=t: _step_done(job_id, i, f, n, tp))
+            futures.append(fut)
+    except deadlines.DeadlineExceeded as e:
+        # the chain stopped at this step: it and every later step end as timeout / cancelled
+        logger.error(f"Serial chain of job {job_id} stopped during {e.stage}: {e}")
+        results.extend(e.as_result() for _ in tasks[len(futures):])
     except Exception as e:
         logger.error(f"Serial execution failed for job {job_id}: {e}")
         results.append({"status": "failed", "message": str(e)})
+    step_results = []
+    for fut in futures:
+        try:
+            step_results.append(fut.result())
+        except deadlines.DeadlineExceeded as e:
+            step_results.append(e.as_result())
+        except Exception as e:
+            logger.error(f"Task failed in job {job_id}: {e}")
+            step_results.append({"status": "failed", "message": str(e)})
+    results = step_results + results
+    logger.info(f"Job {job_id} SERIAL completed. Success: {sum(1 for r in results if isinstance(r, dict) and r.get('status')=='success')}/{len(tasks)}")
     # Update final status
     with _STATUS_LOCK:
         if job_id in _TASK_STORE:
             task_status = _TASK_STORE[job_id]
             task_status.results = results
             task_status.completed_tasks = len(tasks)
-            task_status.status = "completed"
+            task_status.status = "cancelled" if task_status.cancel_requested else _final_status(results)
+    _persist(job_id, final=True)
     # Persist record
     try:
-        from backend.services.record_service import RecordService
         from backend.config import load_settings
         from backend.utils import decode_image_id, encode_image_id, safe_dir_name, safe_join
         out_dir = load_settings().output_dir
@@ -366,11 +712,148 @@ def _execute_tasks_serial(job_id: str, tasks: List[Dict[str, Any]], process_func
             "resolution": context.get("resolution"),
             "count": context.get("count", len(tasks)),
             "model": tasks[0].get("model") or "",
+            "status": "cancelled" if _cancel_requested(job_id) else "completed",
         }
-        RecordService.instance().add_record(job_meta, items, job_id=job_id)
+        with job_metrics.job_stage("add_record"):
+            _add_record(job_meta, items, job_id)
+        upstream_tasks.forget_job(job_id)
     except Exception as e:
         logger.error(f"record write failed for job {job_id} (serial): {e}")
 
+def _add_record(job_meta: Dict[str, Any], items: List[Dict[str, Any]], job_id: str) -> None:
+    """Write the record; zh prompts still being translated in the background are filled in afterwards."""
+    from backend.services.record_service import RecordService
+    from backend.services.zh_enrichment_service import enrichment_enabled, get_zh_enrichment
+
+    pos, neg = job_meta.get("refined_positive") or "", job_meta.get("refined_negative") or ""
+    missing = not job_meta.get("refined_positive_zh") or not job_meta.get("refined_negative_zh")
+    if missing and enrichment_enabled():
+        enrichment = get_zh_enrichment()
+        known = enrichment.lookup(pos, neg)
+        if known is not None:
+            job_meta["refined_positive_zh"] = job_meta.get("refined_positive_zh") or known[0]
+            job_meta["refined_negative_zh"] = job_meta.get("refined_negative_zh") or known[1]
+            missing = False
+        RecordService.instance().add_record(job_meta, items, job_id=job_id)
+        if missing:
+            enrichment.backfill_job(job_id, pos, neg)
+        return
+    RecordService.instance().add_record(job_meta, items, job_id=job_id)
+
+def _task_images(tp: Dict[str, Any]) -> int:
+    try:
+        return max(1, int(tp.get("n") or 1))
+    except (TypeError, ValueError):
+        return 1
+
+def _fan_out_batches(tasks: List[Dict[str, Any]], results: List[Any]):
+    out_tasks: List[Dict[str, Any]] = []
+    out_results: List[Any] = []
+    for t, r in zip(tasks, results):
+        n = _task_images(t)
+        if n == 1:
+            out_tasks.append(t)
+            out_results.append(r)
+            continue
+        images = r.get("images") if isinstance(r, dict) and r.get("status") == "success" else None
+        if not images and isinstance(r, dict) and r.get("status") == "success":
+            images = [{k: v for k, v in r.items() if k != "images"}]
+        for i in range(n):
+            single = dict(t)
+            single.pop("n", None)
+            if isinstance(t.get("seed"), int):
+                # DashScope numbers the images of one request seed, seed+1, ...
+                single["seed"] = t["seed"] + i
+            single["batch_index"] = i
+            out_tasks.append(single)
+            if images is None:
+                out_results.append(r)
+            elif i < len(images):
+                out_results.append(images[i])
+            else:
+                out_results.append({"status": "failed", "message": f"upstream returned {len(images)} of {n} images"})
+    return out_tasks, out_results
+
+def _task_model(tp: Dict[str, Any]) -> str:
+    model = tp.get("model")
+    if model:
+        return model
+    from backend.config import load_settings
+    models = load_settings().models
+    if tp.get("service") == "z_image":
+        return models.get("z_image", "z-image-turbo")
+    return models.get("wan", "wan2.6-t2i")
+
+def _job_flow(context: Dict[str, Any]) -> fair_queue.Flow:
+    """(priority, user) the job's image tasks are admitted under; the same flow as its queue entry."""
+    return fair_queue.normalize_priority(context.get("priority") or default_priority()), str(context.get("user_id") or "-1")
+
+def _submit_admitted(task_params: Dict[str, Any], process_func, job_id: Optional[str] = None, flow: Optional[fair_queue.Flow] = None) -> concurrent.futures.Future:
+    """Queue one image task on the image executor for when its model has a free slot."""
+    ctx = contextvars.copy_context()  # carry the job's stage timings into the worker thread
+
+    def launch():
+        if job_id is not None and _cancel_requested(job_id):
+            # admitted after a cancel: hand the slot straight back instead of generating
+            done = concurrent.futures.Future()
+            done.set_result(dict(_CANCELLED_RESULT))
+            return done
+        return _IMAGE_GEN_EXECUTOR.submit(ctx.run, process_func, task_params)
+
+    return get_model_admission().submit(_task_model(task_params), launch, flow, _task_images(task_params))
+
+def _count_completed(job_id: str, images: int) -> None:
+    with _STATUS_LOCK:
+        if job_id in _TASK_STORE:
+            _TASK_STORE[job_id].completed_tasks += images
+
+_CANCELLED_RESULT = {"status": "cancelled", "message": "job cancelled"}
+
+def _cancel_requested(job_id: str) -> bool:
+    with _STATUS_LOCK:
+        task = _TASK_STORE.get(job_id)
+        return bool(task and task.cancel_requested)
+
+def cancel_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Cancel a job: a queued job is removed and ends as "cancelled" right away. For a running job,
+    tasks not yet started are skipped, the job's in-flight DashScope polls are stopped (the
+    client also asks DashScope to cancel the task), and the job ends as "cancelled" once the
+    images already in progress settle; successful images are still written to its record.
+    Returns None for unknown jobs.
+    """
+    from backend.services.task_poller_service import get_task_poller
+
+    with _STATUS_LOCK:
+        task = _TASK_STORE.get(job_id)
+        if task is None:
+            return None
+        if task.status in FINAL_STATES:
+            return {"job_id": job_id, "status": task.status, "cancelled": False, "message": f"job already {task.status}"}
+        task.cancel_requested = True
+        if task.deadline is not None:
+            task.deadline.cancel()  # every later upstream call of the job raises JobCancelled
+    item = _JOB_QUEUE.remove(job_id)
+    if item is not None:
+        with _STATUS_LOCK:
+            task.status = "cancelled"
+            task.results = []
+        _persist(job_id, final=True)
+        logger.info(f"Job {job_id} cancelled while queued")
+        return {"job_id": job_id, "status": "cancelled", "cancelled": True, "removed_from_queue": True, "stopped_polls": 0}
+    stopped = 0
+    poller = get_task_poller()
+    for task_id in upstream_tasks.pending_task_ids(job_id):
+        if poller.cancel(task_id, deadlines.JobCancelled("poll")):
+            stopped += 1
+    logger.info(f"Job {job_id} cancel requested while {task.status}; stopped {stopped} polls")
+    return {"job_id": job_id, "status": task.status, "cancelled": True, "removed_from_queue": False, "stopped_polls": stopped}
+
+def _step_done(job_id: str, index: int, fut: concurrent.futures.Future, images: int, task_params: Optional[Dict[str, Any]] = None) -> None:
+    _count_completed(job_id, images)
+    if fut.exception() is None:
+        _persist_task(job_id, index, fut.result(), task_params)
+
 # Deprecated: Old submit_job for compatibility if needed, but we will replace usages
 def submit_job(job_id: str, tasks: List[Dict[str, Any]], process_func) -> None:
     """Legacy submit, wraps into new flow"""
@@ -379,36 +862,128 @@ def submit_job(job_id: str, tasks: List[Dict[str, Any]], process_func) -> None:
 
 # ... _process_single_task_wrapper and get_job_status remain same ...
 
-def _process_single_task_wrapper(job_id: str, index: int, task_params: Dict[str, Any], process_func):
+def _process_single_task_wrapper(job_id: str, index: int, task_params: Dict[str, Any], process_func, context: Optional[Dict[str, Any]] = None):
+    token = job_metrics.bind(_job_timings(job_id))
+    deadline_token = deadlines.bind(_job_deadline(job_id))
+    upstream_token = upstream_tasks.bind(job_id, index, task_params, context)
+    result = None
     try:
+        if _cancel_requested(job_id):
+            result = dict(_CANCELLED_RESULT)
+            return result
         # Execute the task
         result = process_func(task_params)
         return result
     except Exception as e:
         logger.error(f"Task failed in job {job_id}: {e}")
-        return {"status": "failed", "message": str(e)}
+        result = {"status": "failed", "message": str(e)}
+        return result
     finally:
+        _persist_task(job_id, index, result, task_params)
+        upstream_tasks.unbind(upstream_token)
+        deadlines.unbind(deadline_token)
+        job_metrics.unbind(token)
         # Update progress after task is done (success or fail)
         with _STATUS_LOCK:
             if job_id in _TASK_STORE:
-                _TASK_STORE[job_id].completed_tasks += 1
+                _TASK_STORE[job_id].completed_tasks += _task_images(task_params)
+
+async def _process_single_task_async(job_id: str, index: int, task_params: Dict[str, Any], async_process_func, context: Optional[Dict[str, Any]] = None):
+    # the coroutine runs in its own asyncio Task context, so binding here stays local to it
+    job_metrics.bind(_job_timings(job_id))
+    deadlines.bind(_job_deadline(job_id))
+    upstream_tasks.bind(job_id, index, task_params, context)
+    result = None
+    try:
+        if _cancel_requested(job_id):
+            result = dict(_CANCELLED_RESULT)
+            return result
+        result = await async_process_func(task_params)
+        return result
+    except Exception as e:
+        logger.error(f"Task failed in job {job_id}: {e}")
+        result = {"status": "failed", "message": str(e)}
+        return result
+    finally:
+        _persist_task(job_id, index, result, task_params)
+        with _STATUS_LOCK:
+            if job_id in _TASK_STORE:
+                _TASK_STORE[job_id].completed_tasks += _task_images(task_params)
 
 def get_job_status(job_id: str) -> Dict[str, Any]:
     with _STATUS_LOCK:
         task = _TASK_STORE.get(job_id)
-        if not task:
-            return None
-        
-        # Clone data to avoid race conditions during read? 
-        # For simple fields it's fine, results list reference is ok.
-        return {
-            "job_id": task.job_id,
-            "ready": task.status in ["completed", "failed"],
-            "status": task.status,
-            "progress": {
-                "total": task.total_tasks,
-                "completed": task.completed_tasks,
-                "percent": int((task.completed_tasks / task.total_tasks) * 100) if task.total_tasks > 0 else 0
-            },
-            "results": task.results
-        }
+        if task:
+            return _live_job_status(task)
+    # evicted or unknown: the database fallback runs outside the lock workers update progress under
+    return _stored_job_status(job_id)
+
+def _live_job_status(task: TaskStatus) -> Dict[str, Any]:
+    # caller holds _STATUS_LOCK; the results list is handed out by reference
+    return {
+        "job_id": task.job_id,
+        "ready": task.status in FINAL_STATES,
+        "cancel_requested": task.cancel_requested,
+        "status": task.status,
+        "progress": {
+            "total": task.total_tasks,
+            "completed": task.completed_tasks,
+            "percent": int((task.completed_tasks / task.total_tasks) * 100) if task.total_tasks > 0 else 0
+        },
+        "results": task.results,
+        "timings": task.timings.summary() if task.timings else None,
+        "queue_wait_ms": round(task.queue_wait_s * 1000, 1) if task.queue_wait_s is not None else None,
+        # jobs ahead of this one from the same user and priority while it is still queued
+        "queue_position": _JOB_QUEUE.position(task.job_id) if task.status == "submitted" else None,
+        "deadline": task.deadline.summary() if task.deadline else None,
+        # first stage that ran out of time (refine / submit / poll / download), else None
+        "timeout_stage": task.deadline.timed_out_stage if task.deadline else None,
+    }
+
+def _stored_job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Status of a job this process does not hold (evicted after task_status.ttl_seconds, finished
+    before a restart, or owned elsewhere): the jobs table first, then the job's record.
+    """
+    row = None
+    try:
+        if job_store.store_enabled():
+            row = job_store.get_job_store().load(job_id)
+        if row is None:
+            row = _record_job_row(job_id)
+    except Exception as e:
+        logger.error(f"load job {job_id} failed: {e}")
+        return None
+    if row is None:
+        return None
+    total = int(row.get("total_tasks") or 0)
+    completed = int(row.get("completed_tasks") or 0)
+    return {
+        "job_id": job_id,
+        "ready": row.get("state") in FINAL_STATES,
+        "cancel_requested": row.get("state") == "cancelled",
+        "status": row.get("state"),
+        "progress": {
+            "total": total,
+            "completed": completed,
+            "percent": int((completed / total) * 100) if total > 0 else 0
+        },
+        "results": row.get("results") or [],
+        "timings": None,
+        "queue_wait_ms": None,
+        "queue_position": None,
+        "deadline": None,
+        "timeout_stage": None,
+    }
+
+def _record_job_row(job_id: str) -> Optional[Dict[str, Any]]:
+    from backend.db.repositories import ItemsRepo, RecordsRepo
+
+    record = RecordsRepo().by_job_id(job_id)
+    if record is None:
+        return None
+    items = ItemsRepo().list(record["id"], max(int(record.get("item_count") or 0), int(record.get("count") or 0), 1), 0)
+    results = job_status.results_from_record(list(reversed(items)))
+    total = int(record.get("count") or len(results))
+    return {"state": record.get("status") or "completed", "total_tasks": total, "completed_tasks": total, "results": results}
+
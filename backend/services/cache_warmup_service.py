@@ -0,0 +1,166 @@
+"""
+/**
+ * @file backend/services/cache_warmup_service.py
+ * @description 提示词优化缓存预热：启动及配置重载后，按已配置的分类提示词（prompts_map / prompts 表）与
+ *              当前 global 风格、负向提示词，拼出与前端一致的请求提示词并预先调用 refine_prompt，
+ *              结果（含中文翻译）进入共享的 refine 缓存。并发数受限，进度经 /health 输出。
+ */
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.config import load_settings
+from backend.services.prompt_cache_service import get_refine_cache, make_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 2
+# the gallery page's defaults; the prompt text includes them, so they are part of the cache key
+DEFAULT_VARIANTS = [{"aspect_ratio": "16:9", "resolution": "1080p"}]
+
+Job = Tuple[str, str, str]  # (category, prompt, negative)
+
+
+def compose_prompt(category: str, category_prompt: str, common_subject: str, global_style: str,
+                   aspect_ratio: str = "", resolution: str = "") -> str:
+    """Same text the frontend sends to /api/generate (see services/geminiService.ts generateImage)."""
+    prompt = ", ".join(s for s in (category, common_subject, category_prompt) if s and s.strip())
+    style = (global_style or "").strip()
+    if style:
+        prompt += f". {style}" if style.lower().startswith("style:") else f". Style: {style}"
+    params = []
+    if aspect_ratio:
+        params.append(f"Aspect Ratio: {aspect_ratio}")
+    if resolution:
+        params.append(f"Resolution: {resolution}")
+    if params:
+        prompt += f" - {', '.join(params)}"
+    return prompt
+
+
+def plan(settings=None) -> List[Job]:
+    """Refinement inputs for every configured category and variant."""
+    from backend.services.runtime_config_service import get_runtime_config
+
+    settings = settings or load_settings()
+    runtime = get_runtime_config()
+    glob = runtime.get("global") or {}
+    prompts = runtime.get("prompts") or {}
+    categories = list(runtime.get("categories") or []) or list(prompts)
+    negative = glob.get("negative_prompt") or settings.prompts.get("default_negative_prompt", "")
+    variants = settings.cache_warmup.get("variants")
+    if not isinstance(variants, list) or not variants:
+        variants = DEFAULT_VARIANTS
+    jobs: List[Job] = []
+    for category in categories:
+        for v in variants:
+            if not isinstance(v, dict):
+                continue
+            prompt = compose_prompt(category, prompts.get(category, ""), glob.get("common_subject", ""),
+                                    glob.get("global_style", ""), v.get("aspect_ratio", ""), v.get("resolution", ""))
+            jobs.append((category, prompt, negative))
+    return list(dict.fromkeys(jobs))
+
+
+class CacheWarmup:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._rerun = False
+        self._progress: Dict[str, Any] = {"state": "idle", "runs": 0}
+
+    def start(self, reason: str = "startup") -> bool:
+        """Warm up in the background; a request while running schedules one more pass afterwards."""
+        if not load_settings().cache_warmup.get("enabled", False):
+            return False
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._rerun = True
+                return True
+            self._thread = threading.Thread(target=self._loop, args=(reason,), daemon=True, name="cache-warmup")
+            self._thread.start()
+        return True
+
+    def _loop(self, reason: str) -> None:
+        while True:
+            try:
+                self.run(reason)
+            except Exception as e:
+                logger.error(f"cache warm-up failed: {e}")
+                self._update(state="failed", error=str(e))
+            with self._lock:
+                if not self._rerun:
+                    return
+                self._rerun = False
+            reason = "config reload"
+
+    def _update(self, **fields: Any) -> None:
+        with self._lock:
+            self._progress.update(fields)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._progress[name] += 1
+            self._progress["done"] += 1
+
+    def run(self, reason: str = "manual", client=None) -> Dict[str, Any]:
+        from backend.services.dashscope_client_service import DashScopeClient
+
+        settings = load_settings()
+        cfg = settings.cache_warmup
+        client = client or DashScopeClient(settings=settings)
+        jobs = plan(settings)
+        qwen_model = settings.models.get("qwen", "qwen-max")
+        default_style = settings.prompts.get("default_style", "")
+        role = settings.role
+        with self._lock:
+            self._progress.update({
+                "state": "running", "reason": reason, "total": len(jobs), "done": 0,
+                "cached": 0, "refined": 0, "failed": 0, "started_at": time.time(), "finished_at": None,
+            })
+            self._progress["runs"] += 1
+        logger.info(f"cache warm-up ({reason}): {len(jobs)} prompts")
+        cache = get_refine_cache()
+
+        def warm(job: Job) -> None:
+            category, prompt, negative = job
+            if cache.get(make_key(prompt, category, default_style, negative, role or "", qwen_model)) is not None:
+                self._count("cached")
+                return
+            refined = client.refine_prompt(prompt, category, default_style, negative, role)
+            # refine_prompt falls back to the original prompt (uncached) when Qwen fails
+            self._count("refined" if refined.get("positive_prompt") != prompt else "failed")
+
+        workers = max(1, int(cfg.get("concurrency", DEFAULT_CONCURRENCY)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup") as pool:
+            for f in concurrent.futures.as_completed([pool.submit(warm, j) for j in jobs]):
+                try:
+                    f.result()
+                except Exception as e:
+                    logger.warning(f"cache warm-up item failed: {e}")
+                    self._count("failed")
+                p = self.progress()
+                logger.info(f"cache warm-up progress {p['done']}/{p['total']}")
+        self._update(state="done", finished_at=time.time())
+        return self.progress()
+
+    def progress(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._progress)
+
+
+_WARMUP = CacheWarmup()
+
+
+def get_cache_warmup() -> CacheWarmup:
+    return _WARMUP
+
+
+def start_warmup(reason: str = "startup") -> bool:
+    return _WARMUP.start(reason)
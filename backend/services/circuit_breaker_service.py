@@ -0,0 +1,266 @@
+"""
+/**
+ * @file backend/services/circuit_breaker_service.py
+ * @description 上游熔断器：按 endpoints 键（qwen / wan / z_image / tasks）统计滑动窗口内的错误率与慢调用率，
+ *              超阈值后熔断并立即失败，冷却期过后以半开状态放行少量探测请求决定恢复或继续熔断。
+ *              因调用方作业自身截止时间缩短超时或取消而中断的调用不计入统计。
+ */
+"""
+
+from __future__ import annotations
+
+import collections
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from backend.config import load_settings
+from backend.services import deadline_service as deadlines
+
+
+logger = logging.getLogger("circuit_breaker")
+
+ENDPOINT_KEYS = ("qwen", "wan", "z_image", "tasks")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_WINDOW = 20
+DEFAULT_MIN_CALLS = 5
+DEFAULT_ERROR_RATE = 0.5
+DEFAULT_SLOW_CALL_SECONDS = 30.0
+DEFAULT_SLOW_RATE = 0.8
+DEFAULT_OPEN_SECONDS = 30.0
+DEFAULT_HALF_OPEN_CALLS = 1
+# a timeout this close to the caller's job deadline was cut short by that deadline, not upstream
+DEADLINE_SLACK_SECONDS = 1.0
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"upstream '{endpoint}' circuit open, retry in {retry_in:.1f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+    def as_result(self) -> Dict[str, Any]:
+        return {"status": "circuit_open", "endpoint": self.endpoint, "retry_in": round(self.retry_in, 1), "message": str(self)}
+
+
+def is_failure_response(resp: Any) -> bool:
+    """5xx answers count against the breaker; 429 is rate limiting, not an outage."""
+    code = getattr(resp, "status_code", None)
+    return code is not None and code >= 500
+
+
+def cut_short_by_caller(exc: BaseException) -> bool:
+    """The call ended on the caller's own deadline / cancel, which says nothing about upstream health."""
+    if isinstance(exc, deadlines.DeadlineExceeded):
+        return True
+    d = deadlines.current()
+    if d is None or not deadlines.is_timeout_error(exc):
+        return False
+    return d.cancelled or d.remaining() <= DEADLINE_SLACK_SECONDS
+
+
+class CircuitBreaker:
+    """
+    Sliding window over the last `window` calls. Trips to OPEN when, with at least
+    `min_calls` samples, the failure ratio reaches `error_rate` or the ratio of calls
+    slower than `slow_call_seconds` reaches `slow_rate`. After `open_seconds` up to
+    `half_open_calls` probes are let through; one clean probe closes the circuit,
+    a failed or slow one re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = DEFAULT_WINDOW,
+        min_calls: int = DEFAULT_MIN_CALLS,
+        error_rate: float = DEFAULT_ERROR_RATE,
+        slow_call_seconds: float = DEFAULT_SLOW_CALL_SECONDS,
+        slow_rate: float = DEFAULT_SLOW_RATE,
+        open_seconds: float = DEFAULT_OPEN_SECONDS,
+        half_open_calls: int = DEFAULT_HALF_OPEN_CALLS,
+    ):
+        self.name = name
+        self.min_calls = max(1, int(min_calls))
+        self.error_rate = float(error_rate)
+        self.slow_call_seconds = float(slow_call_seconds)
+        self.slow_rate = float(slow_rate)
+        self.open_seconds = max(0.0, float(open_seconds))
+        self.half_open_calls = max(1, int(half_open_calls))
+        self._outcomes: Deque[Tuple[bool, bool]] = collections.deque(maxlen=max(1, int(window)))
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self._rejected = 0
+        self._opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _maybe_half_open(self, now: float) -> None:
+        # caller holds self._lock
+        if self._state == OPEN and now >= self._opened_at + self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+            logger.info(f"circuit {self.name} half-open")
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError instead of letting the call through."""
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+            if self._state == OPEN:
+                self._rejected += 1
+                raise CircuitOpenError(self.name, self._opened_at + self.open_seconds - now)
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    self._rejected += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self._probes += 1
+
+    def record(self, ok: bool, elapsed: float) -> None:
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if ok and not slow:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    logger.info(f"circuit {self.name} closed")
+                else:
+                    self._trip()
+                return
+            if self._state == OPEN:
+                return
+            self._outcomes.append((not ok, slow))
+            n = len(self._outcomes)
+            if n < self.min_calls:
+                return
+            failures = sum(1 for failed, _ in self._outcomes if failed)
+            slows = sum(1 for _, s in self._outcomes if s)
+            if failures / n >= self.error_rate or slows / n >= self.slow_rate:
+                self._trip()
+
+    def release(self) -> None:
+        """End a call without an outcome: hands back a half-open probe slot, records nothing."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def _trip(self) -> None:
+        # caller holds self._lock
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._opened += 1
+        self._outcomes.clear()
+        logger.warning(f"circuit {self.name} opened for {self.open_seconds}s")
+
+    def _failed(self, exc: BaseException, start: float) -> None:
+        if cut_short_by_caller(exc):
+            self.release()
+        else:
+            self.record(False, time.monotonic() - start)
+
+    def call(self, fn: Callable[[], Any], is_failure: Callable[[Any], bool] = is_failure_response) -> Any:
+        self.before_call()
+        start = time.monotonic()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._failed(e, start)
+            raise
+        self.record(not is_failure(result), time.monotonic() - start)
+        return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], is_failure: Callable[[Any], bool] = is_failure_response) -> Any:
+        self.before_call()
+        start = time.monotonic()
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._failed(e, start)
+            raise
+        self.record(not is_failure(result), time.monotonic() - start)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            n = len(self._outcomes)
+            return {
+                "state": self._state,
+                "calls_in_window": n,
+                "error_rate": round(sum(1 for f, _ in self._outcomes if f) / n, 3) if n else 0.0,
+                "slow_rate": round(sum(1 for _, s in self._outcomes if s) / n, 3) if n else 0.0,
+                "times_opened": self._opened,
+                "rejected": self._rejected,
+            }
+
+
+class CircuitBreakerRegistry:
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None):
+        self.cfg = cfg or {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def _options(self, name: str) -> Dict[str, Any]:
+        opts = {k: v for k, v in self.cfg.items() if not isinstance(v, dict)}
+        override = self.cfg.get(name)
+        if isinstance(override, dict):
+            opts.update(override)
+        return opts
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            b = self._breakers.get(name)
+            if b is None:
+                o = self._options(name)
+                b = self._breakers[name] = CircuitBreaker(
+                    name,
+                    window=o.get("window", DEFAULT_WINDOW),
+                    min_calls=o.get("min_calls", DEFAULT_MIN_CALLS),
+                    error_rate=o.get("error_rate", DEFAULT_ERROR_RATE),
+                    slow_call_seconds=o.get("slow_call_seconds", DEFAULT_SLOW_CALL_SECONDS),
+                    slow_rate=o.get("slow_rate", DEFAULT_SLOW_RATE),
+                    open_seconds=o.get("open_seconds", DEFAULT_OPEN_SECONDS),
+                    half_open_calls=o.get("half_open_calls", DEFAULT_HALF_OPEN_CALLS),
+                )
+            return b
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: self.get(name).stats() for name in ENDPOINT_KEYS}
+
+
+_REGISTRY: Optional[CircuitBreakerRegistry] = None
+_REGISTRY_CFG: Optional[str] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_circuit_breakers() -> CircuitBreakerRegistry:
+    """Shared registry; rebuilt (all circuits closed) when circuit_breaker settings change."""
+    global _REGISTRY, _REGISTRY_CFG
+    cfg = load_settings().circuit_breaker
+    sig = repr(sorted(cfg.items()))
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None or sig != _REGISTRY_CFG:
+            _REGISTRY = CircuitBreakerRegistry(cfg)
+            _REGISTRY_CFG = sig
+        return _REGISTRY
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    return get_circuit_breakers().get(name)
@@ -0,0 +1,287 @@
+"""
+/**
+ * @file backend/services/dashscope_async_client_service.py
+ * @description DashScope 异步生成引擎（asyncio + httpx）：提交、轮询、下载在同一个事件循环中完成，
+ *              在途生成任务不再各自占用一个线程。
+ */
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Dict, List, Optional
+
+from backend.config import Settings, load_settings
+from backend.services.dashscope_client_service import DashScopeClient
+from backend.services.circuit_breaker_service import OPEN, CircuitOpenError, get_circuit_breaker
+from backend.services import deadline_service as deadlines
+from backend.services.deadline_service import DeadlineExceeded, JobCancelled
+from backend.services.job_metrics_service import job_stage, timed_stage
+from backend.services.rate_limit_service import get_rate_limiter
+from backend.services.task_poller_service import TaskPollError, TaskPollTimeout, get_task_poller
+from backend.services import upstream_task_service as upstream_tasks
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - 仅在未安装 httpx 时触发
+    httpx = None
+
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_IN_FLIGHT = 256
+
+
+class AsyncDashScopeClient:
+    """
+    Coroutine counterpart of DashScopeClient.call_wan / call_z_image.
+    Payload building, headers and output paths are delegated to the sync client so
+    both paths produce identical requests and files.
+    """
+
+    def __init__(self, http: "httpx.AsyncClient", settings: Optional[Settings] = None):
+        self._http = http
+        self._sync = DashScopeClient(settings=settings)
+
+    @property
+    def settings(self) -> Settings:
+        return self._sync.settings
+
+    async def call_z_image(self, prompt: str, category: str = "default", size: str = "1024*1024", prompt_extend: bool = False, resolution: str = "", seed: Optional[int] = None, temperature: Optional[float] = None, top_p: Optional[float] = None) -> Dict[str, Any]:
+        endpoint = self.settings.endpoints.get("z_image")
+        payload = self._sync._build_z_image_payload(prompt, size=size, prompt_extend=prompt_extend, seed=seed, temperature=temperature, top_p=top_p)
+        try:
+            return await self._submit("z_image", endpoint, self._sync.z_image_api_key or self._sync.dashscope_api_key, payload, category, "z_image", resolution, "unknown_response")
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            return e.as_result()
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def call_wan(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        category: str = "default",
+        size: str = "1024*1024",
+        negative_prompt: str = "",
+        resolution: str = "",
+        seed: Optional[int] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        n: int = 1,
+    ) -> Dict[str, Any]:
+        endpoint = self.settings.endpoints.get("wan") or self.settings.endpoints.get("wan_image")
+        payload = self._sync._build_wan_payload(prompt, model=model, size=size, negative_prompt=negative_prompt, seed=seed, temperature=temperature, top_p=top_p, n=n)
+        try:
+            return await self._submit("wan", endpoint, self._sync.wan_api_key or self._sync.dashscope_api_key, payload, category, "wan", resolution, "unexpected_response")
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            return e.as_result()
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def _submit(self, endpoint_key: str, endpoint: str, api_key: Optional[str], payload: Dict[str, Any], category: str, prefix: str, resolution: str, unexpected_status: str) -> Dict[str, Any]:
+        breaker = get_circuit_breaker(endpoint_key)
+        if breaker.state == OPEN:
+            raise CircuitOpenError(endpoint_key, breaker.retry_in())
+        headers = self._sync._get_headers(api_key)
+        base_timeout = self._sync._timeout(endpoint_key)
+
+        def send():
+            timeout = deadlines.timeout_for("submit", base_timeout)
+            return breaker.acall(lambda: self._http.post(endpoint, headers=headers, json=payload, timeout=timeout))
+
+        with job_stage("submit"), deadlines.guard("submit"):
+            response = await get_rate_limiter().acall(endpoint_key, api_key, send, idempotent=False)
+        if response.status_code != 200:
+            return {"status": "error", "code": response.status_code, "message": response.text}
+        data = response.json()
+        if isinstance(data.get("output"), dict) and data["output"].get("task_id"):
+            return await self._wait_for_task(data["output"]["task_id"], category=category, prefix=prefix, resolution=resolution)
+        urls = self._sync._extract_result_urls(data)
+        if urls:
+            return await self._save_results(urls, category, prefix, resolution)
+        return {"status": unexpected_status, "data": data}
+
+    async def _wait_for_task(self, task_id: str, category: str = "default", prefix: str = "result", resolution: str = "") -> Dict[str, Any]:
+        # SQLite writes run in a thread (to_thread copies the context carrying the job binding)
+        await asyncio.to_thread(upstream_tasks.remember, task_id, prefix=prefix, category=category, resolution=resolution)
+        result = await self._collect_task(task_id, category=category, prefix=prefix, resolution=resolution)
+        await asyncio.to_thread(upstream_tasks.finish, task_id, result)
+        return result
+
+    async def _collect_task(self, task_id: str, category: str = "default", prefix: str = "result", resolution: str = "") -> Dict[str, Any]:
+        # 轮询统一交给 TaskPoller，这里只 await 其结果，不再自行 sleep
+        try:
+            poll_timeout = deadlines.timeout_for("poll")
+            future = get_task_poller().track(task_id, self._sync._task_url(task_id), self._sync._get_headers(self._sync.dashscope_api_key), timeout=poll_timeout)
+            with job_stage("poll"):
+                data = await asyncio.wrap_future(future)
+        except JobCancelled as e:
+            await asyncio.to_thread(self._sync.cancel_task, task_id)
+            return {**e.as_result(), "task_id": task_id}
+        except DeadlineExceeded as e:
+            return {**e.as_result(), "task_id": task_id}
+        except TaskPollTimeout:
+            deadlines.note_timeout("poll")
+            return {"status": "timeout", "stage": "poll", "task_id": task_id}
+        except TaskPollError as e:
+            if e.code is not None:
+                return {"status": "error", "code": e.code, "message": str(e)}
+            return {"status": "error", "message": str(e)}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        try:
+            output = data.get("output", {})
+            if output.get("task_status") == "SUCCEEDED":
+                result_urls = self._sync._task_result_urls(output)
+                if result_urls:
+                    return await self._save_results(result_urls, category, prefix, resolution, task_id=task_id)
+                return {"status": "success", "data": output, "task_id": task_id}
+            return {"status": "failed", "message": output.get("message"), "task_id": task_id}
+        except DeadlineExceeded as e:
+            return {**e.as_result(), "task_id": task_id}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def _save_results(self, urls: List[str], category: str, prefix: str, resolution: str = "", **extra: Any) -> Dict[str, Any]:
+        paths = await asyncio.gather(*(self._download_to_file(u, category, prefix, resolution=resolution) for u in urls))
+        result = {"status": "success", "url": urls[0], "saved_path": paths[0], **extra}
+        if len(urls) > 1:
+            result["images"] = [{"url": u, "saved_path": p} for u, p in zip(urls, paths)]
+        return result
+
+    @timed_stage("download")
+    async def _download_to_file(self, url: str, category: str, prefix: str, resolution: str = "") -> str:
+        with deadlines.guard("download"):
+            async with self._http.stream("GET", url, timeout=deadlines.timeout_for("download", 120)) as resp:
+                resp.raise_for_status()
+                # 文件占位（O_EXCL）、打开与写入都放到线程中，避免阻塞事件循环；按块边收边写，不在内存中攒整张图片
+                out_path = await asyncio.to_thread(self._sync._output_path, url, resp.headers.get("Content-Type"), category, prefix, resolution)
+                f = await asyncio.to_thread(open, out_path, "wb")
+                try:
+                    async for chunk in resp.aiter_bytes(1024 * 256):
+                        if chunk:
+                            await asyncio.to_thread(f.write, chunk)
+                finally:
+                    await asyncio.to_thread(f.close)
+        return out_path
+
+
+class AsyncGenerationEngine:
+    """
+    One event loop on a daemon thread drives every in-flight generation.
+    Callers hand in coroutines and get concurrent.futures.Future objects back, so
+    worker threads are never parked on a poll loop.
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        if httpx is None:
+            raise RuntimeError("httpx is required for the async generation engine (pip install httpx)")
+        self.max_connections = max(1, int(max_connections))
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._http: Optional["httpx.AsyncClient"] = None
+        self._gate: Optional[asyncio.Semaphore] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run_loop, name="dashscope-async-engine", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+        )
+        self._gate = asyncio.Semaphore(self.max_in_flight)
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(self._http.aclose())
+            loop.close()
+
+    @property
+    def client(self) -> AsyncDashScopeClient:
+        self.start()
+        return AsyncDashScopeClient(self._http)
+
+    def submit(self, coro: Awaitable[Any]) -> "concurrent.futures.Future[Any]":
+        self.start()
+        with self._lock:
+            self._submitted += 1
+        return asyncio.run_coroutine_threadsafe(self._guarded(coro), self._loop)
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        return self.submit(coro).result(timeout=timeout)
+
+    async def _guarded(self, coro: Awaitable[Any]) -> Any:
+        async with self._gate:
+            with self._lock:
+                self._in_flight += 1
+            try:
+                return await coro
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    self._completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "max_connections": self.max_connections,
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self._in_flight,
+                "submitted": self._submitted,
+                "completed": self._completed,
+            }
+
+    def shutdown(self) -> None:
+        if self._loop is None or self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+        self._loop = None
+
+
+_ENGINE: Optional[AsyncGenerationEngine] = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def async_engine_enabled() -> bool:
+    return bool(load_settings().async_engine_enabled) and httpx is not None
+
+
+def get_async_engine() -> AsyncGenerationEngine:
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            cfg = load_settings().async_engine
+            _ENGINE = AsyncGenerationEngine(
+                max_connections=cfg.get("max_connections", DEFAULT_MAX_CONNECTIONS),
+                max_in_flight=cfg.get("max_in_flight", DEFAULT_MAX_IN_FLIGHT),
+            )
+        return _ENGINE
+
+
+def shutdown_async_engine() -> None:
+    global _ENGINE
+    with _ENGINE_LOCK:
+        engine, _ENGINE = _ENGINE, None
+    if engine is not None:
+        engine.shutdown()
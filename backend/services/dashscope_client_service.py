@@ -9,27 +9,53 @@ from __future__ import annotations
 
 import os
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
 import logging
+import re
 import uuid
 
 from backend.config import Settings, load_settings
+from backend.services.http_session_service import HTTPSessionPool, get_http_pool
+from backend.services import deadline_service as deadlines
+from backend.services.deadline_service import DeadlineExceeded, JobCancelled
+from backend.services.job_metrics_service import job_stage, timed_stage
+from backend.services.prompt_cache_service import get_refine_cache, make_key
+from backend.services.zh_enrichment_service import get_zh_enrichment
+from backend.services import prompt_variation_service as prompt_variation
+from backend.services import qwen_batch_service as qwen_batch
+from backend.services.circuit_breaker_service import OPEN, CircuitOpenError, get_circuit_breaker
+from backend.services.rate_limit_service import get_rate_limiter
+from backend.services.single_flight_service import get_single_flight
+from backend.services.task_poller_service import TaskPollError, TaskPollTimeout, get_task_poller
+from backend.services import upstream_task_service as upstream_tasks
 from backend.utils import file_to_data_url, guess_extension, safe_dir_name
 
 
-import threading
+DEFAULT_TASKS_ENDPOINT = "https://dashscope.aliyuncs.com/api/v1/tasks"
+# 上游请求超时（秒），可由 config 的 timeouts 覆盖
+DEFAULT_TIMEOUTS = {"qwen": 60, "wan": 120, "z_image": 120}
+
+
+def _raise_if_cut_short(result: Dict[str, Any], stage: str) -> None:
+    """Turn a Qwen result that the caller's own deadline / cancel cut short back into the exception."""
+    status = result.get("status") if isinstance(result, dict) else None
+    if status == "cancelled":
+        raise JobCancelled(result.get("stage") or stage)
+    if status == "timeout":
+        raise DeadlineExceeded(result.get("stage") or stage, result.get("message") or "")
+
+
+def _strip_code_fence(content: str) -> str:
+    """Qwen may wrap its JSON in a ```json ... ``` (or bare ```) block."""
+    match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL) or re.search(r'```\s*(.*?)\s*```', content, re.DOTALL)
+    return match.group(1) if match else content
+
 
 class DashScopeClient:
     def __init__(self, settings: Optional[Settings] = None):
         # We don't hold onto settings anymore, we fetch it dynamically
         self._initial_settings = settings 
-        # Simple memory cache for prompt refinement: 
-        # Key: (prompt, category, default_style, default_negative, role)
-        # Value: (positive, negative, timestamp)
-        self._prompt_cache = {}
-        self._cache_lock = threading.Lock()
         self._prompt_logger = logging.getLogger("prompt_trace")
         if not self._prompt_logger.handlers:
             h = logging.StreamHandler()
@@ -42,6 +68,10 @@ class DashScopeClient:
     def settings(self) -> Settings:
         return self._initial_settings or load_settings()
         
+    @property
+    def http(self) -> HTTPSessionPool:
+        return get_http_pool()
+
     @property
     def output_dir(self) -> str:
         return self.settings.output_dir
@@ -70,25 +100,36 @@ class DashScopeClient:
             raise ValueError("Missing API key. Set DASHSCOPE_API_KEY or config.local.json")
         return {"Authorization": f"Bearer {key}", "Content-Type": "application/json"}
 
-    def _download_to_file(self, url: str, category: str, prefix: str, resolution: str = "") -> str:
+    def _output_path(self, url: str, content_type: Optional[str], category: str, prefix: str, resolution: str = "") -> str:
         category_dir = self._ensure_output_dir(category)
-        resp = requests.get(url, stream=True, timeout=120)
-        resp.raise_for_status()
-        ext = guess_extension(url, resp.headers.get("Content-Type"))
-        
+        ext = guess_extension(url, content_type)
+
         # 生成的文件命名规则：模型_yyyymmddhh24miss_ms_画质.类型（确保并发唯一）
         # prefix 传入的通常是模型类型 (wan 或 z_image)
         res_suffix = f"_{resolution}" if resolution else ""
         ts = time.time()
         timestamp_str = time.strftime("%Y%m%d%H%M%S", time.localtime(ts))
         ms = int((ts - int(ts)) * 1000)
-        filename = f"{prefix}_{timestamp_str}_{ms:03d}{res_suffix}{ext}"
-        
-        out_path = os.path.join(category_dir, filename)
-        with open(out_path, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=1024 * 256):
-                if chunk:
-                    f.write(chunk)
+        # 并发下同一毫秒可能重名：以 O_EXCL 占位，冲突时顺延毫秒位
+        for bump in range(1000):
+            filename = f"{prefix}_{timestamp_str}_{(ms + bump) % 1000:03d}{res_suffix}{ext}"
+            out_path = os.path.join(category_dir, filename)
+            try:
+                os.close(os.open(out_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return out_path
+            except FileExistsError:
+                continue
+        return out_path
+
+    @timed_stage("download")
+    def _download_to_file(self, url: str, category: str, prefix: str, resolution: str = "") -> str:
+        with deadlines.guard("download"), self.http.get(url, stream=True, timeout=deadlines.timeout_for("download", 120)) as resp:
+            resp.raise_for_status()
+            out_path = self._output_path(url, resp.headers.get("Content-Type"), category, prefix, resolution)
+            with open(out_path, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=1024 * 256):
+                    if chunk:
+                        f.write(chunk)
         
         # 自动生成缩略图（如果需要，此处可以调用生成逻辑，但目前 images_controller 是 lazy 生成）
         # 这里仅确保文件已保存
@@ -141,25 +182,69 @@ class DashScopeClient:
 
         return None
 
+    def _extract_result_urls(self, data: Any) -> List[str]:
+        """All image URLs of a synchronous response (n > 1 returns several)."""
+        urls: List[str] = []
+        output = data.get("output") if isinstance(data, dict) else None
+        if isinstance(output, dict):
+            for item in output.get("results") or []:
+                if isinstance(item, dict):
+                    value = item.get("url") or item.get("image")
+                    if isinstance(value, str) and value:
+                        urls.append(value)
+            for choice in output.get("choices") or []:
+                message = choice.get("message") if isinstance(choice, dict) else None
+                content = message.get("content") if isinstance(message, dict) else None
+                for part in content if isinstance(content, list) else []:
+                    value = part.get("image") or part.get("url") if isinstance(part, dict) else None
+                    if isinstance(value, str) and value:
+                        urls.append(value)
+        if urls:
+            return urls
+        first = self._extract_first_result_url(data)
+        return [first] if first else []
+
+    def _save_results(self, urls: List[str], category: str, prefix: str, resolution: str = "", **extra: Any) -> Dict[str, Any]:
+        """Download every result; the first stays in url / saved_path, all of them are listed in images when n > 1."""
+        images = [{"url": u, "saved_path": self._download_to_file(u, category, prefix, resolution=resolution)} for u in urls]
+        result = {"status": "success", "url": images[0]["url"], "saved_path": images[0]["saved_path"], **extra}
+        if len(images) > 1:
+            result["images"] = images
+        return result
+
+    @timed_stage("refine_prompt")
     def refine_prompt(self, prompt: str, category: str, default_style: str, default_negative_prompt: str, role: str) -> Dict[str, str]:
         """
         Uses Qwen to refine the prompt and generate a negative prompt.
-        Uses in-memory cache to avoid redundant calls.
+        Results (with their zh translations) go through the shared refine cache.
         """
         # Check Cache
-        cache_key = (prompt, category, default_style, default_negative_prompt, role or "")
-        now = time.time()
-        
-        with self._cache_lock:
-            if cache_key in self._prompt_cache:
-                pos, neg, ts = self._prompt_cache[cache_key]
-                # Cache valid for 1 hour (3600s)
-                if now - ts < 3600:
-                    print(f"[Refine] Cache Hit for prompt: {prompt[:30]}...")
-                    return {"positive_prompt": pos, "negative_prompt": neg}
-                else:
-                    del self._prompt_cache[cache_key]
+        qwen_model = self.settings.models.get("qwen", "qwen-max")
+        cache = get_refine_cache()
+        cache_key = make_key(prompt, category, default_style, default_negative_prompt, role or "", qwen_model)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"[Refine] Cache Hit for prompt: {prompt[:30]}...")
+            return self._with_deferred_zh(cached, cache_key, qwen_model)
+        # Concurrent misses for the same key share one Qwen round trip. Only a parsed answer is
+        # shared: a failure cut short by the leader's own deadline / cancel makes the others call
+        # again, any other failure reaches every caller, and each one falls back on its own.
+        try:
+            return get_single_flight("refine_prompt").do(
+                cache_key,
+                lambda: self._refine_uncached(prompt, category, default_style, default_negative_prompt, role, cache_key, qwen_model),
+                retry_on=(DeadlineExceeded,),
+            )
+        except Exception as e:
+            print(f"[Refine] Qwen failed or invalid output ({e}). Using original.")
+            return {
+                "positive_prompt": prompt,
+                "negative_prompt": default_negative_prompt,
+                "positive_prompt_zh": None,
+                "negative_prompt_zh": None
+            }
 
+    def _refine_uncached(self, prompt: str, category: str, default_style: str, default_negative_prompt: str, role: str, cache_key: str, qwen_model: str) -> Dict[str, str]:
         # Construct the instruction for Qwen
         instruction = f"""
 {role}
@@ -175,11 +260,7 @@ Task:
 2. Expand it into a rich, detailed English prompt (Positive Prompt) incorporating the Preferred Style if appropriate.
 3. Create a strong Negative Prompt to ensure quality.
 
-Output Format (Strict JSON):
-{{
-  "positive_prompt": "...",
-  "negative_prompt": "..."
-}}
+{self._refine_output_format()}
 """
         try:
             req_id = str(uuid.uuid4())
@@ -202,32 +283,18 @@ Output Format (Strict JSON):
             }, ensure_ascii=False))
             print(f"[qwen_request] request_id={req_id} original_prompt={prompt[:120]}")
             # Reuse call_qwen
-            result = self.call_qwen(instruction)
+            result = qwen_batch.call_qwen(self, instruction)
             if result.get("status") == "success":
                 content = result.get("output", "")
-                # Try to parse JSON from content
-                # Qwen might wrap JSON in markdown code blocks ```json ... ```
                 import json
-                import re
-                
-                # Strip markdown code blocks if present
-                json_str = content
-                match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
-                if match:
-                    json_str = match.group(1)
-                elif re.search(r'```\s*(.*?)\s*```', content, re.DOTALL):
-                     match = re.search(r'```\s*(.*?)\s*```', content, re.DOTALL)
-                     if match:
-                        json_str = match.group(1)
 
+                json_str = _strip_code_fence(content)
                 try:
                     data = json.loads(json_str)
                     pos = data.get("positive_prompt")
                     neg = data.get("negative_prompt")
                     if pos and neg:
-                        # translate to zh for logging
-                        pos_zh = self._translate(pos)
-                        neg_zh = self._translate(neg)
+                        pos_zh, neg_zh = self._zh_pair(data, pos, neg)
                         self._prompt_logger.info(json.dumps({
                             "timestamp": int(time.time()*1000),
                             "event": "qwen_response",
@@ -238,37 +305,24 @@ Output Format (Strict JSON):
                             "negative_zh": neg_zh
                         }, ensure_ascii=False))
                         print(f"[qwen_response] request_id={req_id} pos_en={pos[:120]}")
-                        # Update Cache
-                        with self._cache_lock:
-                            self._prompt_cache[cache_key] = (pos, neg, now)
-                            
-                        return {
+                        refined = {
                             "positive_prompt": pos,
                             "negative_prompt": neg,
                             "positive_prompt_zh": pos_zh,
                             "negative_prompt_zh": neg_zh
                         }
+                        get_refine_cache().put(cache_key, refined, model=qwen_model)
+                        return self._with_deferred_zh(refined, cache_key, qwen_model)
                 except json.JSONDecodeError:
                     print(f"[Refine] JSON parse failed: {json_str}")
                     pass
-            
-            print(f"[Refine] Qwen failed or invalid output. Using original.")
-            return {
-                "positive_prompt": prompt,
-                "negative_prompt": default_negative_prompt,
-                "positive_prompt_zh": None,
-                "negative_prompt_zh": None
-            }
-            
+            _raise_if_cut_short(result, "refine")
+            raise ValueError(f"no usable refine answer (status {result.get('status')})")
         except Exception as e:
             print(f"[Refine] Error: {e}")
-            return {
-                "positive_prompt": prompt,
-                "negative_prompt": default_negative_prompt,
-                "positive_prompt_zh": None,
-                "negative_prompt_zh": None
-            }
+            raise
 
+    @timed_stage("refine_prompt")
     def refine_prompt_with_delta(self, base_positive: str, category: str, default_style: str, default_negative_prompt: str, role: str, change_ratio: float = 0.1) -> Dict[str, str]:
         """
         Ask Qwen to produce a variant prompt based on the previous refined positive, with ~10% adjustments.
@@ -311,32 +365,20 @@ Base Positive Prompt:
 Preferred Style: {default_style}
 Default Negative Prompt: {default_negative_prompt}
 
-Output Format (Strict JSON):
-{{
-  "positive_prompt": "...",
-  "negative_prompt": "..."
-}}
+{self._refine_output_format()}
 """
         try:
-            result = self.call_qwen(instruction)
+            result = qwen_batch.call_qwen(self, instruction)
             if result.get("status") == "success":
                 content = result.get("output", "")
-                import json, re
-                json_str = content
-                match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
-                if match:
-                    json_str = match.group(1)
-                elif re.search(r'```\s*(.*?)\s*```', content, re.DOTALL):
-                    match = re.search(r'```\s*(.*?)\s*```', content, re.DOTALL)
-                    if match:
-                        json_str = match.group(1)
+                import json
+                json_str = _strip_code_fence(content)
                 try:
                     data = json.loads(json_str)
                     pos = data.get("positive_prompt")
                     neg = data.get("negative_prompt")
                     if pos and neg:
-                        pos_zh = self._translate(pos)
-                        neg_zh = self._translate(neg)
+                        pos_zh, neg_zh = self._zh_pair(data, pos, neg)
                         self._prompt_logger.info(json.dumps({
                             "timestamp": int(time.time()*1000),
                             "event": "qwen_response_delta",
@@ -356,22 +398,76 @@ Output Format (Strict JSON):
                         }
                 except json.JSONDecodeError:
                     pass
-            # fallback: apply tiny textual variation locally if Qwen fails
-            fallback_pos = base_positive + " | subtle lighting shift, slight angle variation"
-            return {
-                "positive_prompt": fallback_pos,
-                "negative_prompt": default_negative_prompt,
-                "positive_prompt_zh": None,
-                "negative_prompt_zh": None
-            }
+            # fallback: apply a small deterministic variation locally if Qwen fails
+            return prompt_variation.vary(base_positive, category, change_ratio, negative_prompt=default_negative_prompt, settings=self.settings)
         except Exception:
-            fallback_pos = base_positive + " | subtle lighting shift"
-            return {
-                "positive_prompt": fallback_pos,
-                "negative_prompt": default_negative_prompt,
-                "positive_prompt_zh": None,
-                "negative_prompt_zh": None
-            }
+            return prompt_variation.vary(base_positive, category, change_ratio, negative_prompt=default_negative_prompt, settings=self.settings)
+    def _refine_output_format(self) -> str:
+        if self.settings.refine_mode == "bilingual":
+            return (
+                "Output Format (Strict JSON; the _zh fields are faithful Chinese translations of the English prompts):\n"
+                "{\n"
+                '  "positive_prompt": "...",\n'
+                '  "negative_prompt": "...",\n'
+                '  "positive_prompt_zh": "...",\n'
+                '  "negative_prompt_zh": "..."\n'
+                "}"
+            )
+        return (
+            "Output Format (Strict JSON):\n"
+            "{\n"
+            '  "positive_prompt": "...",\n'
+            '  "negative_prompt": "..."\n'
+            "}"
+        )
+
+    def _zh_pair(self, data: Dict[str, Any], pos: str, neg: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        zh prompts from a bilingual answer; whatever is missing or empty is translated separately,
+        or left as None for the background enrichment queue when zh_enrichment is enabled.
+        """
+        bilingual = self.settings.refine_mode == "bilingual"
+        deferred = self._zh_deferred()
+        zh = []
+        for text, field in ((pos, "positive_prompt_zh"), (neg, "negative_prompt_zh")):
+            value = data.get(field) if bilingual else None
+            if isinstance(value, str) and value.strip():
+                zh.append(value.strip())
+            elif deferred:
+                zh.append(None)
+            else:
+                if bilingual:
+                    print(f"[Refine] bilingual output missing {field}, translating separately")
+                zh.append(self._translate(text))
+        return zh[0], zh[1]
+
+    def _zh_deferred(self) -> bool:
+        return bool(self.settings.zh_enrichment.get("enabled", False))
+
+    def _with_deferred_zh(self, refined: Dict[str, Any], cache_key: str, qwen_model: str) -> Dict[str, Any]:
+        """Fill missing zh from the enrichment queue, or queue the translation and patch the cache when it lands."""
+        if not self._zh_deferred() or (refined.get("positive_prompt_zh") and refined.get("negative_prompt_zh")):
+            return refined
+        pos, neg = refined.get("positive_prompt") or "", refined.get("negative_prompt") or ""
+        enrichment = get_zh_enrichment()
+        known = enrichment.lookup(pos, neg)
+        if known is not None:
+            refined["positive_prompt_zh"] = refined.get("positive_prompt_zh") or known[0]
+            refined["negative_prompt_zh"] = refined.get("negative_prompt_zh") or known[1]
+            return refined
+        base = dict(refined)
+
+        def store(pos_zh: Optional[str], neg_zh: Optional[str]) -> None:
+            get_refine_cache().put(cache_key, {
+                **base,
+                "positive_prompt_zh": base.get("positive_prompt_zh") or pos_zh,
+                "negative_prompt_zh": base.get("negative_prompt_zh") or neg_zh,
+            }, model=qwen_model)
+
+        enrichment.translate_later(pos, neg, on_done=store)
+        return refined
+
+    @timed_stage("translate")
     def _translate(self, text: str) -> str:
         cleaned = (text or "").strip()
         if not cleaned:
@@ -380,30 +476,88 @@ Output Format (Strict JSON):
             "Translate the following text to Chinese. Only return the translated text without any explanation: "
             f"\"{cleaned}\""
         )
+        model = self.settings.models.get("qwen", "qwen-max")
         try:
-            r = self.call_qwen(prompt)
-            if r.get("status") == "success":
-                return str(r.get("output") or "").strip() or cleaned
+            # only a real translation is shared; each caller falls back to the source text itself
+            return get_single_flight("translate").do((model, cleaned), lambda: self._translate_uncached(prompt, cleaned), retry_on=(DeadlineExceeded,))
         except Exception:
-            pass
-        return cleaned
+            return cleaned
+
+    def _translate_uncached(self, prompt: str, cleaned: str) -> str:
+        r = qwen_batch.call_qwen(self, prompt)
+        if r.get("status") == "success":
+            return str(r.get("output") or "").strip() or cleaned
+        _raise_if_cut_short(r, "translate")
+        raise ValueError(f"translation failed (status {r.get('status')})")
+
+    def _timeout(self, endpoint_key: str) -> float:
+        value = self.settings.timeouts.get(endpoint_key, DEFAULT_TIMEOUTS.get(endpoint_key, 60))
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float(DEFAULT_TIMEOUTS.get(endpoint_key, 60))
+
+    def _post(self, endpoint_key: str, url: str, api_key: Optional[str], payload: Dict[str, Any]):
+        """
+        POST through the shared pool, shaped by the (api key, endpoint) token bucket, retried on
+        429/5xx and guarded by the endpoint's circuit breaker (raises CircuitOpenError while open).
+        Task submissions are resent after transport errors only when they failed to connect.
+        Inside a job every attempt is also capped by the job deadline (raises DeadlineExceeded).
+        """
+        breaker = get_circuit_breaker(endpoint_key)
+        if breaker.state == OPEN:
+            raise CircuitOpenError(endpoint_key, breaker.retry_in())
+        headers = self._get_headers(api_key)
+        stage = "refine" if endpoint_key == "qwen" else "submit"
+        base_timeout = self._timeout(endpoint_key)
+
+        def send():
+            timeout = deadlines.timeout_for(stage, base_timeout)
+            return breaker.call(lambda: self.http.post(url, headers=headers, json=payload, timeout=timeout))
+
+        with deadlines.guard(stage):
+            return get_rate_limiter().call(endpoint_key, api_key, send, idempotent=stage != "submit")
 
     def call_qwen(self, prompt: str, model: Optional[str] = None):
         endpoint = self.settings.endpoints.get("qwen")
         model_name = model or self.settings.models.get("qwen", "qwen-max")
         payload = {"model": model_name, "messages": [{"role": "user", "content": prompt}]}
         try:
-            response = requests.post(endpoint, headers=self._get_headers(self.dashscope_api_key), json=payload)
+            response = self._post("qwen", endpoint, self.dashscope_api_key, payload)
             if response.status_code == 200:
                 data = response.json()
                 content = data["choices"][0]["message"]["content"]
                 return {"status": "success", "output": content}
             return {"status": "error", "code": response.status_code, "message": response.text}
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            return e.as_result()
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
     def call_z_image(self, prompt: str, category: str = "default", size: str = "1024*1024", prompt_extend: bool = False, resolution: str = "", seed: Optional[int] = None, temperature: Optional[float] = None, top_p: Optional[float] = None):
         endpoint = self.settings.endpoints.get("z_image")
+        payload = self._build_z_image_payload(prompt, size=size, prompt_extend=prompt_extend, seed=seed, temperature=temperature, top_p=top_p)
+
+        try:
+            with job_stage("submit"):
+                response = self._post("z_image", endpoint, self.z_image_api_key or self.dashscope_api_key, payload)
+            if response.status_code == 200:
+                data = response.json()
+                if isinstance(data.get("output"), dict) and data["output"].get("task_id"):
+                    task_id = data["output"]["task_id"]
+                    return self._wait_for_task(task_id, category=category, prefix="z_image", resolution=resolution)
+                url = self._extract_first_result_url(data)
+                if url:
+                    saved_path = self._download_to_file(url, category, "z_image", resolution=resolution)
+                    return {"status": "success", "url": url, "saved_path": saved_path}
+                return {"status": "unknown_response", "data": data}
+            return {"status": "error", "code": response.status_code, "message": response.text}
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            return e.as_result()
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def _build_z_image_payload(self, prompt: str, size: str = "1024*1024", prompt_extend: bool = False, seed: Optional[int] = None, temperature: Optional[float] = None, top_p: Optional[float] = None) -> Dict[str, Any]:
         model_name = self.settings.models.get("z_image", "z-image-turbo")
 
         parsed_size = None
@@ -439,43 +593,59 @@ Output Format (Strict JSON):
             print(f"[{model_name}] Temperature: {temperature}")
         if top_p is not None:
             print(f"[{model_name}] Top P: {top_p}")
+        return payload
+
+    def call_wan(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        category: str = "default",
+        size: str = "1024*1024",
+        negative_prompt: str = "",
+        resolution: str = "",
+        seed: Optional[int] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        n: int = 1,
+    ):
+        endpoint = self.settings.endpoints.get("wan") or self.settings.endpoints.get("wan_image")
+        payload = self._build_wan_payload(prompt, model=model, size=size, negative_prompt=negative_prompt, seed=seed, temperature=temperature, top_p=top_p, n=n)
 
         try:
-            headers = self._get_headers(self.z_image_api_key or self.dashscope_api_key)
-            response = requests.post(endpoint, headers=headers, json=payload)
+            with job_stage("submit"):
+                response = self._post("wan", endpoint, self.wan_api_key or self.dashscope_api_key, payload)
             if response.status_code == 200:
                 data = response.json()
                 if isinstance(data.get("output"), dict) and data["output"].get("task_id"):
                     task_id = data["output"]["task_id"]
-                    return self._wait_for_task(task_id, category=category, prefix="z_image", resolution=resolution)
-                url = self._extract_first_result_url(data)
-                if url:
-                    saved_path = self._download_to_file(url, category, "z_image", resolution=resolution)
-                    return {"status": "success", "url": url, "saved_path": saved_path}
-                return {"status": "unknown_response", "data": data}
+                    return self._wait_for_task(task_id, category=category, prefix="wan", resolution=resolution)
+                urls = self._extract_result_urls(data)
+                if urls:
+                    return self._save_results(urls, category, "wan", resolution=resolution)
+                return {"status": "unexpected_response", "data": data}
             return {"status": "error", "code": response.status_code, "message": response.text}
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            return e.as_result()
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
-    def call_wan(
+    def _build_wan_payload(
         self,
         prompt: str,
         model: Optional[str] = None,
-        category: str = "default",
         size: str = "1024*1024",
         negative_prompt: str = "",
-        resolution: str = "",
         seed: Optional[int] = None,
         temperature: Optional[float] = None,
         top_p: Optional[float] = None,
-    ):
-        endpoint = self.settings.endpoints.get("wan") or self.settings.endpoints.get("wan_image")
+        n: int = 1,
+    ) -> Dict[str, Any]:
         model_name = model or self.settings.models.get("wan", "wan2.6-t2i")
 
         payload: Dict[str, Any] = {
             "model": model_name,
             "input": {"messages": [{"role": "user", "content": [{"text": prompt}]}]},
-            "parameters": {"size": size, "n": 1, "prompt_extend": True, "watermark": False},
+            "parameters": {"size": size, "n": max(1, int(n or 1)), "prompt_extend": True, "watermark": False},
         }
         if negative_prompt:
             payload["parameters"]["negative_prompt"] = negative_prompt
@@ -496,61 +666,93 @@ Output Format (Strict JSON):
             print(f"[{model_name}] Temperature: {temperature}")
         if top_p is not None:
             print(f"[{model_name}] Top P: {top_p}")
+        return payload
 
+    def _wait_for_task(self, task_id: str, category: str = "default", prefix: str = "result", resolution: str = ""):
+        """
+        Persist the task_id (so a restart can resume it), then collect its result.
+        """
+        upstream_tasks.remember(task_id, prefix=prefix, category=category, resolution=resolution)
+        result = self._collect_task(task_id, category=category, prefix=prefix, resolution=resolution)
+        upstream_tasks.finish(task_id, result)
+        return result
+
+    def _collect_task(self, task_id: str, category: str = "default", prefix: str = "result", resolution: str = ""):
+        """
+        Hand the task_id to the shared TaskPoller and block until it reaches a terminal
+        state; the download then runs on this thread. The poll requests themselves run on
+        the poller, but this synchronous path still parks the calling (image executor)
+        thread while it waits: only the async engine (async_engine.enabled) frees it.
+        """
         try:
-            headers = self._get_headers(self.wan_api_key or self.dashscope_api_key)
-            response = requests.post(endpoint, headers=headers, json=payload)
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data.get("output"), dict) and data["output"].get("task_id"):
-                    task_id = data["output"]["task_id"]
-                    return self._wait_for_task(task_id, category=category, prefix="wan", resolution=resolution)
-                url = self._extract_first_result_url(data)
-                if url:
-                    saved_path = self._download_to_file(url, category, "wan", resolution=resolution)
-                    return {"status": "success", "url": url, "saved_path": saved_path}
-                return {"status": "unexpected_response", "data": data}
-            return {"status": "error", "code": response.status_code, "message": response.text}
+            poll_timeout = deadlines.timeout_for("poll")
+            future = get_task_poller().track(task_id, self._task_url(task_id), self._get_headers(self.dashscope_api_key), timeout=poll_timeout)
+            with job_stage("poll"):
+                data = future.result()
+        except JobCancelled as e:
+            self.cancel_task(task_id)
+            return {**e.as_result(), "task_id": task_id}
+        except DeadlineExceeded as e:
+            return {**e.as_result(), "task_id": task_id}
+        except TaskPollTimeout:
+            deadlines.note_timeout("poll")
+            return {"status": "timeout", "stage": "poll", "task_id": task_id}
+        except TaskPollError as e:
+            if e.code is not None:
+                return {"status": "error", "code": e.code, "message": str(e)}
+            return {"status": "error", "message": str(e)}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        try:
+            output = data.get("output", {})
+            if output.get("task_status") == "SUCCEEDED":
+                result_urls = self._task_result_urls(output)
+                if result_urls:
+                    return self._save_results(result_urls, category, prefix, resolution=resolution, task_id=task_id)
+                return {"status": "success", "data": output, "task_id": task_id}
+            return {"status": "failed", "message": output.get("message"), "task_id": task_id}
+        except DeadlineExceeded as e:
+            return {**e.as_result(), "task_id": task_id}
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
-    def _wait_for_task(self, task_id: str, category: str = "default", prefix: str = "result", resolution: str = ""):
-        task_url = f"https://dashscope.aliyuncs.com/api/v1/tasks/{task_id}"
-        headers = self._get_headers(self.dashscope_api_key)
-        start_time = time.time()
-        timeout = 600
+    def cancel_task(self, task_id: str) -> bool:
+        """Best effort: DashScope only cancels tasks that are still PENDING."""
+        try:
+            resp = get_http_pool().post(f"{self._task_url(task_id)}/cancel", headers=self._get_headers(self.dashscope_api_key), timeout=10)
+        except Exception as e:
+            print(f"[cancel] task_id={task_id} failed: {e}")
+            return False
+        if resp.status_code != 200:
+            print(f"[cancel] task_id={task_id} not accepted ({resp.status_code}): {resp.text[:200]}")
+            return False
+        return True
+
+    def _task_url(self, task_id: str) -> str:
+        base = self.settings.endpoints.get("tasks") or DEFAULT_TASKS_ENDPOINT
+        return f"{base.rstrip('/')}/{task_id}"
+
+    def _task_result_url(self, output: Dict[str, Any]) -> Optional[str]:
+        if "results" in output:
+            return output["results"][0].get("url") or output["results"][0].get("video_url")
+        if "video_url" in output:
+            return output["video_url"]
+        return None
 
-        while time.time() - start_time < timeout:
-            try:
-                response = requests.get(task_url, headers=headers)
-                if response.status_code == 200:
-                    data = response.json()
-                    task_status = data.get("output", {}).get("task_status")
-                    if task_status == "SUCCEEDED":
-                        if "results" in data["output"]:
-                            result_url = data["output"]["results"][0].get("url") or data["output"]["results"][0].get(
-                                "video_url"
-                            )
-                            saved_path = self._download_to_file(result_url, category, prefix, resolution=resolution)
-                            return {"status": "success", "url": result_url, "saved_path": saved_path, "task_id": task_id}
-                        if "video_url" in data["output"]:
-                            result_url = data["output"]["video_url"]
-                            saved_path = self._download_to_file(result_url, category, prefix, resolution=resolution)
-                            return {"status": "success", "url": result_url, "saved_path": saved_path, "task_id": task_id}
-                        return {"status": "success", "data": data["output"], "task_id": task_id}
-                    if task_status in ["FAILED", "CANCELED"]:
-                        return {"status": "failed", "message": data.get("output", {}).get("message"), "task_id": task_id}
-                    time.sleep(5)
-                else:
-                    return {"status": "error", "code": response.status_code, "message": response.text}
-            except Exception as e:
-                return {"status": "error", "message": str(e)}
-
-        return {"status": "timeout", "task_id": task_id}
+    def _task_result_urls(self, output: Dict[str, Any]) -> List[str]:
+        if isinstance(output.get("results"), list):
+            urls = [r.get("url") or r.get("video_url") for r in output["results"] if isinstance(r, dict)]
+            return [u for u in urls if u]
+        first = self._task_result_url(output)
+        return [first] if first else []
 
     def to_data_url_if_local(self, result: Dict[str, Any]) -> Dict[str, Any]:
         if not isinstance(result, dict) or result.get("status") != "success":
             return result
+        if isinstance(result.get("images"), list):
+            # 批量结果（n>1）：逐张转换，首张仍作为顶层字段
+            images = [self.to_data_url_if_local({"status": "success", **img}) for img in result["images"]]
+            return {**images[0], "images": images}
         saved_path = result.get("saved_path")
         
         # 将缩略图传给前端 (实际上这里返回的是原图的 path，前端通过 /api/images/{id}/thumb 访问)
@@ -0,0 +1,157 @@
+"""
+/**
+ * @file backend/services/deadline_service.py
+ * @description 作业截止时间：/api/generate 受理时确定整体期限，并按阶段（refine、submit、poll、download）
+ *              设置单次调用预算。每次上游网络调用的超时取「阶段预算」与「作业剩余时间」中的较小值，
+ *              期限耗尽时抛出 DeadlineExceeded，作业状态中以 timeout 阶段体现；作业被取消后抛出其子类 JobCancelled。
+ */
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+
+STAGES = ("refine", "submit", "poll", "download")
+# 秒；job 为整体期限，其余为单次调用上限，可由 config 的 deadlines 覆盖
+DEFAULT_BUDGETS = {"job": 900.0, "refine": 90.0, "submit": 60.0, "poll": 600.0, "download": 120.0}
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage: str, message: str = ""):
+        super().__init__(message or f"job deadline exceeded during {stage}")
+        self.stage = stage
+
+    def as_result(self) -> Dict[str, Any]:
+        return {"status": "timeout", "stage": self.stage, "message": str(self)}
+
+
+class JobCancelled(DeadlineExceeded):
+    """Raised at the next upstream call of a cancelled job; every DeadlineExceeded handler stops there too."""
+
+    def __init__(self, stage: str):
+        super().__init__(stage, f"job cancelled during {stage}")
+
+    def as_result(self) -> Dict[str, Any]:
+        return {"status": "cancelled", "stage": self.stage, "message": str(self)}
+
+
+def _budgets(cfg: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    budgets = dict(DEFAULT_BUDGETS)
+    for name, value in (cfg or {}).items():
+        try:
+            if float(value) > 0:
+                budgets[name] = float(value)
+        except (TypeError, ValueError):
+            continue
+    return budgets
+
+
+class JobDeadline:
+    """Absolute wall-clock deadline for one job plus per-stage caps for each network call."""
+
+    def __init__(self, expires_at: float, budgets: Optional[Dict[str, float]] = None):
+        self.expires_at = float(expires_at)
+        self.budgets = dict(budgets or DEFAULT_BUDGETS)
+        self._timed_out: Dict[str, int] = {}
+        self._first_stage: Optional[str] = None
+        self._lock = threading.Lock()
+        self.cancelled = False
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]], seconds: Optional[float] = None, now: Optional[float] = None) -> "JobDeadline":
+        budgets = _budgets(cfg)
+        total = float(seconds) if seconds and seconds > 0 else budgets["job"]
+        return cls((now if now is not None else time.time()) + total, budgets)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.time()
+
+    def timeout_for(self, stage: str, default: Optional[float] = None) -> Optional[float]:
+        """Timeout for the next call in `stage`; raises DeadlineExceeded once the job is out of time."""
+        if self.cancelled:
+            raise JobCancelled(stage)
+        remaining = self.remaining()
+        if remaining <= 0:
+            self.note(stage)
+            raise DeadlineExceeded(stage)
+        caps = [v for v in (default, self.budgets.get(stage), remaining) if v]
+        return min(caps)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def note(self, stage: str) -> None:
+        with self._lock:
+            self._timed_out[stage] = self._timed_out.get(stage, 0) + 1
+            if self._first_stage is None:
+                self._first_stage = stage
+
+    @property
+    def timed_out_stage(self) -> Optional[str]:
+        return self._first_stage
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            timed_out = dict(self._timed_out)
+        return {
+            "expires_at": self.expires_at,
+            "remaining_s": round(max(0.0, self.remaining()), 1),
+            "timed_out": timed_out,
+        }
+
+
+_CURRENT: "contextvars.ContextVar[Optional[JobDeadline]]" = contextvars.ContextVar("job_deadline", default=None)
+
+
+def bind(deadline: Optional[JobDeadline]) -> "contextvars.Token":
+    return _CURRENT.set(deadline)
+
+
+def unbind(token: "contextvars.Token") -> None:
+    _CURRENT.reset(token)
+
+
+def current() -> Optional[JobDeadline]:
+    return _CURRENT.get()
+
+
+def timeout_for(stage: str, default: Optional[float] = None) -> Optional[float]:
+    """`default` outside a job; otherwise capped by the stage budget and the job's remaining time."""
+    d = _CURRENT.get()
+    if d is None:
+        return default
+    return d.timeout_for(stage, default)
+
+
+def note_timeout(stage: str) -> None:
+    d = _CURRENT.get()
+    if d is not None:
+        d.note(stage)
+
+
+def is_timeout_error(exc: BaseException) -> bool:
+    if isinstance(exc, (requests.Timeout, TimeoutError, concurrent.futures.TimeoutError)):
+        return True
+    # httpx (async engine) timeouts
+    return type(exc).__name__ in {"ReadTimeout", "ConnectTimeout", "WriteTimeout", "PoolTimeout", "TimeoutException"}
+
+
+@contextlib.contextmanager
+def guard(stage: str) -> Iterator[None]:
+    """Inside a job, report a transport timeout in `stage` as DeadlineExceeded."""
+    try:
+        yield
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        if _CURRENT.get() is None or not is_timeout_error(e):
+            raise
+        note_timeout(stage)
+        raise DeadlineExceeded(stage, f"{stage} timed out: {e}") from e
@@ -0,0 +1,162 @@
+"""
+/**
+ * @file backend/services/fair_queue_service.py
+ * @description 按用户公平的作业队列：每个 (优先级, 用户) 一个子队列，按加权赤字轮转（DRR）出队，
+ *              代价按图片张数计，大批量作业按张消耗配额，不会挡住其他用户的单张请求；
+ *              优先级（interactive / normal / bulk）决定每轮配额的权重；可限制单个用户同时运行的作业数。
+ */
+"""
+
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from typing import Any, Deque, Dict, Optional, Tuple
+
+PRIORITIES = {"interactive": 4, "normal": 2, "bulk": 1}  # class -> DRR weight
+DEFAULT_PRIORITY = "normal"
+DEFAULT_QUANTUM = 4  # images per round for weight 1
+DEFAULT_MAX_RUNNING_PER_USER = 2  # 0 = no cap
+
+Flow = Tuple[str, str]  # (priority, user)
+
+
+def normalize_priority(value: Optional[str]) -> str:
+    value = str(value or "").strip().lower()
+    return value if value in PRIORITIES else DEFAULT_PRIORITY
+
+
+class FairJobQueue:
+    """Blocking queue with the put / get / qsize / task_done surface the dispatcher already uses."""
+
+    def __init__(self, quantum: int = DEFAULT_QUANTUM, max_running_per_user: int = DEFAULT_MAX_RUNNING_PER_USER):
+        self._cond = threading.Condition()
+        self._flows: Dict[Flow, Deque[Tuple[Dict[str, Any], int]]] = {}
+        self._deficit: Dict[Flow, float] = {}
+        self._active: Deque[Flow] = collections.deque()
+        self._running: Dict[str, int] = collections.Counter()
+        self._credited = False  # whether the flow at the head got its quantum this visit
+        self.configure(quantum, max_running_per_user)
+
+    def configure(self, quantum: int, max_running_per_user: int) -> None:
+        with self._cond:
+            self.quantum = max(1, int(quantum))
+            self.max_running_per_user = max(0, int(max_running_per_user))
+            self._cond.notify_all()
+
+    def put(self, item: Dict[str, Any], user: str = "-1", priority: Optional[str] = None, cost: int = 1) -> None:
+        flow = (normalize_priority(priority), str(user or "-1"))
+        with self._cond:
+            q = self._flows.get(flow)
+            if q is None:
+                q = self._flows[flow] = collections.deque()
+                self._deficit[flow] = 0.0
+                self._active.append(flow)
+            q.append((item, max(1, int(cost))))
+            self._cond.notify()
+
+    def _eligible(self, flow: Flow) -> bool:
+        cap = self.max_running_per_user
+        return cap <= 0 or self._running[flow[1]] < cap
+
+    def _pick(self) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Deficit round robin over the flows whose user is under the running cap."""
+        if not any(self._eligible(f) for f in self._active):
+            return None
+        while True:
+            flow = self._active[0]
+            if not self._eligible(flow):
+                self._next_flow()
+                continue
+            if not self._credited:
+                # one quantum per visit; the flow is served while its deficit covers the next job
+                self._deficit[flow] += self.quantum * PRIORITIES[flow[0]]
+                self._credited = True
+            q = self._flows[flow]
+            item, cost = q[0]
+            if self._deficit[flow] < cost:
+                self._next_flow()
+                continue
+            q.popleft()
+            self._deficit[flow] -= cost
+            if not q:
+                # an emptied flow forgets its credit, as in DRR
+                del self._flows[flow], self._deficit[flow]
+                self._active.popleft()
+                self._credited = False
+            self._running[flow[1]] += 1
+            return item, flow[1]
+
+    def _next_flow(self) -> None:
+        self._active.rotate(-1)
+        self._credited = False
+
+    def get(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Next job; pair with done(user) when it finishes. Raises TimeoutError on timeout."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                picked = self._pick() if self._active else None
+                if picked is not None:
+                    item, user = picked
+                    item["_fair_user"] = user
+                    return item
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("no job available")
+                self._cond.wait(remaining)
+
+    def done(self, item: Dict[str, Any]) -> None:
+        user = item.get("_fair_user")
+        if user is None:
+            return
+        with self._cond:
+            self._running[user] = max(0, self._running[user] - 1)
+            if not self._running[user]:
+                del self._running[user]
+            self._cond.notify_all()
+
+    def remove(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Take a still-queued job out of its sub-queue; None if it is not queued (already dispatched)."""
+        with self._cond:
+            for flow, q in self._flows.items():
+                for entry in q:
+                    if entry[0].get("job_id") == job_id:
+                        q.remove(entry)
+                        if not q:
+                            if self._active[0] == flow:
+                                self._credited = False
+                            del self._flows[flow], self._deficit[flow]
+                            self._active.remove(flow)
+                        return entry[0]
+            return None
+
+    def task_done(self) -> None:
+        pass
+
+    def qsize(self) -> int:
+        with self._cond:
+            return sum(len(q) for q in self._flows.values())
+
+    def depths(self) -> Dict[str, Dict[str, Any]]:
+        """Per-user queue depth (jobs / images per priority class) and running jobs."""
+        with self._cond:
+            users: Dict[str, Dict[str, Any]] = {}
+            for (priority, user), q in self._flows.items():
+                u = users.setdefault(user, {"queued_jobs": 0, "queued_images": 0, "by_priority": {}, "running": 0})
+                u["queued_jobs"] += len(q)
+                u["queued_images"] += sum(c for _, c in q)
+                u["by_priority"][priority] = len(q)
+            for user, n in self._running.items():
+                users.setdefault(user, {"queued_jobs": 0, "queued_images": 0, "by_priority": {}, "running": 0})["running"] = n
+            return users
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Jobs ahead of job_id in its own sub-queue (1 = next for that user / priority), or None."""
+        with self._cond:
+            for q in self._flows.values():
+                for i, (item, _) in enumerate(q):
+                    if item.get("job_id") == job_id:
+                        return i + 1
+            return None
@@ -0,0 +1,193 @@
+"""
+/**
+ * @file backend/services/http_session_service.py
+ * @description 上游 HTTP 连接池：按 endpoint host 复用 keep-alive 会话，并统计连接复用情况；
+ *              配置变更后重建并关闭旧池，仍持有旧池的调用转到新池，不会在已关闭的池中新建会话。
+ */
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.config import load_settings
+
+
+# 与 background_task_service._IMAGE_GEN_EXECUTOR 的线程数保持一致
+DEFAULT_POOL_MAXSIZE = 8
+DEFAULT_POOL_CONNECTIONS = 4
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url or "")
+    return f"{parts.scheme or 'https'}://{parts.netloc}"
+
+
+class HTTPSessionPool:
+    """
+    Owns one requests.Session per upstream host, each mounted with an HTTPAdapter
+    whose urllib3 pool is sized to the executor width so steady-state calls reuse
+    warm TCP/TLS connections instead of handshaking per request.
+    """
+
+    def __init__(self, pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE, pool_block: bool = False):
+        self.pool_connections = max(1, int(pool_connections))
+        self.pool_maxsize = max(1, int(pool_maxsize))
+        self.pool_block = bool(pool_block)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _successor(self) -> "HTTPSessionPool":
+        pool = get_http_pool()
+        if pool is self:
+            raise RuntimeError("HTTP session pool is closed")
+        return pool
+
+    def session_for(self, url: str) -> requests.Session:
+        """Session for the url's host; once this pool is closed, a session of the current pool."""
+        key = _host_key(url)
+        with self._lock:
+            closed = self._closed
+            sess = None if closed else self._sessions.get(key)
+            if sess is None and not closed:
+                sess = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize,
+                    pool_block=self.pool_block,
+                )
+                sess.mount("https://", adapter)
+                sess.mount("http://", adapter)
+                self._sessions[key] = sess
+                self._counters[key] = {"requests": 0, "errors": 0}
+        if closed:
+            return self._successor().session_for(url)
+        return sess
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        with self._lock:
+            closed = self._closed
+        if closed:  # a caller still holding a pool replaced after a config change
+            return self._successor().request(method, url, **kwargs)
+        sess = self.session_for(url)
+        key = _host_key(url)
+        try:
+            resp = sess.request(method, url, **kwargs)
+        except Exception:
+            self._count(key, error=True)
+            raise
+        self._count(key)
+        return resp
+
+    def _count(self, key: str, error: bool = False) -> None:
+        with self._lock:
+            # setdefault: the pool may have been closed (and its counters kept) since session_for
+            c = self._counters.setdefault(key, {"requests": 0, "errors": 0})
+            c["requests"] += 1
+            if error:
+                c["errors"] += 1
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        hosts: Dict[str, Any] = {}
+        with self._lock:
+            items = list(self._sessions.items())
+            counters = {k: dict(v) for k, v in self._counters.items()}
+        for key, sess in items:
+            opened = 0
+            idle = 0
+            adapter = sess.get_adapter(key + "/")
+            pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+            if pools is not None:
+                for pool_key in list(pools.keys()):
+                    pool = pools.get(pool_key)
+                    if pool is None:
+                        continue
+                    opened += int(getattr(pool, "num_connections", 0) or 0)
+                    q = getattr(pool, "pool", None)
+                    if q is not None:
+                        # 队列中非 None 的元素即为空闲的已建立连接
+                        idle += sum(1 for c in list(getattr(q, "queue", [])) if c is not None)
+            reqs = counters.get(key, {}).get("requests", 0)
+            hosts[key] = {
+                "requests": reqs,
+                "errors": counters.get(key, {}).get("errors", 0),
+                "connections_opened": opened,
+                "idle_connections": idle,
+                "reuse_ratio": round(1 - (opened / reqs), 4) if reqs else 0.0,
+            }
+        return {
+            "pool_connections": self.pool_connections,
+            "pool_maxsize": self.pool_maxsize,
+            "pool_block": self.pool_block,
+            "hosts": hosts,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for s in sessions:
+            try:
+                s.close()
+            except Exception:
+                pass
+
+
+_POOL: Optional[HTTPSessionPool] = None
+_POOL_CFG: Optional[Tuple[int, int, bool]] = None
+_POOL_SETTINGS: Any = None  # the Settings object _POOL_CFG was read from
+_POOL_LOCK = threading.Lock()
+
+
+def _pool_config(settings: Any) -> Tuple[int, int, bool]:
+    cfg = settings.http_pool
+    try:
+        maxsize = int(cfg.get("pool_maxsize", DEFAULT_POOL_MAXSIZE))
+    except Exception:
+        maxsize = DEFAULT_POOL_MAXSIZE
+    try:
+        conns = int(cfg.get("pool_connections", DEFAULT_POOL_CONNECTIONS))
+    except Exception:
+        conns = DEFAULT_POOL_CONNECTIONS
+    return conns, maxsize, bool(cfg.get("pool_block", False))
+
+
+def get_http_pool() -> HTTPSessionPool:
+    """Shared pool; rebuilt when http_pool settings change.
+
+    The http_pool section is only re-read when load_settings() hands back a new Settings
+    object (after a reload). The replaced pool is closed so its idle keep-alive sockets are
+    released; calls already in flight finish on their checked-out connection, which is then
+    dropped instead of pooled, and later calls through the old pool go to the new one.
+    """
+    global _POOL, _POOL_CFG, _POOL_SETTINGS
+    settings = load_settings()
+    pool = _POOL
+    if pool is not None and settings is _POOL_SETTINGS:
+        return pool
+    cfg = _pool_config(settings)
+    replaced = None
+    with _POOL_LOCK:
+        if _POOL is None or cfg != _POOL_CFG:
+            replaced = _POOL
+            _POOL = HTTPSessionPool(pool_connections=cfg[0], pool_maxsize=cfg[1], pool_block=cfg[2])
+            _POOL_CFG = cfg
+        _POOL_SETTINGS = settings
+        pool = _POOL
+    if replaced is not None:
+        replaced.close()
+    return pool
@@ -3,6 +3,7 @@ import json
 import hashlib
 from typing import Dict, Any, List
 from backend.services.db_service import DBService
+from backend.services.zh_enrichment_service import SUPPLEMENT_TYPE
 
 
 class IngestService:
@@ -48,6 +49,9 @@ class IngestService:
         items_inserted = 0
         if not os.path.isfile(file_path):
             return {"total": 0, "inserted": 0, "items_inserted": 0}
+        supplements = 0
+        # RecordService hashes lines with their trailing newline; remember both forms for supplement lookups
+        seen: Dict[str, int] = {}
         with open(file_path, "r", encoding="utf-8") as f:
             for line in f:
                 line = line.strip()
@@ -55,6 +59,9 @@ class IngestService:
                     continue
                 total += 1
                 obj = json.loads(line)
+                if obj.get("类型") == SUPPLEMENT_TYPE:
+                    supplements += self._apply_supplement(obj, seen)
+                    continue
                 payload = self._map_record(obj)
                 h = hashlib.sha256(line.encode("utf-8")).hexdigest()
                 payload["content_hash"] = h
@@ -64,6 +71,23 @@ class IngestService:
                 rows = self.svc.add_items(rid, self._map_items(obj))
                 items_inserted += len(rows)
                 self.svc.update_record(rid, {"item_count": len(rows), "status": "completed"})
+                seen[h] = seen[hashlib.sha256((line + "\n").encode("utf-8")).hexdigest()] = rid
                 inserted += 1
-        return {"total": total, "inserted": inserted, "items_inserted": items_inserted}
+        return {"total": total, "inserted": inserted, "items_inserted": items_inserted, "zh_supplements": supplements}
+
+    def _apply_supplement(self, obj: Dict[str, Any], seen: Dict[str, int]) -> int:
+        """zh translations appended after the record was written; fill the matching record instead of inserting."""
+        h = obj.get("原记录哈希")
+        rid = seen.get(h)
+        if rid is None:
+            rec = None
+            if obj.get("job_id"):
+                rec = self.svc.records.by_job_id(obj["job_id"])
+            if rec is None and h:
+                rec = self.svc.records.by_content_hash(h)
+            rid = rec.get("id") if rec else None
+        if rid is None:
+            return 0
+        self.svc.records.fill_zh(rid, obj.get("优化后正向提示词中文"), obj.get("优化后反向提示词中文"))
+        return 1
 
@@ -0,0 +1,108 @@
+"""
+/**
+ * @file backend/services/job_metrics_service.py
+ * @description 作业分阶段耗时统计：排队等待、refine_prompt、_translate、提交、轮询、下载、写记录等阶段
+ *              按作业累计，随 /api/tasks/group/{job_id} 返回，供压测脚本汇总。
+ */
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+STAGES = ("queue_wait", "refine_prompt", "translate", "submit", "poll", "download", "add_record")
+
+
+class JobTimings:
+    """Per-job accumulator; safe to update from the dispatcher, executor threads and the async engine."""
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            s = self._stages.setdefault(stage, {"count": 0, "total": 0.0, "max": 0.0})
+            s["count"] += 1
+            s["total"] += seconds
+            if seconds > s["max"]:
+                s["max"] = seconds
+
+    def finish(self) -> None:
+        self.finished_at = time.time()
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                name: {"count": int(s["count"]), "total_ms": round(s["total"] * 1000, 1), "max_ms": round(s["max"] * 1000, 1)}
+                for name, s in self._stages.items()
+            }
+        end = self.finished_at or time.time()
+        return {"finished": self.finished_at is not None, "wall_ms": round((end - self.started_at) * 1000, 1), "stages": stages}
+
+
+_CURRENT: "contextvars.ContextVar[Optional[JobTimings]]" = contextvars.ContextVar("job_timings", default=None)
+
+
+def bind(timings: Optional[JobTimings]) -> "contextvars.Token":
+    """Attach `timings` to the current thread / coroutine; pair with unbind(token)."""
+    return _CURRENT.set(timings)
+
+
+def unbind(token: "contextvars.Token") -> None:
+    _CURRENT.reset(token)
+
+
+def current() -> Optional[JobTimings]:
+    return _CURRENT.get()
+
+
+def record(stage: str, seconds: float) -> None:
+    t = _CURRENT.get()
+    if t is not None:
+        t.add(stage, seconds)
+
+
+@contextlib.contextmanager
+def job_stage(stage: str) -> Iterator[None]:
+    """Time the enclosed block into the bound job (no-op outside a job). Nested stages are inclusive."""
+    t = _CURRENT.get()
+    if t is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        t.add(stage, time.perf_counter() - start)
+
+
+def timed_stage(stage: str) -> Callable:
+    """Decorator form of job_stage for sync and async callables."""
+
+    def deco(fn: Callable) -> Callable:
+        import inspect
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with job_stage(stage):
+                    return await fn(*args, **kwargs)
+
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with job_stage(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
@@ -0,0 +1,119 @@
+"""
+/**
+ * @file backend/services/job_status_service.py
+ * @description 作业状态的内存存储：条目数有上限，结束的作业保留 ttl_seconds 后淘汰（超出 max_jobs 时从最早结束的开始淘汰，
+ *              运行中的作业不淘汰），内存占用不随运行时长增长。淘汰后的作业状态按需从 jobs 表或 records 表重建。
+ *              写入 jobs 表的结果会去掉内联的 data URL，避免大段 base64 长期驻留。
+ */
+"""
+
+from __future__ import annotations
+
+import collections
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_MAX_JOBS = 2000
+DEFAULT_TTL_SECONDS = 900
+INLINE_URL_LIMIT = 2048  # data: URLs longer than this are not persisted
+
+
+class JobStatusStore:
+    """Dict-like job_id -> status map; callers hold their own lock (background_task_service._STATUS_LOCK)."""
+
+    def __init__(self, max_jobs: int = DEFAULT_MAX_JOBS, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self._items: Dict[str, Any] = {}
+        self._finished: "collections.OrderedDict[str, float]" = collections.OrderedDict()  # finish order
+        self.evicted = 0
+        self.configure(max_jobs, ttl_seconds)
+
+    def configure(self, max_jobs: int, ttl_seconds: float) -> None:
+        self.max_jobs = max(1, int(max_jobs))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.sweep()
+
+    def __setitem__(self, job_id: str, status: Any) -> None:
+        self._items[job_id] = status
+        self._finished.pop(job_id, None)  # a recovered job is active again
+        self.sweep()
+
+    def __getitem__(self, job_id: str) -> Any:
+        return self._items[job_id]
+
+    def __delitem__(self, job_id: str) -> None:
+        del self._items[job_id]
+        self._finished.pop(job_id, None)
+
+    def __contains__(self, job_id: object) -> bool:
+        return job_id in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def get(self, job_id: str, default: Any = None) -> Any:
+        return self._items.get(job_id, default)
+
+    def mark_finished(self, job_id: str, now: Optional[float] = None) -> None:
+        """Start the job's TTL; from now on it may be evicted."""
+        if job_id not in self._items:
+            return
+        self._finished.pop(job_id, None)
+        self._finished[job_id] = time.time() if now is None else now
+        self.sweep(now)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop finished jobs past the TTL, then the oldest finished ones while over max_jobs."""
+        now = time.time() if now is None else now
+        dropped = 0
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if now - finished_at < self.ttl_seconds and len(self._items) <= self.max_jobs:
+                break
+            del self._finished[job_id]
+            self._items.pop(job_id, None)
+            dropped += 1
+        self.evicted += dropped
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": len(self._items),
+            "finished": len(self._finished),
+            "evicted": self.evicted,
+            "max_jobs": self.max_jobs,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+def compact_results(results: List[Any]) -> List[Any]:
+    """Results as persisted: long inline data URLs are dropped (the image stays reachable via saved_path / records)."""
+    out = []
+    for r in results or []:
+        if isinstance(r, dict):
+            r = {
+                k: v for k, v in r.items()
+                if not (isinstance(v, str) and v.startswith("data:") and len(v) > INLINE_URL_LIMIT)
+            }
+            if isinstance(r.get("images"), list):
+                r["images"] = compact_results(r["images"])
+        out.append(r)
+    return out
+
+
+def results_from_record(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rebuild status results from a record's items (relative_url is the /api/images/{id}/raw URL)."""
+    results = []
+    for item in items:
+        original = item.get("relative_url") or ""
+        thumb = original[: -len("/raw")] + "/thumb" if original.endswith("/raw") else original
+        results.append({
+            "status": "success",
+            "url": thumb,
+            "originalUrl": original,
+            "saved_path": item.get("absolute_path"),
+            "seed": item.get("seed"),
+        })
+    return results
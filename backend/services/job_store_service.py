@@ -0,0 +1,256 @@
+"""
+/**
+ * @file backend/services/job_store_service.py
+ * @description 持久化作业队列：作业提交时写入 SQLite（jobs 表，含作业上下文、用户与优先级），
+ *              状态变化与单个任务的完成 / 失败（job_tasks 表）先在内存合并，由后台线程按 flush_ms 批量写入（WAL）；
+ *              作业持有租约并定期续租，租约过期（进程退出或崩溃）的作业由任一进程接管后重新入队，
+ *              已完成的任务沿用保存的结果，重试次数超过 max_attempts 的作业标记为失败。
+ *              同一后台线程定期清理已结束的作业：超过 retention_seconds 或超出 max_finished_jobs 条的最早作业连同其任务行删除。
+ */
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.config import load_settings
+from backend.db.repositories import JobsRepo
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATES = ("submitted", "processing", "running")
+TASK_DONE = "done"
+TASK_FAILED = "failed"
+
+DEFAULT_FLUSH_MS = 200
+DEFAULT_LEASE_SECONDS = 30
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 3600  # finished jobs older than this are deleted; 0 = keep
+DEFAULT_MAX_FINISHED_JOBS = 10000  # newest finished jobs kept; 0 = no cap
+PURGE_INTERVAL_SECONDS = 60
+
+INSTANCE_ID = uuid.uuid4().hex  # lease owner for this process
+
+# kind -> (generator, processor, async_processor); controllers register the callables
+# their jobs run with so a recovered job can be executed again after a restart
+_KINDS: Dict[str, Tuple[Callable, Callable, Optional[Callable]]] = {}
+
+
+def register_kind(kind: str, generator: Callable, processor: Callable, async_processor: Optional[Callable] = None) -> None:
+    _KINDS[kind] = (generator, processor, async_processor)
+
+
+def handlers(kind: Optional[str]) -> Optional[Tuple[Callable, Callable, Optional[Callable]]]:
+    return _KINDS.get(kind or "")
+
+
+def store_enabled(settings=None) -> bool:
+    settings = settings or load_settings()
+    return bool(settings.job_store.get("enabled", False))
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _loads(text: Optional[str], default: Any = None) -> Any:
+    if not text:
+        return default
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return default
+
+
+class JobStore:
+    def __init__(self, flush_ms: int = DEFAULT_FLUSH_MS, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, repo: Optional[JobsRepo] = None,
+                 retention_seconds: float = DEFAULT_RETENTION_SECONDS, max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS):
+        self.flush_ms = max(10, int(flush_ms))
+        self.lease_seconds = max(1.0, float(lease_seconds))
+        self.max_attempts = max(1, int(max_attempts))
+        self.retention_seconds = max(0.0, float(retention_seconds))
+        self.max_finished_jobs = max(0, int(max_finished_jobs))
+        self._repo = repo or JobsRepo()
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}  # job_id -> merged patch awaiting flush
+        self._tasks: Dict[Tuple[str, int], Tuple[Any, ...]] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._on_recover: Optional[Callable[[Dict[str, Any], Dict[int, Any]], None]] = None
+        self._last_renew = self._last_reap = self._last_purge = 0.0
+        self._stats = {"flushes": 0, "rows": 0, "recovered": 0, "abandoned": 0, "purged": 0}
+
+    def _lease(self) -> float:
+        return time.time() + self.lease_seconds
+
+    # -- writes ---------------------------------------------------------------------------
+    def create(self, job_id: str, kind: str, context: Dict[str, Any], user: str, priority: str, total: int) -> None:
+        """Written synchronously: once /api/generate has answered, the job survives a crash."""
+        now = time.time()
+        self._repo.insert({
+            "job_id": job_id, "kind": kind, "user_id": user, "priority": priority,
+            "context": _dumps(context), "state": "submitted", "total_tasks": total,
+            "lease_owner": INSTANCE_ID, "lease_until": now + self.lease_seconds, "created_at": now,
+        })
+
+    def claim(self, job_id: str) -> int:
+        """Lease the job for one run when a dispatcher slot picks it up; returns the attempt number."""
+        self.flush()  # earlier patches of this job must not land after the claim
+        return self._repo.claim(job_id, INSTANCE_ID, self._lease())
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if "results" in fields and not isinstance(fields["results"], (str, type(None))):
+            fields["results"] = _dumps(fields["results"])
+        fields["updated_at"] = time.time()
+        with self._lock:
+            self._jobs.setdefault(job_id, {}).update(fields)
+        if fields.get("state") not in ACTIVE_STATES:
+            self._wake.set()
+
+    def task_done(self, job_id: str, index: int, result: Any, params: Optional[Dict[str, Any]] = None) -> None:
+        """`params` are the task's prompt / seed fields, reapplied when a recovered run skips the task."""
+        ok = isinstance(result, dict) and result.get("status") == "success"
+        with self._lock:
+            self._tasks[(job_id, index)] = (
+                job_id, index, TASK_DONE if ok else TASK_FAILED, _dumps(result), _dumps(params or {}), time.time(),
+            )
+
+    def flush(self) -> int:
+        with self._lock:
+            jobs, self._jobs = list(self._jobs.items()), {}
+            tasks, self._tasks = list(self._tasks.values()), {}
+        if not jobs and not tasks:
+            return 0
+        try:
+            self._repo.apply_batch(jobs, tasks)
+        except Exception as e:
+            logger.error(f"job store flush failed ({len(jobs)} jobs, {len(tasks)} tasks): {e}")
+            with self._lock:  # keep them for the next round, newer patches win
+                for job_id, patch in jobs:
+                    self._jobs[job_id] = {**patch, **self._jobs.get(job_id, {})}
+                for row in tasks:
+                    self._tasks.setdefault((row[0], row[1]), row)
+            return 0
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["rows"] += len(jobs) + len(tasks)
+        return len(jobs) + len(tasks)
+
+    # -- reads ----------------------------------------------------------------------------
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Persisted job row with decoded context / results (pending patches applied)."""
+        row = self._repo.get(job_id)
+        if row is None:
+            return None
+        with self._lock:
+            row.update(self._jobs.get(job_id, {}))
+        row["context"] = _loads(row.get("context"), {})
+        row["results"] = _loads(row.get("results"), [])
+        return row
+
+    def finished_tasks(self, job_id: str) -> Dict[int, Dict[str, Any]]:
+        """{"result", "params"} of the tasks that succeeded in an earlier run, by task index."""
+        self.flush()
+        return {
+            int(r["task_index"]): {"result": _loads(r.get("result")), "params": _loads(r.get("params"), {})}
+            for r in self._repo.tasks(job_id) if r.get("state") == TASK_DONE
+        }
+
+    def owns(self, job_id: str) -> bool:
+        """Whether the job is still active here, i.e. a lease take-over (not upstream resume) finishes it."""
+        row = self._repo.get(job_id)
+        return row is not None and row.get("state") in ACTIVE_STATES
+
+    # -- leases and recovery --------------------------------------------------------------
+    def reap(self) -> int:
+        """Take over active jobs whose lease ran out and hand them to on_recover."""
+        recovered = 0
+        for row in self._repo.expired(time.time(), ACTIVE_STATES):
+            if not self._repo.take_over(row["job_id"], INSTANCE_ID, self._lease(), row.get("lease_until")):
+                continue  # another process got it first
+            if int(row.get("attempts") or 0) >= self.max_attempts or handlers(row.get("kind")) is None:
+                reason = "gave up after repeated interruptions" if handlers(row.get("kind")) else f"no handler for job kind {row.get('kind')!r}"
+                self.update(row["job_id"], state="failed", results=[{"status": "failed", "message": reason}])
+                with self._lock:
+                    self._stats["abandoned"] += 1
+                logger.error(f"job {row['job_id']} not recovered: {reason}")
+                continue
+            row["context"] = _loads(row.get("context"), {})
+            logger.info(f"recovering job {row['job_id']} (state {row.get('state')}, attempt {int(row.get('attempts') or 0) + 1})")
+            if self._on_recover is not None:
+                self._on_recover(row, self.finished_tasks(row["job_id"]))
+            recovered += 1
+        with self._lock:
+            self._stats["recovered"] += recovered
+        return recovered
+
+    # -- retention ------------------------------------------------------------------------
+    def purge(self, now: Optional[float] = None) -> int:
+        """Delete finished jobs past retention_seconds or beyond the newest max_finished_jobs."""
+        if not self.retention_seconds and not self.max_finished_jobs:
+            return 0
+        self.flush()  # final states still pending must not be purged as stale rows
+        now = time.time() if now is None else now
+        before = now - self.retention_seconds if self.retention_seconds else 0.0
+        purged = self._repo.purge_finished(ACTIVE_STATES, before, self.max_finished_jobs)
+        if purged:
+            with self._lock:
+                self._stats["purged"] += purged
+            logger.info(f"purged {purged} finished job(s) from the job store")
+        return purged
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait(self.flush_ms / 1000.0)
+            self._wake.clear()
+            try:
+                self.flush()
+                now = time.time()
+                if now - self._last_renew >= self.lease_seconds / 3:
+                    self._repo.renew(INSTANCE_ID, self._lease(), ACTIVE_STATES)
+                    self._last_renew = now
+                if now - self._last_reap >= self.lease_seconds / 2:
+                    self._last_reap = now
+                    self.reap()
+                if now - self._last_purge >= PURGE_INTERVAL_SECONDS:
+                    self._last_purge = now
+                    self.purge(now)
+            except Exception as e:
+                logger.error(f"job store maintenance failed: {e}")
+
+    def start(self, on_recover: Callable[[Dict[str, Any], Dict[int, Any]], None]) -> None:
+        """Start the writer / lease thread; expired jobs found now and later go to on_recover."""
+        self._on_recover = on_recover
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="job-store")
+        self._thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "pending": len(self._jobs) + len(self._tasks), "instance": INSTANCE_ID}
+
+
+_STORE: Optional[JobStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            cfg = load_settings().job_store
+            _STORE = JobStore(
+                flush_ms=cfg.get("flush_ms", DEFAULT_FLUSH_MS),
+                lease_seconds=cfg.get("lease_seconds", DEFAULT_LEASE_SECONDS),
+                max_attempts=cfg.get("max_attempts", DEFAULT_MAX_ATTEMPTS),
+                retention_seconds=cfg.get("retention_seconds", DEFAULT_RETENTION_SECONDS),
+                max_finished_jobs=cfg.get("max_finished_jobs", DEFAULT_MAX_FINISHED_JOBS),
+            )
+        return _STORE
@@ -0,0 +1,198 @@
+"""
+/**
+ * @file backend/services/model_admission_service.py
+ * @description 按模型的并发准入控制：依据 models.max_limit 限制每个模型同时在途的生成数，
+ *              超限任务在模型队列中等待而不占用执行线程；等待中的任务按 (优先级, 用户) 分子队列，
+ *              以图片张数为代价做加权赤字轮转（DRR），单张请求不会排在他人大批量作业的剩余图片之后；上限修改后热更新。
+ */
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from backend.services.fair_queue_service import PRIORITIES, Flow, normalize_priority
+from backend.services.model_service import get_model_limits
+
+
+logger = logging.getLogger("model_admission")
+
+Launch = Callable[[], "concurrent.futures.Future[Any]"]
+Pending = Tuple[Launch, "concurrent.futures.Future[Any]", int]
+
+DEFAULT_FLOW: Flow = ("normal", "-1")
+QUANTUM = 1  # images per visit for weight 1: flows take turns image by image
+
+
+class _Lane:
+    __slots__ = ("model", "limit", "running", "pending", "deficit", "active", "credited", "admitted")
+
+    def __init__(self, model: str, limit: int):
+        self.model = model
+        self.limit = limit
+        self.running = 0
+        self.pending: Dict[Flow, Deque[Pending]] = {}
+        self.deficit: Dict[Flow, float] = {}
+        self.active: Deque[Flow] = collections.deque()
+        self.credited = False  # whether the flow at the head got its quantum this visit
+        self.admitted = 0
+
+    def push(self, flow: Flow, launch: Launch, outer: "concurrent.futures.Future[Any]", cost: int) -> None:
+        q = self.pending.get(flow)
+        if q is None:
+            q = self.pending[flow] = collections.deque()
+            self.deficit[flow] = 0.0
+            self.active.append(flow)
+        q.append((launch, outer, cost))
+
+    def pop(self) -> Tuple[Launch, "concurrent.futures.Future[Any]"]:
+        """Deficit round robin over the waiting (priority, user) flows, as in FairJobQueue."""
+        while True:
+            flow = self.active[0]
+            if not self.credited:
+                self.deficit[flow] += QUANTUM * PRIORITIES[flow[0]]
+                self.credited = True
+            q = self.pending[flow]
+            launch, outer, cost = q[0]
+            if self.deficit[flow] < cost:
+                self.active.rotate(-1)
+                self.credited = False
+                continue
+            q.popleft()
+            self.deficit[flow] -= cost
+            if not q:
+                del self.pending[flow], self.deficit[flow]
+                self.active.popleft()
+                self.credited = False
+            return launch, outer
+
+    def queued(self) -> int:
+        return sum(len(q) for q in self.pending.values())
+
+
+class ModelAdmission:
+    """
+    Per-model admission queue. submit() returns a Future immediately; the launch
+    callable (which hands the work to an executor or the async engine) only runs
+    once the model has a free slot. A limit <= 0 means unlimited. Waiting tasks are
+    admitted per (priority, user) flow by deficit round robin, costed by image count.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self._lanes: Dict[str, _Lane] = {}
+        self._lock = threading.Lock()
+        self.set_limits(limits or {})
+
+    def set_limits(self, limits: Dict[str, int]) -> None:
+        to_start = []
+        with self._lock:
+            for model, limit in limits.items():
+                lane = self._lanes.get(model)
+                if lane is None:
+                    self._lanes[model] = _Lane(model, int(limit))
+                else:
+                    lane.limit = int(limit)
+            for model, lane in self._lanes.items():
+                if model not in limits:
+                    lane.limit = 0
+                to_start.extend(self._drain(lane))
+        for lane, launch, outer in to_start:
+            self._start(lane.model, launch, outer)
+        if limits:
+            logger.info(f"model limits applied: {limits}")
+
+    def _drain(self, lane: _Lane):
+        # caller holds self._lock
+        ready = []
+        while lane.active and (lane.limit <= 0 or lane.running < lane.limit):
+            launch, outer = lane.pop()
+            lane.running += 1
+            lane.admitted += 1
+            ready.append((lane, launch, outer))
+        return ready
+
+    def submit(self, model: str, launch: Launch, flow: Optional[Flow] = None, cost: int = 1) -> "concurrent.futures.Future[Any]":
+        """`flow` is the job's (priority, user); `cost` its image count (n of a batched task)."""
+        outer: "concurrent.futures.Future[Any]" = concurrent.futures.Future()
+        model = model or ""
+        flow = (normalize_priority(flow[0]), str(flow[1] or "-1")) if flow else DEFAULT_FLOW
+        with self._lock:
+            lane = self._lanes.get(model)
+            if lane is None:
+                lane = self._lanes[model] = _Lane(model, 0)
+            if not lane.active and (lane.limit <= 0 or lane.running < lane.limit):
+                lane.running += 1
+                lane.admitted += 1
+                admitted = True
+            else:
+                lane.push(flow, launch, outer, max(1, int(cost)))
+                admitted = False
+        if admitted:
+            self._start(model, launch, outer)
+        return outer
+
+    def _start(self, model: str, launch: Launch, outer: "concurrent.futures.Future[Any]") -> None:
+        try:
+            inner = launch()
+        except Exception as e:
+            outer.set_exception(e)
+            self._release(model)
+            return
+
+        def _done(f: "concurrent.futures.Future[Any]") -> None:
+            try:
+                outer.set_result(f.result())
+            except BaseException as e:
+                outer.set_exception(e)
+            finally:
+                self._release(model)
+
+        inner.add_done_callback(_done)
+
+    def _release(self, model: str) -> None:
+        with self._lock:
+            lane = self._lanes.get(model)
+            if lane is None:
+                return
+            lane.running = max(0, lane.running - 1)
+            to_start = self._drain(lane)
+        for ready_lane, launch, outer in to_start:
+            self._start(ready_lane.model, launch, outer)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                model: {"limit": lane.limit, "running": lane.running, "queued": lane.queued(), "admitted": lane.admitted}
+                for model, lane in self._lanes.items()
+            }
+
+
+_ADMISSION: Optional[ModelAdmission] = None
+_ADMISSION_LOCK = threading.Lock()
+
+
+def get_model_admission() -> ModelAdmission:
+    global _ADMISSION
+    with _ADMISSION_LOCK:
+        if _ADMISSION is None:
+            _ADMISSION = ModelAdmission(_safe_limits())
+        return _ADMISSION
+
+
+def reload_model_limits() -> Dict[str, int]:
+    """Re-read models.max_limit and apply it to the running admission queues."""
+    limits = _safe_limits()
+    get_model_admission().set_limits(limits)
+    return limits
+
+
+def _safe_limits() -> Dict[str, int]:
+    try:
+        return get_model_limits()
+    except Exception as e:
+        logger.error(f"load model limits failed: {e}")
+        return {}
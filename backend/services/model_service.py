@@ -1,6 +1,8 @@
 from typing import List, Dict, Any, Optional
 from backend.db.connection import get_conn
 
+DEFAULT_MODEL_LIMITS: Dict[str, int] = {"wan2.6-t2i": 2, "z-image-turbo": 4}
+
 def list_models() -> List[Dict[str, Any]]:
     with get_conn() as conn:
         cur = conn.execute("SELECT id, name, provider, model_name, description, enabled, max_limit FROM models ORDER BY name ASC")
@@ -67,3 +69,19 @@ def get_model_id_by_model_name(model_name: str) -> Optional[str]:
 def update_limit_by_model_name(model_name: str, limit: int) -> None:
     with get_conn() as conn:
         conn.execute("UPDATE models SET max_limit = ? WHERE model_name = ?", [int(limit), model_name])
+
+def get_model_limits() -> Dict[str, int]:
+    """
+    model_name -> max_limit from the models table; falls back to DEFAULT_MODEL_LIMITS
+    when the table is empty.
+    """
+    limits: Dict[str, int] = {}
+    try:
+        for m in list_models():
+            if m.get("model_name"):
+                limits[m["model_name"]] = int(m.get("max_limit") or 0)
+    except Exception:
+        pass
+    if not limits:
+        limits = dict(DEFAULT_MODEL_LIMITS)
+    return limits
@@ -0,0 +1,172 @@
+"""
+/**
+ * @file backend/services/prompt_cache_service.py
+ * @description 提示词优化结果的两级缓存：进程内 LRU（带 TTL）+ SQLite（refine_cache 表，重启后仍可命中）。
+ *              键为规范化后的 (prompt, category, style, negative, role, qwen 模型)，值包含中英文正/负向提示词。
+ *              所有 DashScopeClient 实例共用同一缓存，命中/未命中统计经 /health 输出。
+ */
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from backend.config import load_settings
+from backend.db.repositories import RefineCacheRepo
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+_FIELDS = ("positive_prompt", "negative_prompt", "positive_prompt_zh", "negative_prompt_zh")
+
+
+def _normalize(value: Any) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+def make_key(prompt: str, category: str, style: str, negative: str, role: str, model: str) -> str:
+    """Whitespace / case-insensitive key; hashed so long role texts stay cheap to store and compare."""
+    parts = [_normalize(v) for v in (prompt, category, style, negative, role, model)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class RefineCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS, persist: bool = True, repo: Optional[RefineCacheRepo] = None):
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._repo = repo or RefineCacheRepo()
+        self._counters = {"hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "db_errors": 0}
+        self.configure(max_entries, ttl_seconds, persist)
+
+    def configure(self, max_entries: int, ttl_seconds: float, persist: bool) -> None:
+        with self._lock:
+            self.max_entries = max(1, int(max_entries))
+            self.ttl_seconds = float(ttl_seconds)
+            self.persist = bool(persist)
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _fresh(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds <= 0 or now - stored_at < self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self._fresh(stored_at, now):
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return dict(value)
+                del self._entries[key]
+                self._counters["expired"] += 1
+            persist = self.persist
+        row = None
+        if persist:
+            try:
+                row = self._repo.get(key)
+            except Exception as e:
+                self._count("db_errors")
+                logger.warning(f"refine cache read failed: {e}")
+        with self._lock:
+            if row and self._fresh(float(row.get("created_at") or 0), now):
+                value = {
+                    "positive_prompt": row.get("positive"),
+                    "negative_prompt": row.get("negative"),
+                    "positive_prompt_zh": row.get("positive_zh"),
+                    "negative_prompt_zh": row.get("negative_zh"),
+                }
+                self._entries[key] = (value, float(row["created_at"]))
+                self._evict_locked()
+                self._counters["db_hits"] += 1
+                return dict(value)
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, value: Dict[str, Any], model: str = "") -> None:
+        now = time.time()
+        stored = {k: value.get(k) for k in _FIELDS}
+        with self._lock:
+            self._entries[key] = (stored, now)
+            self._entries.move_to_end(key)
+            self._evict_locked()
+            self._counters["stores"] += 1
+            persist = self.persist
+        if persist:
+            try:
+                self._repo.upsert(key, {
+                    "positive": stored["positive_prompt"],
+                    "negative": stored["negative_prompt"],
+                    "positive_zh": stored["positive_prompt_zh"],
+                    "negative_zh": stored["negative_prompt_zh"],
+                    "model": model,
+                    "created_at": now,
+                })
+            except Exception as e:
+                self._count("db_errors")
+                logger.warning(f"refine cache write failed: {e}")
+
+    def purge_expired(self) -> int:
+        """Drop expired rows from SQLite (memory entries expire lazily)."""
+        if self.ttl_seconds <= 0 or not self.persist:
+            return 0
+        try:
+            return self._repo.delete_older_than(time.time() - self.ttl_seconds)
+        except Exception as e:
+            self._count("db_errors")
+            logger.warning(f"refine cache purge failed: {e}")
+            return 0
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        lookups = counters["hits"] + counters["db_hits"] + counters["misses"]
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "persist": self.persist,
+            "hit_rate": round((counters["hits"] + counters["db_hits"]) / lookups, 3) if lookups else None,
+            **counters,
+        }
+
+
+_CACHE: Optional[RefineCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_refine_cache() -> RefineCache:
+    """Process-wide cache; limits follow the refine_cache settings without dropping entries."""
+    global _CACHE
+    cfg = load_settings().refine_cache
+    max_entries = cfg.get("max_entries", DEFAULT_MAX_ENTRIES)
+    ttl = cfg.get("ttl_seconds", DEFAULT_TTL_SECONDS)
+    persist = cfg.get("persist", True)
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = RefineCache(max_entries, ttl, persist)
+            _CACHE.purge_expired()
+        elif (_CACHE.max_entries, _CACHE.ttl_seconds, _CACHE.persist) != (max(1, int(max_entries)), float(ttl), bool(persist)):
+            _CACHE.configure(max_entries, ttl, persist)
+        return _CACHE
@@ -0,0 +1,135 @@
+"""
+/**
+ * @file backend/services/prompt_variation_service.py
+ * @description 本地确定性提示词变体引擎：按分类的修饰词词表（光线、镜头、角度、氛围、质感）对上一张的正向提示词
+ *              做小幅调整，不调用 Qwen。词表 = 内置默认 + 配置 prompt_variation + 分类提示词（prompts 表 / prompts_map），
+ *              同一 (种子, 提示词, 比例) 结果恒定，便于复现。
+ */
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import random
+import re
+from typing import Any, Dict, List, Optional
+
+from backend.config import load_settings
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("qwen", "local")
+FACETS = ("lighting", "lens", "angle", "atmosphere", "texture")
+# core prompt and its variation modifiers are kept apart so a chain does not grow step by step
+SEPARATOR = " | "
+
+DEFAULT_VOCAB: Dict[str, List[str]] = {
+    "lighting": ["soft golden hour light", "cool rim lighting", "diffused overcast light", "dramatic side lighting",
+                 "warm backlight glow", "high-key studio lighting", "low-key chiaroscuro lighting", "neon accent lighting"],
+    "lens": ["35mm lens", "50mm prime lens", "85mm portrait lens", "wide-angle 24mm lens",
+             "telephoto compression", "shallow depth of field", "deep focus", "subtle lens flare"],
+    "angle": ["eye-level shot", "slightly low angle", "slightly high angle", "three-quarter view",
+              "close-up framing", "medium shot", "over-the-shoulder view", "dutch tilt"],
+    "atmosphere": ["light haze", "drifting mist", "crisp clear air", "floating dust particles",
+                   "gentle rain", "calm serene mood", "cinematic tension", "dreamy ambience"],
+    "texture": ["fine film grain", "ultra-detailed surface texture", "matte finish", "glossy reflections",
+                "weathered details", "micro-detail sharpness", "soft painterly texture", "subtle specular highlights"],
+}
+
+DEFAULT_CATEGORY_VOCAB: Dict[str, Dict[str, List[str]]] = {
+    "人物": {"lens": ["catchlight in the eyes", "bokeh background"], "texture": ["natural skin texture", "fabric weave detail"]},
+    "动物": {"angle": ["ground-level perspective"], "texture": ["individual fur strands", "detailed feathers"]},
+    "机械": {"lighting": ["hard industrial lighting"], "texture": ["brushed metal", "oil-stained surfaces"]},
+    "植物": {"lens": ["macro lens"], "atmosphere": ["morning dew", "bioluminescent glow"]},
+    "火焰": {"lighting": ["ember glow"], "atmosphere": ["rising sparks", "heat shimmer"]},
+    "建筑": {"lens": ["tilt-shift lens", "architectural symmetry"], "texture": ["polished concrete", "glass curtain wall"]},
+    "环境": {"angle": ["aerial view", "sweeping panorama"], "atmosphere": ["volumetric clouds", "god rays"]},
+}
+
+
+def _merge(target: Dict[str, List[str]], extra: Any) -> None:
+    if not isinstance(extra, dict):
+        return
+    for facet, terms in extra.items():
+        if isinstance(terms, str):
+            terms = [terms]
+        if not isinstance(terms, list):
+            continue
+        bucket = target.setdefault(str(facet), [])
+        for term in terms:
+            term = str(term).strip()
+            if term and term not in bucket:
+                bucket.append(term)
+
+
+def _category_prompt(category: str, settings) -> str:
+    """The category's descriptive prompt, from the prompts table in database mode, else prompts_map."""
+    if settings.operation_mode == "database":
+        try:
+            from backend.services.prompt_service import list_prompts
+            value = list_prompts().get(category)
+            if value:
+                return value
+        except Exception as e:
+            logger.warning(f"prompt variation: prompts table unavailable: {e}")
+    prompts_map = settings.raw.get("prompts_map")
+    return str(prompts_map.get(category, "") or "") if isinstance(prompts_map, dict) else ""
+
+
+def vocabulary(category: str, settings=None) -> Dict[str, List[str]]:
+    settings = settings or load_settings()
+    cfg = settings.prompt_variation
+    vocab: Dict[str, List[str]] = {}
+    _merge(vocab, DEFAULT_VOCAB)
+    _merge(vocab, DEFAULT_CATEGORY_VOCAB.get(category))
+    _merge(vocab, cfg.get("vocab"))
+    categories = cfg.get("categories")
+    if isinstance(categories, dict):
+        _merge(vocab, categories.get(category))
+    phrases = [p for p in re.split(r"[，,、；;。]", _category_prompt(category, settings)) if p.strip()]
+    if phrases:
+        _merge(vocab, {"category": phrases})
+    return {facet: terms for facet, terms in vocab.items() if terms}
+
+
+def select_engine(requested: Optional[str] = None, settings=None) -> str:
+    """Per-request choice first, then prompt_variation.engine; unknown values fall back to qwen."""
+    value = (requested or (settings or load_settings()).prompt_variation.get("engine") or "qwen")
+    value = str(value).strip().lower()
+    return value if value in ENGINES else "qwen"
+
+
+def _rng(seed: Any, text: str, ratio: float) -> random.Random:
+    digest = hashlib.sha256(f"{seed}\x1f{text}\x1f{ratio:.4f}".encode("utf-8")).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def vary(base_positive: str, category: str, change_ratio: float = 0.1, seed: Any = None,
+         negative_prompt: str = "", settings=None) -> Dict[str, Any]:
+    """
+    Re-draw roughly change_ratio of the modifiers (at least one facet) on top of the core prompt;
+    the other modifiers from the previous step are kept so consecutive images stay close.
+    """
+    core, _, tail = (base_positive or "").partition(SEPARATOR)
+    vocab = vocabulary(category, settings)
+    facets = sorted(vocab)
+    owner = {term: facet for facet in facets for term in vocab[facet]}
+    current: Dict[str, str] = {}
+    for mod in (m.strip() for m in tail.split(",")):
+        if mod in owner:
+            current[owner[mod]] = mod
+    rng = _rng(seed, base_positive or "", float(change_ratio))
+    changes = max(1, min(len(facets), round(float(change_ratio) * 10)))
+    for facet in rng.sample(facets, changes) if facets else []:
+        choices = [t for t in vocab[facet] if t != current.get(facet)]
+        if choices:
+            current[facet] = rng.choice(choices)
+    mods = [current[f] for f in facets if f in current]
+    positive = core.strip() + (SEPARATOR + ", ".join(mods) if mods else "")
+    return {
+        "positive_prompt": positive,
+        "negative_prompt": negative_prompt,
+        "positive_prompt_zh": None,
+        "negative_prompt_zh": None,
+    }
@@ -0,0 +1,208 @@
+"""
+/**
+ * @file backend/services/qwen_batch_service.py
+ * @description 跨作业的 Qwen 请求微批处理（可选）：短时间窗口内到达的提示词优化 / 翻译请求合并为一次
+ *              多条目的 Qwen 调用（按编号的 JSON），响应按编号拆回各调用方；成功响应中缺失的条目单独重发，
+ *              合并调用返回错误（429、熔断等）时各调用方直接拿到该错误。合并调用不属于任何作业，
+ *              以各条目中最晚的截止时间为限，单个作业的取消或超时不影响同批的其他请求。
+ *              在每 key 的请求速率限制下提高 Qwen 的有效吞吐。
+ */
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import contextvars
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from backend.config import load_settings
+from backend.services import deadline_service as deadlines
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_MS = 20
+DEFAULT_MAX_ITEMS = 8
+DEFAULT_MAX_CHARS = 12000
+
+
+@dataclass
+class _Item:
+    client: Any
+    prompt: str
+    model: Optional[str]
+    future: "concurrent.futures.Future[Dict[str, Any]]"
+    ctx: contextvars.Context
+
+
+def _batch_prompt(items: List[_Item]) -> str:
+    numbered = json.dumps({str(i + 1): it.prompt for i, it in enumerate(items)}, ensure_ascii=False)
+    return (
+        f"Below are {len(items)} independent requests in a JSON object keyed by number. "
+        "Handle each request on its own, exactly as if it had been sent alone, following its own "
+        "instructions and output format. Return ONLY a JSON object with the same keys, where each value "
+        "is the complete answer to that request (a JSON object if the request asks for JSON, otherwise "
+        "a string), without any explanation:\n"
+        f"{numbered}"
+    )
+
+
+def _batch_deadline(items: List[_Item]) -> Optional[deadlines.JobDeadline]:
+    """The latest deadline among the items; None (no cap) when any of them has none."""
+    found = [it.ctx.run(deadlines.current) for it in items]
+    if not found or any(d is None for d in found):
+        return None
+    latest = max(found, key=lambda d: d.expires_at)
+    return deadlines.JobDeadline(latest.expires_at, latest.budgets)
+
+
+class QwenMicroBatcher:
+    def __init__(self, window_ms: float = DEFAULT_WINDOW_MS, max_items: int = DEFAULT_MAX_ITEMS, max_chars: int = DEFAULT_MAX_CHARS):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, List[_Item]] = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="qwen-batch")
+        self._counters = {"submitted": 0, "batches": 0, "batched_items": 0, "singles": 0, "fallbacks": 0, "failed_batches": 0}
+        self.configure(window_ms, max_items, max_chars)
+
+    def configure(self, window_ms: float, max_items: int, max_chars: int) -> None:
+        with self._lock:
+            self.window_s = max(0.0, float(window_ms)) / 1000.0
+            self.max_items = max(1, int(max_items))
+            self.max_chars = max(1, int(max_chars))
+
+    def submit(self, client, prompt: str, model: Optional[str] = None) -> "concurrent.futures.Future[Dict[str, Any]]":
+        """Queue one Qwen prompt; the future resolves to the same dict call_qwen would return."""
+        key = model or client.settings.models.get("qwen", "qwen-max")
+        item = _Item(client, prompt, model, concurrent.futures.Future(), contextvars.copy_context())
+        ready: Optional[List[_Item]] = None
+        with self._lock:
+            self._counters["submitted"] += 1
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = []
+                timer = threading.Timer(self.window_s, self._flush, args=(key, bucket))
+                timer.daemon = True
+                timer.start()
+            bucket.append(item)
+            if len(bucket) >= self.max_items or sum(len(it.prompt) for it in bucket) >= self.max_chars:
+                ready = self._buckets.pop(key)
+        if ready:
+            self._executor.submit(self._send, ready)
+        return item.future
+
+    def _flush(self, key: str, bucket: List[_Item]) -> None:
+        with self._lock:
+            if self._buckets.get(key) is not bucket:
+                return  # already sent because it filled up
+            del self._buckets[key]
+        self._send(bucket)
+
+    def _single(self, item: _Item) -> None:
+        try:
+            item.future.set_result(item.ctx.run(item.client.call_qwen, item.prompt, model=item.model))
+        except Exception as e:
+            item.future.set_result({"status": "error", "message": str(e)})
+
+    def _send(self, items: List[_Item]) -> None:
+        items = [it for it in items if self._still_wanted(it)]
+        if not items:
+            return
+        if len(items) == 1:
+            with self._lock:
+                self._counters["singles"] += 1
+            self._single(items[0])
+            return
+        lead = items[0]
+        answers: Dict[str, Any] = {}
+        try:
+            # outside every job: one caller's cancel or short deadline must not fail the others
+            result = contextvars.Context().run(self._call_batch, lead, _batch_prompt(items), _batch_deadline(items))
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        if not (isinstance(result, dict) and result.get("status") == "success"):
+            # 429 / circuit open / 5xx: resending each item alone would only multiply the load
+            logger.warning(f"qwen batch of {len(items)} failed: {result.get('status') if isinstance(result, dict) else result}")
+            with self._lock:
+                self._counters["failed_batches"] += 1
+            for it in items:
+                it.future.set_result(dict(result) if isinstance(result, dict) else {"status": "error", "message": str(result)})
+            return
+        try:
+            from backend.services.dashscope_client_service import _strip_code_fence
+            data = json.loads(_strip_code_fence(str(result.get("output", ""))))
+            answers = data if isinstance(data, dict) else {}
+        except ValueError as e:
+            logger.warning(f"qwen batch of {len(items)} answer did not parse, sending individually: {e}")
+        missing = []
+        for i, it in enumerate(items):
+            value = answers.get(str(i + 1))
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False)
+            if isinstance(value, str) and value.strip():
+                it.future.set_result({"status": "success", "output": value})
+            else:
+                missing.append(it)
+        with self._lock:
+            self._counters["batches"] += 1
+            self._counters["batched_items"] += len(items) - len(missing)
+            self._counters["fallbacks"] += len(missing)
+        for it in missing:
+            self._executor.submit(self._single, it)
+
+    @staticmethod
+    def _still_wanted(item: _Item) -> bool:
+        """Answer an item whose own job is already out of time or cancelled without sending it."""
+        try:
+            item.ctx.run(deadlines.timeout_for, "refine")
+            return True
+        except deadlines.DeadlineExceeded as e:
+            item.future.set_result(e.as_result())
+            return False
+
+    @staticmethod
+    def _call_batch(lead: _Item, prompt: str, deadline: Optional[deadlines.JobDeadline]) -> Dict[str, Any]:
+        deadlines.bind(deadline)  # runs in a fresh Context, nothing to unbind
+        return lead.client.call_qwen(prompt, model=lead.model)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "window_ms": round(self.window_s * 1000, 1),
+                "max_items": self.max_items,
+                "pending": sum(len(b) for b in self._buckets.values()),
+                **self._counters,
+            }
+
+
+_BATCHER: Optional[QwenMicroBatcher] = None
+_BATCHER_LOCK = threading.Lock()
+
+
+def batching_enabled() -> bool:
+    return bool(load_settings().qwen_batch.get("enabled", False))
+
+
+def get_qwen_batcher() -> QwenMicroBatcher:
+    global _BATCHER
+    cfg = load_settings().qwen_batch
+    args = (
+        cfg.get("window_ms", DEFAULT_WINDOW_MS),
+        cfg.get("max_items", DEFAULT_MAX_ITEMS),
+        cfg.get("max_chars", DEFAULT_MAX_CHARS),
+    )
+    with _BATCHER_LOCK:
+        if _BATCHER is None:
+            _BATCHER = QwenMicroBatcher(*args)
+        else:
+            _BATCHER.configure(*args)
+        return _BATCHER
+
+
+def call_qwen(client, prompt: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """client.call_qwen, through the micro-batcher when qwen_batch.enabled is set."""
+    if not batching_enabled():
+        return client.call_qwen(prompt, model=model)
+    return get_qwen_batcher().submit(client, prompt, model).result()
@@ -0,0 +1,288 @@
+"""
+/**
+ * @file backend/services/rate_limit_service.py
+ * @description 上游调用限流与重试：按 (API Key, endpoint) 的令牌桶整形请求速率，
+ *              对 429 / 5xx / 连接错误做指数退避 + 抖动重试，并统计限流与重试次数。
+ */
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import requests
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from backend.config import load_settings
+
+
+logger = logging.getLogger("rate_limit")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# statuses that say the request was turned away before any work started: safe to resend a submission
+REJECTED_STATUS = {429, 503}
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 8.0
+DEFAULT_JITTER = 0.3
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `burst` stored."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(0.001, float(rate))
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take one token and return 0, or return the seconds to wait without taking one."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Honour a server Retry-After: no tokens are handed out for `seconds`."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + max(0.0, seconds))
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = DEFAULT_BASE_DELAY, max_delay: float = DEFAULT_MAX_DELAY, jitter: float = DEFAULT_JITTER):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = max(0.0, float(base_delay))
+        self.max_delay = max(0.0, float(max_delay))
+        self.jitter = max(0.0, float(jitter))
+
+    def delay(self, attempt: int, hint: Optional[float] = None) -> float:
+        """Backoff before retry number `attempt` (1-based); Retry-After wins when larger."""
+        d = min(self.max_delay, self.base_delay * (2 ** max(0, attempt - 1)))
+        if self.jitter:
+            d *= 1 + random.uniform(-self.jitter, self.jitter)
+        if hint is not None and hint > d:
+            d = hint
+        return max(0.0, d)
+
+
+def retry_after_seconds(headers: Any) -> Optional[float]:
+    try:
+        value = headers.get("Retry-After") if headers is not None else None
+    except Exception:
+        return None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable_status(code: Optional[int], idempotent: bool = True) -> bool:
+    return code in (RETRYABLE_STATUS if idempotent else REJECTED_STATUS)
+
+
+def is_retryable_exception(exc: BaseException) -> bool:
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    # httpx (async engine) transport errors
+    name = type(exc).__name__
+    return name in {"ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError", "ReadError", "WriteError", "PoolTimeout"}
+
+
+def is_connect_error(exc: BaseException) -> bool:
+    """Transport error raised before the request reached the server, so resending cannot duplicate it."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.ConnectionError) and not isinstance(exc, requests.exceptions.SSLError):
+        reason = getattr(exc.args[0], "reason", None) if exc.args else None
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    return type(exc).__name__ in {"ConnectError", "ConnectTimeout", "PoolTimeout"}
+
+
+def _fingerprint(api_key: Optional[str]) -> str:
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+
+class RateLimiter:
+    """
+    Registry of token buckets keyed by (api key fingerprint, endpoint key) plus the
+    shared retry policy and counters. Endpoints without a rate_limit entry are not shaped.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, Dict[str, float]]] = None, retry: Optional[RetryPolicy] = None):
+        self.rates = rates or {}
+        self.retry = retry or RetryPolicy()
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, endpoint: str, name: str, n: int = 1) -> None:
+        with self._lock:
+            c = self._counters.setdefault(endpoint, {"calls": 0, "throttled": 0, "retried": 0, "upstream_429": 0, "gave_up": 0})
+            c[name] += n
+
+    def bucket(self, endpoint: str, api_key: Optional[str]) -> Optional[TokenBucket]:
+        cfg = self.rates.get(endpoint)
+        if not isinstance(cfg, dict) or not cfg.get("rate"):
+            return None
+        key = (_fingerprint(api_key), endpoint)
+        with self._lock:
+            b = self._buckets.get(key)
+            if b is None:
+                b = self._buckets[key] = TokenBucket(cfg.get("rate"), cfg.get("burst", cfg.get("rate")))
+            return b
+
+    def try_acquire(self, endpoint: str, api_key: Optional[str]) -> float:
+        b = self.bucket(endpoint, api_key)
+        if b is None:
+            return 0.0
+        wait = b.try_acquire()
+        if wait > 0:
+            self._count(endpoint, "throttled")
+        return wait
+
+    def acquire(self, endpoint: str, api_key: Optional[str]) -> None:
+        b = self.bucket(endpoint, api_key)
+        if b is None:
+            return
+        throttled = False
+        while True:
+            wait = b.try_acquire()
+            if wait <= 0:
+                break
+            throttled = True
+            time.sleep(wait)
+        if throttled:
+            self._count(endpoint, "throttled")
+
+    def on_response(self, endpoint: str, api_key: Optional[str], status_code: int, headers: Any) -> Optional[float]:
+        """Record an upstream answer; on 429 pause the bucket for Retry-After. Returns the hint."""
+        hint = retry_after_seconds(headers)
+        if status_code == 429:
+            self._count(endpoint, "upstream_429")
+            b = self.bucket(endpoint, api_key)
+            if b is not None and hint:
+                b.pause(hint)
+        return hint
+
+    def _retry_exception(self, exc: BaseException, idempotent: bool) -> bool:
+        return is_connect_error(exc) if not idempotent else is_retryable_exception(exc)
+
+    def call(self, endpoint: str, api_key: Optional[str], send: Callable[[], requests.Response], idempotent: bool = True) -> requests.Response:
+        """
+        Shape and retry one upstream call. Returns the last response (which may still be
+        an error once attempts are exhausted) or re-raises the last transport error.
+        idempotent=False (task submissions) only resends after connect-phase errors and
+        429 / 503: a read timeout or a 500 / 502 / 504 may mean the task was already
+        created upstream.
+        """
+        self._count(endpoint, "calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            self.acquire(endpoint, api_key)
+            try:
+                resp = send()
+            except Exception as e:
+                if attempt < self.retry.max_attempts and self._retry_exception(e, idempotent):
+                    self._count(endpoint, "retried")
+                    time.sleep(self.retry.delay(attempt))
+                    continue
+                if self._retry_exception(e, idempotent):
+                    self._count(endpoint, "gave_up")
+                raise
+            hint = self.on_response(endpoint, api_key, resp.status_code, resp.headers)
+            if is_retryable_status(resp.status_code, idempotent):
+                if attempt < self.retry.max_attempts:
+                    self._count(endpoint, "retried")
+                    logger.info(f"retry {endpoint} status={resp.status_code} attempt={attempt}")
+                    resp.close()
+                    time.sleep(self.retry.delay(attempt, hint))
+                    continue
+                self._count(endpoint, "gave_up")
+            return resp
+
+    async def acall(self, endpoint: str, api_key: Optional[str], send: Callable[[], Awaitable[Any]], idempotent: bool = True) -> Any:
+        """Coroutine twin of call() for the async engine (httpx responses)."""
+        self._count(endpoint, "calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            b = self.bucket(endpoint, api_key)
+            if b is not None:
+                wait = b.try_acquire()
+                if wait > 0:
+                    self._count(endpoint, "throttled")
+                while wait > 0:
+                    await asyncio.sleep(wait)
+                    wait = b.try_acquire()
+            try:
+                resp = await send()
+            except Exception as e:
+                if attempt < self.retry.max_attempts and self._retry_exception(e, idempotent):
+                    self._count(endpoint, "retried")
+                    await asyncio.sleep(self.retry.delay(attempt))
+                    continue
+                if self._retry_exception(e, idempotent):
+                    self._count(endpoint, "gave_up")
+                raise
+            hint = self.on_response(endpoint, api_key, resp.status_code, resp.headers)
+            if is_retryable_status(resp.status_code, idempotent):
+                if attempt < self.retry.max_attempts:
+                    self._count(endpoint, "retried")
+                    await asyncio.sleep(self.retry.delay(attempt, hint))
+                    continue
+                self._count(endpoint, "gave_up")
+            return resp
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rates": self.rates,
+                "retry": {"max_attempts": self.retry.max_attempts, "base_delay": self.retry.base_delay, "max_delay": self.retry.max_delay},
+                "counters": {k: dict(v) for k, v in self._counters.items()},
+            }
+
+
+_LIMITER: Optional[RateLimiter] = None
+_LIMITER_CFG: Optional[str] = None
+_LIMITER_LOCK = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Shared limiter; rebuilt (counters reset) when rate_limit / retry settings change."""
+    global _LIMITER, _LIMITER_CFG
+    s = load_settings()
+    rates = s.rate_limit
+    retry = s.retry
+    sig = repr((sorted(rates.items()), sorted(retry.items())))
+    with _LIMITER_LOCK:
+        if _LIMITER is None or sig != _LIMITER_CFG:
+            _LIMITER = RateLimiter(
+                rates={k: v for k, v in rates.items() if isinstance(v, dict)},
+                retry=RetryPolicy(
+                    max_attempts=retry.get("max_attempts", DEFAULT_MAX_ATTEMPTS),
+                    base_delay=retry.get("base_delay", DEFAULT_BASE_DELAY),
+                    max_delay=retry.get("max_delay", DEFAULT_MAX_DELAY),
+                    jitter=retry.get("jitter", DEFAULT_JITTER),
+                ),
+            )
+            _LIMITER_CFG = sig
+        return _LIMITER
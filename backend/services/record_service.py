@@ -179,7 +179,7 @@ class RecordService:
                 "quality": job_meta.get("resolution"),
                 "count": job_meta.get("count", 1),
                 "model_name": job_meta.get("model") or "",
-                "status": "completed",
+                "status": job_meta.get("status") or "completed",
                 "item_count": 0,
                 "content_hash": content_hash,
             }
@@ -201,6 +201,14 @@ class RecordService:
         except Exception as e:
             logger.error(f"add_record failed: {e}")
 
+    def append_raw(self, obj: Dict[str, Any]) -> None:
+        """Append an extra line (e.g. a zh translation supplement) to the raw log; existing lines are never rewritten."""
+        try:
+            line = json.dumps(obj, ensure_ascii=False) + "\n"
+            self._queue.put(line, block=True, timeout=5)
+        except Exception as e:
+            logger.error(f"append_raw failed: {e}")
+
     def _writer_loop(self) -> None:
         batch: List[str] = []
         last_flush = time.time()
@@ -0,0 +1,113 @@
+"""
+/**
+ * @file backend/services/single_flight_service.py
+ * @description 相同请求的在途合并（single-flight）：同一键的并发调用只有第一个真正发起上游请求，
+ *              其余调用等待并共享其结果（或异常）。用于 refine_prompt、_translate 与 translate_zh_en，
+ *              避免同一提示词在同一时刻触发多次 Qwen 调用。领头调用因自身截止时间或取消失败时
+ *              （retry_on），等待者不共享该失败，而是重新发起，由其中一个成为新的领头调用。
+ *              等待者只等到自身作业的截止时间，作业被取消时同样立即放弃等待。
+ */
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple, Type
+
+from backend.services import deadline_service as deadlines
+
+_RETRY = object()  # handed to followers when the leader's failure was its own
+CANCEL_CHECK_S = 0.25  # how often a waiting follower re-checks its own job for a cancel
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, "concurrent.futures.Future[Any]"] = {}
+        self._lock = threading.Lock()
+        self._counters = {"leaders": 0, "followers": 0, "errors": 0, "retried": 0, "gave_up": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], retry_on: Tuple[Type[BaseException], ...] = (), stage: str = "refine") -> Any:
+        """
+        Run fn() once per key among concurrent callers; followers get a copy of the leader's
+        result or its exception. An exception listed in `retry_on` (e.g. the leader's own
+        deadline) only reaches the leader: followers call again instead. A follower inside a
+        job waits no longer than its own deadline for `stage` and raises DeadlineExceeded /
+        JobCancelled when that runs out or the job is cancelled.
+        """
+        while True:
+            with self._lock:
+                fut = self._calls.get(key)
+                leader = fut is None
+                if leader:
+                    fut = concurrent.futures.Future()
+                    self._calls[key] = fut
+                    self._counters["leaders"] += 1
+                else:
+                    self._counters["followers"] += 1
+            if leader:
+                break
+            result = self._wait(fut, stage)
+            if result is _RETRY:
+                with self._lock:
+                    self._counters["retried"] += 1
+                continue
+            # callers mutate returned dicts (e.g. to add zh fields); never share one object
+            return dict(result) if isinstance(result, dict) else result
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._counters["errors"] += 1
+                self._calls.pop(key, None)
+            if isinstance(e, retry_on):
+                fut.set_result(_RETRY)
+            else:
+                fut.set_exception(e)
+            raise
+        with self._lock:
+            self._calls.pop(key, None)
+        fut.set_result(result)
+        return result
+
+    def _wait(self, fut: "concurrent.futures.Future[Any]", stage: str) -> Any:
+        while True:
+            try:
+                timeout = deadlines.timeout_for(stage)
+            except deadlines.DeadlineExceeded:  # this caller's job is out of time or cancelled
+                with self._lock:
+                    self._counters["gave_up"] += 1
+                raise
+            try:
+                return fut.result(timeout=None if timeout is None else min(timeout, CANCEL_CHECK_S))
+            except concurrent.futures.TimeoutError:
+                if fut.done():  # the leader's own TimeoutError, not ours
+                    raise
+                continue
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"in_flight": len(self._calls), **self._counters}
+
+
+_FLIGHTS: Dict[str, SingleFlight] = {}
+_FLIGHTS_LOCK = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    with _FLIGHTS_LOCK:
+        flight = _FLIGHTS.get(name)
+        if flight is None:
+            flight = _FLIGHTS[name] = SingleFlight(name)
+        return flight
+
+
+def single_flight_stats() -> Dict[str, Any]:
+    with _FLIGHTS_LOCK:
+        flights = dict(_FLIGHTS)
+    return {name: f.stats() for name, f in flights.items()}
@@ -0,0 +1,272 @@
+"""
+/**
+ * @file backend/services/task_poller_service.py
+ * @description DashScope 异步任务集中轮询器：统一跟踪所有在途 task_id，按自适应间隔（快速起步、
+ *              指数退避 + 抖动、遵循 Retry-After）轮询，任务结束时完成对应的 Future；
+ *              429、5xx、连接错误与无效响应按同样的退避重新排期，直到任务超时。
+ */
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.config import load_settings
+from backend.services.circuit_breaker_service import OPEN, CircuitOpenError, get_circuit_breaker
+from backend.services.http_session_service import get_http_pool
+from backend.services.rate_limit_service import get_rate_limiter, retry_after_seconds
+
+
+logger = logging.getLogger("task_poller")
+
+TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "CANCELED", "UNKNOWN"}
+
+DEFAULT_INITIAL_INTERVAL = 1.0
+DEFAULT_MAX_INTERVAL = 10.0
+DEFAULT_BACKOFF = 1.5
+DEFAULT_JITTER = 0.2
+DEFAULT_WORKERS = 4
+DEFAULT_TASK_TIMEOUT = 600.0
+POLL_REQUEST_TIMEOUT = 30
+
+
+class TaskPollError(Exception):
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+
+class TaskPollTimeout(Exception):
+    pass
+
+
+def next_poll_delay(
+    attempt: int,
+    initial: float = DEFAULT_INITIAL_INTERVAL,
+    maximum: float = DEFAULT_MAX_INTERVAL,
+    backoff: float = DEFAULT_BACKOFF,
+    jitter: float = DEFAULT_JITTER,
+    hint: Optional[float] = None,
+) -> float:
+    """
+    Delay before poll number `attempt` (0-based): initial * backoff^attempt capped at
+    maximum, spread by +/- jitter. A server hint (Retry-After) is treated as a floor.
+    """
+    delay = min(maximum, initial * (backoff ** max(0, attempt)))
+    if jitter > 0:
+        delay *= 1 + random.uniform(-jitter, jitter)
+    if hint is not None and hint > delay:
+        delay = hint
+    return max(0.0, delay)
+
+
+class _Tracked:
+    __slots__ = ("task_id", "url", "headers", "future", "attempt", "deadline", "submitted_at")
+
+    def __init__(self, task_id: str, url: str, headers: Dict[str, str], timeout: float):
+        self.task_id = task_id
+        self.url = url
+        self.headers = headers
+        self.future: "concurrent.futures.Future[Dict[str, Any]]" = concurrent.futures.Future()
+        self.attempt = 0
+        self.submitted_at = time.monotonic()
+        self.deadline = self.submitted_at + timeout
+
+
+class TaskPoller:
+    """
+    Single scheduler thread ordered by next-due time plus a small worker pool that
+    issues the GETs. Each tracked task resolves its Future with the task JSON once
+    task_status is terminal, or with TaskPollError (4xx) / TaskPollTimeout. The task
+    already runs upstream, so transient poll failures (429, 5xx, transport errors,
+    unparsable bodies) only delay the next poll and never fail it before its deadline.
+    """
+
+    def __init__(
+        self,
+        initial_interval: float = DEFAULT_INITIAL_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        backoff: float = DEFAULT_BACKOFF,
+        jitter: float = DEFAULT_JITTER,
+        workers: int = DEFAULT_WORKERS,
+        task_timeout: float = DEFAULT_TASK_TIMEOUT,
+    ):
+        self.initial_interval = float(initial_interval)
+        self.max_interval = float(max_interval)
+        self.backoff = float(backoff)
+        self.jitter = float(jitter)
+        self.task_timeout = float(task_timeout)
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._tracked: Dict[str, _Tracked] = {}
+        self._cond = threading.Condition()
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="task-poller")
+        self._thread: Optional[threading.Thread] = None
+        self._polls = 0
+        self._completed = 0
+        self._throttled = 0
+        self._transient = 0
+
+    def track(self, task_id: str, url: str, headers: Dict[str, str], timeout: Optional[float] = None) -> "concurrent.futures.Future[Dict[str, Any]]":
+        with self._cond:
+            existing = self._tracked.get(task_id)
+            if existing is not None:
+                return existing.future
+            t = _Tracked(task_id, url, headers, self.task_timeout if timeout is None else float(timeout))
+            self._tracked[task_id] = t
+            self._schedule(t, None)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="task-poller-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return t.future
+
+    def cancel(self, task_id: str, exc: Optional[BaseException] = None) -> bool:
+        """Stop polling task_id; its waiter gets `exc` (default TaskPollError). False if not tracked."""
+        with self._cond:
+            t = self._tracked.get(task_id)
+        if t is None:
+            return False
+        self._finish(t, exc=exc or TaskPollError(f"polling of {task_id} cancelled"))
+        return True
+
+    def _delay(self, attempt: int, hint: Optional[float]) -> float:
+        return next_poll_delay(attempt, self.initial_interval, self.max_interval, self.backoff, self.jitter, hint)
+
+    def _schedule(self, t: _Tracked, hint: Optional[float]) -> None:
+        # caller holds self._cond
+        due = time.monotonic() + self._delay(t.attempt, hint)
+        t.attempt += 1
+        heapq.heappush(self._heap, (due, next(self._seq), t.task_id))
+
+    def _reschedule(self, t: _Tracked, hint: Optional[float]) -> None:
+        with self._cond:
+            if self._tracked.get(t.task_id) is not t:
+                return
+            self._schedule(t, hint)
+            self._cond.notify()
+
+    def _retry_later(self, t: _Tracked, hint: Optional[float], reason: str) -> None:
+        with self._cond:
+            self._transient += 1
+        logger.info(f"poll {t.task_id} failed ({reason}), retrying")
+        self._reschedule(t, hint)
+
+    def _finish(self, t: _Tracked, result: Optional[Dict[str, Any]] = None, exc: Optional[BaseException] = None) -> None:
+        with self._cond:
+            if self._tracked.get(t.task_id) is t:
+                del self._tracked[t.task_id]
+            self._completed += 1
+        if t.future.done():
+            return
+        if exc is not None:
+            t.future.set_exception(exc)
+        else:
+            t.future.set_result(result or {})
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                due, _, task_id = self._heap[0]
+                now = time.monotonic()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                t = self._tracked.get(task_id)
+            if t is None:
+                continue
+            if now >= t.deadline:
+                self._finish(t, exc=TaskPollTimeout(task_id))
+                continue
+            self._pool.submit(self._poll_once, t)
+
+    def _poll_once(self, t: _Tracked) -> None:
+        breaker = get_circuit_breaker("tasks")
+        if breaker.state == OPEN:
+            # 任务已在上游提交，熔断期间不判失败，推迟到半开探测时再轮询（仍受 deadline 约束）
+            self._reschedule(t, breaker.retry_in())
+            return
+        limiter = get_rate_limiter()
+        identity = t.headers.get("Authorization")
+        # 令牌不足时不阻塞轮询线程，直接按等待时间重新排期
+        wait = limiter.try_acquire("tasks", identity)
+        if wait > 0:
+            with self._cond:
+                self._throttled += 1
+            self._reschedule(t, wait)
+            return
+        with self._cond:
+            self._polls += 1
+        try:
+            resp = breaker.call(lambda: get_http_pool().get(t.url, headers=t.headers, timeout=POLL_REQUEST_TIMEOUT))
+        except CircuitOpenError as e:
+            self._reschedule(t, e.retry_in)
+            return
+        except Exception as e:
+            self._retry_later(t, None, str(e))
+            return
+        hint = limiter.on_response("tasks", identity, resp.status_code, resp.headers)
+        if resp.status_code == 429:
+            with self._cond:
+                self._throttled += 1
+            self._reschedule(t, hint)
+            return
+        if resp.status_code >= 500:
+            self._retry_later(t, hint, f"status {resp.status_code}")
+            return
+        if resp.status_code != 200:
+            self._finish(t, exc=TaskPollError(resp.text, code=resp.status_code))
+            return
+        try:
+            data = resp.json()
+        except Exception as e:
+            self._retry_later(t, hint, f"invalid task response: {e}")
+            return
+        output = data.get("output") if isinstance(data, dict) else None
+        status = output.get("task_status") if isinstance(output, dict) else None
+        if status in TERMINAL_STATUSES:
+            self._finish(t, result=data)
+        else:
+            self._reschedule(t, hint)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "tracked": len(self._tracked),
+                "polls": self._polls,
+                "completed": self._completed,
+                "throttled": self._throttled,
+                "transient_errors": self._transient,
+                "initial_interval": self.initial_interval,
+                "max_interval": self.max_interval,
+            }
+
+
+_POLLER: Optional[TaskPoller] = None
+_POLLER_LOCK = threading.Lock()
+
+
+def get_task_poller() -> TaskPoller:
+    global _POLLER
+    with _POLLER_LOCK:
+        if _POLLER is None:
+            cfg = load_settings().poller
+            _POLLER = TaskPoller(
+                initial_interval=cfg.get("initial_interval", DEFAULT_INITIAL_INTERVAL),
+                max_interval=cfg.get("max_interval", DEFAULT_MAX_INTERVAL),
+                backoff=cfg.get("backoff", DEFAULT_BACKOFF),
+                jitter=cfg.get("jitter", DEFAULT_JITTER),
+                workers=cfg.get("workers", DEFAULT_WORKERS),
+                task_timeout=cfg.get("task_timeout", DEFAULT_TASK_TIMEOUT),
+            )
+        return _POLLER
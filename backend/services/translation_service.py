@@ -1,15 +1,66 @@
 """
 /**
  * @file backend/services/translation_service.py
- * @description 中英互译服务（基于 Qwen）。
+ * @description 中英互译服务（基于 Qwen）。批量接口先去重、命中翻译缓存，未命中的文本按编号打包，
+ *              每次 Qwen 调用翻译多条并以编号 JSON 返回，结果按输入顺序输出。
  */
 """
 
 from __future__ import annotations
 
-from typing import Optional
+import concurrent.futures
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
-from backend.services.dashscope_client_service import DashScopeClient
+from backend.config import load_settings
+from backend.services.dashscope_client_service import DashScopeClient, _raise_if_cut_short, _strip_code_fence
+from backend.services.deadline_service import DeadlineExceeded
+from backend.services import qwen_batch_service as qwen_batch
+from backend.services.single_flight_service import get_single_flight
+
+DEFAULT_CACHE_ENTRIES = 2048
+DEFAULT_MAX_ITEMS = 20  # texts packed into one Qwen call
+DEFAULT_MAX_CHARS = 4000  # input characters packed into one Qwen call
+DEFAULT_CONCURRENCY = 4  # packed calls in flight per batch request
+
+_CACHE: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_COUNTERS = {"hits": 0, "misses": 0, "packed_calls": 0, "fallback_calls": 0}
+
+
+def _batch_config() -> Dict[str, Any]:
+    return load_settings().translate_batch
+
+
+def _cache_get(key: Tuple[str, str]) -> Optional[str]:
+    with _CACHE_LOCK:
+        value = _CACHE.get(key)
+        if value is None:
+            _COUNTERS["misses"] += 1
+            return None
+        _CACHE.move_to_end(key)
+        _COUNTERS["hits"] += 1
+        return value
+
+
+def _cache_put(key: Tuple[str, str], value: str) -> None:
+    max_entries = max(1, int(_batch_config().get("cache_entries", DEFAULT_CACHE_ENTRIES)))
+    with _CACHE_LOCK:
+        _CACHE[key] = value
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > max_entries:
+            _CACHE.popitem(last=False)
+
+
+def translation_cache_stats() -> Dict[str, Any]:
+    with _CACHE_LOCK:
+        return {"size": len(_CACHE), **_COUNTERS}
+
+
+def _model_of(h: DashScopeClient, model: Optional[str]) -> str:
+    return model or h.settings.models.get("qwen", "qwen-max")
 
 
 def translate_zh_en(text: str, model: Optional[str] = None, client: Optional[DashScopeClient] = None):
@@ -17,10 +68,122 @@ def translate_zh_en(text: str, model: Optional[str] = None, client: Optional[Das
     cleaned = (text or "").strip()
     if not cleaned:
         return {"status": "success", "output": ""}
+    key = (_model_of(h, model), cleaned)
+    cached = _cache_get(key)
+    if cached is not None:
+        return {"status": "success", "output": cached}
+    # identical texts translated at the same moment share one Qwen call; a result cut short by
+    # the leader's own deadline / cancel is not shared, the other callers ask again
+    try:
+        result = get_single_flight("translate_zh_en").do(key, lambda: _translate_one(h, cleaned, model), retry_on=(DeadlineExceeded,))
+    except DeadlineExceeded as e:
+        return e.as_result()
+    if isinstance(result, dict) and result.get("status") == "success":
+        _cache_put(key, str(result.get("output", "")).strip())
+    return result
+
+
+def _translate_one(h: DashScopeClient, cleaned: str, model: Optional[str]):
     prompt = (
         "Translate the following text. If it is Chinese, translate to English. "
         "If it is English, translate to Chinese. Only return the translated text without any explanation: "
         f"\"{cleaned}\""
     )
-    return h.call_qwen(prompt, model=model)
+    result = qwen_batch.call_qwen(h, prompt, model=model)
+    _raise_if_cut_short(result, "translate")
+    return result
+
+
+def _pack(texts: List[str], max_items: int, max_chars: int) -> List[List[str]]:
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for t in texts:
+        if current and (len(current) >= max_items or size + len(t) > max_chars):
+            chunks.append(current)
+            current, size = [], 0
+        current.append(t)
+        size += len(t)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _translate_packed(h: DashScopeClient, texts: List[str], model: Optional[str]) -> Dict[str, str]:
+    """One Qwen call for several texts; returns whatever numbered answers parsed cleanly."""
+    numbered = json.dumps({str(i + 1): t for i, t in enumerate(texts)}, ensure_ascii=False)
+    prompt = (
+        "Translate each value of the following JSON object. If a value is Chinese, translate it to English; "
+        "if it is English, translate it to Chinese. Return ONLY a JSON object with the same numeric keys "
+        "and the translated texts as values, without any explanation:\n"
+        f"{numbered}"
+    )
+    with _CACHE_LOCK:
+        _COUNTERS["packed_calls"] += 1
+    result = h.call_qwen(prompt, model=model)
+    if not isinstance(result, dict) or result.get("status") != "success":
+        return {}
+    try:
+        data = json.loads(_strip_code_fence(str(result.get("output", ""))))
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    out: Dict[str, str] = {}
+    for i, t in enumerate(texts):
+        value = data.get(str(i + 1))
+        if isinstance(value, str) and value.strip():
+            out[t] = value.strip()
+    return out
+
+
+def translate_zh_en_batch(texts: List[str], model: Optional[str] = None, client: Optional[DashScopeClient] = None) -> Dict[str, Any]:
+    """
+    Translate many texts at once: duplicates and cache hits cost nothing, misses are packed into
+    numbered multi-text Qwen calls, and anything a packed answer left out is retried one by one.
+    """
+    h = client or DashScopeClient()
+    resolved = _model_of(h, model)
+    cfg = _batch_config()
+    cleaned = [(t or "").strip() for t in texts]
+    unique = list(dict.fromkeys(t for t in cleaned if t))
+    done: Dict[str, str] = {}
+    misses: List[str] = []
+    for t in unique:
+        cached = _cache_get((resolved, t))
+        if cached is not None:
+            done[t] = cached
+        else:
+            misses.append(t)
+
+    errors: Dict[str, Any] = {}
+    if misses:
+        chunks = _pack(misses, max(1, int(cfg.get("max_items", DEFAULT_MAX_ITEMS))), max(1, int(cfg.get("max_chars", DEFAULT_MAX_CHARS))))
+        workers = max(1, min(len(chunks), int(cfg.get("concurrency", DEFAULT_CONCURRENCY))))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            for packed in pool.map(lambda c: _translate_packed(h, c, model), chunks):
+                for t, value in packed.items():
+                    done[t] = value
+                    _cache_put((resolved, t), value)
+        for t in misses:
+            if t in done:
+                continue
+            with _CACHE_LOCK:
+                _COUNTERS["fallback_calls"] += 1
+            single = translate_zh_en(t, model=model, client=h)
+            if isinstance(single, dict) and single.get("status") == "success":
+                done[t] = str(single.get("output", "")).strip()
+            else:
+                errors[t] = single
 
+    outputs = [done.get(t) if t else "" for t in cleaned]
+    if errors:
+        first = next(iter(errors.values()))
+        return {
+            "status": "error",
+            "code": first.get("code", 500) if isinstance(first, dict) else 500,
+            "message": first.get("message", "translation failed") if isinstance(first, dict) else str(first),
+            "outputs": outputs,
+            "failed": [i for i, t in enumerate(cleaned) if t in errors],
+        }
+    return {"status": "success", "outputs": outputs, "unique": len(unique), "cached": len(unique) - len(misses)}
@@ -0,0 +1,252 @@
+"""
+/**
+ * @file backend/services/upstream_task_service.py
+ * @description 在途 DashScope 异步任务持久化：提交得到 task_id 后写入 SQLite（upstream_tasks 表，
+ *              记录 job_id、任务序号、模型、类别、分辨率及写记录所需的作业信息），下载完成后标记，
+ *              作业记录写入后删除。服务重启时对遗留任务继续轮询、下载到 output_dir，并补写到对应作业记录。
+ */
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.db.repositories import UpstreamTasksRepo
+
+logger = logging.getLogger(__name__)
+
+SUBMITTED = "submitted"
+DOWNLOADED = "downloaded"
+FAILED = "failed"
+
+_JOB_FIELDS = ("user_id", "session_id", "created_at", "prompt", "category", "aspect_ratio", "resolution", "count")
+_TASK_FIELDS = (
+    "seed", "temperature", "top_p", "model",
+    "refined_positive", "refined_negative", "refined_positive_zh", "refined_negative_zh",
+)
+
+_CURRENT: "contextvars.ContextVar[Optional[Dict[str, Any]]]" = contextvars.ContextVar("upstream_task", default=None)
+_repo = UpstreamTasksRepo()
+
+
+def bind(job_id: str, index: int, task_params: Dict[str, Any], context: Optional[Dict[str, Any]]) -> "contextvars.Token":
+    """Attach the job/task a submission belongs to; _wait_for_task persists its task_id under it."""
+    context = context or {}
+    task = {k: task_params.get(k) for k in _TASK_FIELDS}
+    if not task.get("refined_positive"):
+        task["refined_positive"] = task_params.get("prompt")
+    if not task.get("refined_negative"):
+        task["refined_negative"] = task_params.get("negative_prompt") or ""
+    return _CURRENT.set({
+        "job_id": job_id,
+        "index": index,
+        "model": task_params.get("model") or "",
+        "n": task_params.get("n") or 1,
+        "meta": {"job": {k: context.get(k) for k in _JOB_FIELDS}, "task": task},
+    })
+
+
+def unbind(token: "contextvars.Token") -> None:
+    _CURRENT.reset(token)
+
+
+def remember(task_id: str, prefix: str, category: str, resolution: str = "") -> None:
+    ctx = _CURRENT.get()
+    if ctx is None or not task_id:
+        return
+    try:
+        _repo.insert({
+            "task_id": task_id,
+            "job_id": ctx["job_id"],
+            "task_index": ctx["index"],
+            "model": ctx["model"],
+            "prefix": prefix,
+            "category": category,
+            "resolution": resolution,
+            "n": ctx["n"],
+            "meta": json.dumps(ctx["meta"], ensure_ascii=False),
+            "status": SUBMITTED,
+            "created_at": time.time(),
+        })
+    except Exception as e:
+        logger.error(f"persist task {task_id} failed: {e}")
+
+
+def finish(task_id: str, result: Any) -> None:
+    """Mark a tracked task downloaded (keeping saved paths) or failed; no-op outside a job."""
+    if _CURRENT.get() is None or not task_id:
+        return
+    ok = isinstance(result, dict) and result.get("status") == "success"
+    try:
+        _repo.mark(task_id, DOWNLOADED if ok else FAILED, json.dumps(result, ensure_ascii=False) if ok else None, time.time())
+    except Exception as e:
+        logger.error(f"update task {task_id} failed: {e}")
+
+
+def forget_job(job_id: str) -> None:
+    """Drop a job's rows once its record is written."""
+    try:
+        _repo.delete_by_job(job_id)
+    except Exception as e:
+        logger.error(f"clear upstream tasks for job {job_id} failed: {e}")
+
+
+def pending_task_ids(job_id: str) -> List[str]:
+    """DashScope task_ids of the job that were submitted but not collected yet."""
+    try:
+        return _repo.ids_by_job(job_id, SUBMITTED)
+    except Exception as e:
+        logger.error(f"list tasks of job {job_id} failed: {e}")
+        return []
+
+
+def _load_meta(row: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        meta = json.loads(row.get("meta") or "{}")
+    except ValueError:
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
+def _items_for(result: Dict[str, Any], task: Dict[str, Any]) -> List[Dict[str, Any]]:
+    images = result.get("images") if isinstance(result.get("images"), list) else [result]
+    items = []
+    for i, img in enumerate(images):
+        rel_url = img.get("originalUrl") or img.get("url")
+        abs_path = img.get("saved_path")
+        if not (rel_url and abs_path):
+            continue
+        seed = task.get("seed")
+        items.append({
+            "seed": seed + i if isinstance(seed, int) else seed,
+            "temperature": task.get("temperature"),
+            "top_p": task.get("top_p"),
+            "relative_url": rel_url,
+            "absolute_path": abs_path,
+        })
+    return items
+
+
+def rows_for_job(job_id: str) -> List[Dict[str, Any]]:
+    try:
+        return _repo.by_job(job_id)
+    except Exception as e:
+        logger.error(f"list tasks of job {job_id} failed: {e}")
+        return []
+
+
+def task_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Prompt / seed fields the task was submitted with."""
+    return _load_meta(row).get("task") or {}
+
+
+def collect(row: Dict[str, Any], client) -> Dict[str, Any]:
+    """
+    Result of one persisted task: poll + download a submitted one (then mark it, so a later
+    crash reuses the files), or reuse the saved result of a downloaded one.
+    """
+    if row["status"] == DOWNLOADED:
+        try:
+            return json.loads(row.get("result") or "{}")
+        except ValueError:
+            return {}
+    if row["status"] != SUBMITTED:
+        return {"status": "failed", "message": f"upstream task {row['task_id']} failed earlier"}
+    logger.info(f"resuming task {row['task_id']} of job {row['job_id']}")
+    result = client._collect_task(row["task_id"], category=row["category"] or "default",
+                                  prefix=row["prefix"] or "result", resolution=row["resolution"] or "")
+    ok = isinstance(result, dict) and result.get("status") == "success"
+    try:
+        _repo.mark(row["task_id"], DOWNLOADED if ok else FAILED, json.dumps(result, ensure_ascii=False) if ok else None, time.time())
+    except Exception as e:
+        logger.error(f"update task {row['task_id']} failed: {e}")
+    return result
+
+
+def _owned_by_job_store(job_id: str) -> bool:
+    from backend.services import job_store_service as job_store
+
+    try:
+        return job_store.store_enabled() and job_store.get_job_store().owns(job_id)
+    except Exception as e:
+        logger.error(f"job store lookup for {job_id} failed: {e}")
+        return False
+
+
+def resume_pending(client=None) -> int:
+    """
+    Finish what a previous process left behind: poll + download tasks still marked
+    submitted, reuse the saved files of downloaded ones, and attach the images to
+    their job's record. Returns the number of images recorded. Jobs still active in the
+    job store are skipped: its lease take-over re-runs them and collects these same
+    task_ids itself (background_task_service._recover_job), so nothing is generated twice.
+    """
+    owned: Dict[str, bool] = {}
+    rows = []
+    for row in _repo.list_all():
+        if row["job_id"] not in owned:
+            owned[row["job_id"]] = _owned_by_job_store(row["job_id"])
+        if not owned[row["job_id"]]:
+            rows.append(row)
+    if not rows:
+        return 0
+    if client is None:
+        from backend.services.dashscope_client_service import DashScopeClient
+        client = DashScopeClient()
+    from backend.services.record_service import RecordService
+
+    jobs: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        jobs.setdefault(row["job_id"], []).append(row)
+    recorded = 0
+    for job_id, job_rows in jobs.items():
+        items: List[Dict[str, Any]] = []
+        metas = [_load_meta(row) for row in job_rows]
+        for row, meta in zip(job_rows, metas):
+            if row["status"] not in (SUBMITTED, DOWNLOADED):
+                continue
+            result = collect(row, client)
+            if not isinstance(result, dict) or result.get("status") != "success":
+                logger.warning(f"resumed task {row['task_id']} of job {job_id} did not succeed: {result}")
+                continue
+            items.extend(_items_for(client.to_data_url_if_local(result), meta.get("task") or {}))
+        if items:
+            # job-level prompts come from the first task, as in the executors
+            job = metas[0].get("job") or {}
+            task = metas[0].get("task") or {}
+            job_meta = {
+                **job,
+                "refined_positive": task.get("refined_positive") or "",
+                "refined_negative": task.get("refined_negative") or "",
+                "refined_positive_zh": task.get("refined_positive_zh"),
+                "refined_negative_zh": task.get("refined_negative_zh"),
+                "model": job_rows[0].get("model") or task.get("model") or "",
+            }
+            try:
+                RecordService.instance().add_record(job_meta, items, job_id=job_id)
+                recorded += len(items)
+            except Exception as e:
+                logger.error(f"record write failed for resumed job {job_id}: {e}")
+                continue
+        forget_job(job_id)
+    logger.info(f"resumed {len(rows)} upstream task(s), {recorded} image(s) recorded")
+    return recorded
+
+
+def start_resume() -> threading.Thread:
+    """Run resume_pending on a daemon thread so startup is not blocked by polling."""
+
+    def run():
+        try:
+            resume_pending()
+        except Exception as e:
+            logger.error(f"resume upstream tasks failed: {e}")
+
+    t = threading.Thread(target=run, name="upstream-task-resume", daemon=True)
+    t.start()
+    return t
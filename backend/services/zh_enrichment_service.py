@@ -0,0 +1,225 @@
+"""
+/**
+ * @file backend/services/zh_enrichment_service.py
+ * @description 优化后提示词的中文翻译后台补全：作业直接使用英文提示词继续生成，中文翻译在独立线程池中
+ *              （并发数可配）异步完成，结果回填 records.positive_zh / negative_zh，并以补充行的形式追加到
+ *              原始 JSON 日志（原有行与 sha256 不变）。同一 worker 也用于批量回填历史记录。
+ */
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from backend.config import load_settings
+from backend.db.repositories import RecordsRepo
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 2
+DEFAULT_MAX_PENDING = 1000
+MEMO_SIZE = 2048
+# 原始 JSON 日志中补充行的类型标记（ingest 时据此回填，而不是当作新记录）
+SUPPLEMENT_TYPE = "中文翻译补充"
+
+Pair = Tuple[str, str]
+ZhPair = Tuple[Optional[str], Optional[str]]
+
+
+def enrichment_enabled() -> bool:
+    cfg = load_settings().zh_enrichment
+    return bool(cfg.get("enabled", False))
+
+
+def supplement_line(job_id: Optional[str], content_hash: Optional[str], positive_zh: Optional[str], negative_zh: Optional[str]) -> Dict[str, Any]:
+    return {
+        "类型": SUPPLEMENT_TYPE,
+        "job_id": job_id,
+        "原记录哈希": content_hash,
+        "优化后正向提示词中文": positive_zh,
+        "优化后反向提示词中文": negative_zh,
+    }
+
+
+class ZhEnrichmentService:
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, max_pending: int = DEFAULT_MAX_PENDING, client=None):
+        self.concurrency = max(1, int(concurrency))
+        self.max_pending = max(1, int(max_pending))
+        self._client = client
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="zh-enrich")
+        self._lock = threading.Lock()
+        self._memo: "OrderedDict[Pair, ZhPair]" = OrderedDict()
+        self._pending: Dict[Pair, List[Callable[[Optional[str], Optional[str]], None]]] = {}
+        self._jobs: Dict[Pair, Set[str]] = {}
+        self._records = RecordsRepo()
+        self._counters = {"translated": 0, "memo_hits": 0, "backfilled": 0, "dropped": 0, "errors": 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            from backend.services.dashscope_client_service import DashScopeClient
+            self._client = DashScopeClient()
+        return self._client
+
+    def lookup(self, positive: str, negative: str) -> Optional[ZhPair]:
+        with self._lock:
+            zh = self._memo.get((positive or "", negative or ""))
+            if zh is not None:
+                self._counters["memo_hits"] += 1
+            return zh
+
+    def translate_later(self, positive: str, negative: str, on_done: Optional[Callable[[Optional[str], Optional[str]], None]] = None) -> None:
+        """Queue the pair once; on_done(positive_zh, negative_zh) runs on the worker (or now, if already known)."""
+        pair = (positive or "", negative or "")
+        with self._lock:
+            known = self._memo.get(pair)
+            if known is None:
+                callbacks = self._pending.get(pair)
+                if callbacks is not None:
+                    if on_done:
+                        callbacks.append(on_done)
+                    return
+                if len(self._pending) >= self.max_pending:
+                    self._counters["dropped"] += 1
+                    logger.warning("zh enrichment queue full, dropping translation")
+                    return
+                self._pending[pair] = [on_done] if on_done else []
+        if known is not None:
+            if on_done:
+                on_done(*known)
+            return
+        self._executor.submit(self._run, pair)
+
+    def backfill_job(self, job_id: str, positive: str, negative: str) -> None:
+        """Fill the job's record (and the raw log) once the pair is translated; the record must already exist."""
+        pair = (positive or "", negative or "")
+        known = self.lookup(*pair)
+        if known is not None:
+            self._apply_job(job_id, *known)
+            return
+        with self._lock:
+            self._jobs.setdefault(pair, set()).add(job_id)
+        self.translate_later(*pair)
+
+    def _translate(self, text: str) -> Optional[str]:
+        return self.client._translate(text) if text else None
+
+    def _run(self, pair: Pair) -> None:
+        try:
+            zh = (self._translate(pair[0]), self._translate(pair[1]))
+        except Exception as e:
+            logger.error(f"zh enrichment failed: {e}")
+            with self._lock:
+                self._counters["errors"] += 1
+                self._pending.pop(pair, None)
+                self._jobs.pop(pair, None)
+            return
+        with self._lock:
+            self._memo[pair] = zh
+            self._memo.move_to_end(pair)
+            while len(self._memo) > MEMO_SIZE:
+                self._memo.popitem(last=False)
+            callbacks = self._pending.pop(pair, [])
+            jobs = self._jobs.pop(pair, set())
+            self._counters["translated"] += 1
+        for cb in callbacks:
+            try:
+                cb(*zh)
+            except Exception as e:
+                logger.error(f"zh enrichment callback failed: {e}")
+        for job_id in jobs:
+            self._apply_job(job_id, *zh)
+
+    def _apply_job(self, job_id: str, positive_zh: Optional[str], negative_zh: Optional[str]) -> None:
+        try:
+            rec = self._records.by_job_id(job_id)
+            if rec is None:
+                logger.warning(f"zh enrichment: no record for job {job_id}")
+                return
+            self._apply(rec, positive_zh, negative_zh)
+        except Exception as e:
+            with self._lock:
+                self._counters["errors"] += 1
+            logger.error(f"zh backfill failed for job {job_id}: {e}")
+
+    def _apply(self, rec: Dict[str, Any], positive_zh: Optional[str], negative_zh: Optional[str]) -> None:
+        from backend.services.record_service import RecordService
+
+        self._records.fill_zh(rec["id"], positive_zh, negative_zh)
+        RecordService.instance().append_raw(supplement_line(rec.get("job_id"), rec.get("content_hash"), positive_zh, negative_zh))
+        with self._lock:
+            self._counters["backfilled"] += 1
+
+    def backfill_history(self, batch_size: int = 50, limit: Optional[int] = None) -> Dict[str, int]:
+        """
+        Translate records still missing positive_zh / negative_zh, batch by batch, on the
+        same worker pool; identical prompt pairs are translated once.
+        """
+        scanned = updated = 0
+        after_id = 0
+        while limit is None or scanned < limit:
+            size = batch_size if limit is None else min(batch_size, limit - scanned)
+            rows = self._records.missing_zh(size, after_id=after_id)
+            if not rows:
+                break
+            scanned += len(rows)
+            after_id = rows[-1]["id"]
+            pairs = {(r.get("refined_positive") or "", r.get("refined_negative") or "") for r in rows}
+            futures = {}
+            for pair in pairs:
+                known = self.lookup(*pair)
+                futures[pair] = known if known is not None else self._executor.submit(lambda p=pair: (self._translate(p[0]), self._translate(p[1])))
+            results: Dict[Pair, ZhPair] = {}
+            for pair, f in futures.items():
+                try:
+                    results[pair] = f.result() if isinstance(f, concurrent.futures.Future) else f
+                except Exception as e:
+                    logger.error(f"history translation failed: {e}")
+            with self._lock:
+                for pair, zh in results.items():
+                    self._memo[pair] = zh
+                while len(self._memo) > MEMO_SIZE:
+                    self._memo.popitem(last=False)
+            for r in rows:
+                zh = results.get((r.get("refined_positive") or "", r.get("refined_negative") or ""))
+                if zh is None:
+                    continue
+                try:
+                    self._apply(r, zh[0], zh[1])
+                    updated += 1
+                except Exception as e:
+                    logger.error(f"history backfill failed for record {r.get('id')}: {e}")
+            logger.info(f"zh history backfill: scanned={scanned} updated={updated}")
+        return {"scanned": scanned, "updated": updated}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "pending": len(self._pending),
+                "memo": len(self._memo),
+                **self._counters,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+_SERVICE: Optional[ZhEnrichmentService] = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_zh_enrichment() -> ZhEnrichmentService:
+    global _SERVICE
+    with _SERVICE_LOCK:
+        if _SERVICE is None:
+            cfg = load_settings().zh_enrichment
+            _SERVICE = ZhEnrichmentService(
+                concurrency=cfg.get("concurrency", DEFAULT_CONCURRENCY),
+                max_pending=cfg.get("max_pending", DEFAULT_MAX_PENDING),
+            )
+        return _SERVICE
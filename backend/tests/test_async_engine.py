@@ -0,0 +1,130 @@
+"""
+/**
+ * @file backend/tests/test_async_engine.py
+ * @description 异步生成引擎单元测试（本地 HTTP 服务模拟 提交 -> 轮询 -> 下载；文件与 SQLite 写入不在事件循环线程执行）。
+ */
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from backend.config.settings import Settings
+from backend.services import upstream_task_service as upstream_tasks
+from backend.services.dashscope_async_client_service import AsyncDashScopeClient, AsyncGenerationEngine
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+BIG = PNG + bytes(range(256)) * 4096  # several 256 KB chunks
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, code, body, ctype="application/json"):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        task_id = f"t-{payload['parameters'].get('seed', 0)}"
+        self._send(200, json.dumps({"output": {"task_id": task_id, "task_status": "PENDING"}}).encode())
+
+    def do_GET(self):
+        if self.path.startswith("/tasks/"):
+            task_id = self.path.rsplit("/", 1)[-1]
+            host = self.headers.get("Host")
+            body = {"output": {"task_status": "SUCCEEDED", "results": [{"url": f"http://{host}/files/{task_id}.png"}]}}
+            self._send(200, json.dumps(body).encode())
+        else:
+            self._send(200, BIG if self.path.endswith("/big.png") else PNG, "image/png")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.out_dir = tempfile.mkdtemp()
+        cls.settings = Settings(raw={
+            "api_keys": {"dashscope": "test-key"},
+            "endpoints": {"wan": cls.base + "/generation", "tasks": cls.base + "/tasks"},
+            "storage": {"output_dir": cls.out_dir},
+        })
+        cls.engine = AsyncGenerationEngine(max_connections=4, max_in_flight=8)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.shutdown()
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.out_dir, ignore_errors=True)
+
+    def test_many_generations_on_one_loop(self):
+        self.engine.start()
+        client = AsyncDashScopeClient(self.engine._http, settings=self.settings)
+        futures = [self.engine.submit(client.call_wan("p", category="cat", seed=i, resolution="1K")) for i in range(12)]
+        results = [f.result(timeout=30) for f in futures]
+        self.assertTrue(all(r["status"] == "success" for r in results), results)
+        self.assertEqual(sorted(r["task_id"] for r in results), sorted(f"t-{i}" for i in range(12)))
+        self.assertEqual(len({r["saved_path"] for r in results}), 12)
+        for r in results:
+            self.assertTrue(os.path.exists(r["saved_path"]))
+            with open(r["saved_path"], "rb") as f:
+                self.assertEqual(f.read(), PNG)
+        stats = self.engine.stats()
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertGreaterEqual(stats["completed"], 12)
+
+    def test_download_streams_to_disk_off_the_loop(self):
+        self.engine.start()
+        client = AsyncDashScopeClient(self.engine._http, settings=self.settings)
+        loop_thread = self.engine.submit(_current_thread()).result(timeout=5)
+        seen = []
+        reserve = client._sync._output_path
+
+        def output_path(*args):
+            seen.append(threading.current_thread())
+            return reserve(*args)
+
+        with mock.patch.object(client._sync, "_output_path", side_effect=output_path):
+            path = self.engine.submit(client._download_to_file(self.base + "/files/big.png", "cat", "wan")).result(timeout=10)
+        self.assertNotIn(loop_thread, seen)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), BIG)
+
+    def test_upstream_task_rows_are_written_off_the_loop(self):
+        self.engine.start()
+        client = AsyncDashScopeClient(self.engine._http, settings=self.settings)
+        loop_thread = self.engine.submit(_current_thread()).result(timeout=5)
+        seen = []
+
+        def record(*args, **kwargs):
+            seen.append(threading.current_thread())
+
+        with mock.patch.object(upstream_tasks, "remember", side_effect=record), \
+                mock.patch.object(upstream_tasks, "finish", side_effect=record):
+            result = self.engine.submit(client.call_wan("p", category="cat", seed=99, resolution="1K")).result(timeout=10)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(len(seen), 2)
+        self.assertNotIn(loop_thread, seen)
+
+
+async def _current_thread():
+    return threading.current_thread()
+
+
+if __name__ == "__main__":
+    unittest.main()
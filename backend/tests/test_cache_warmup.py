@@ -0,0 +1,92 @@
+"""
+/**
+ * @file backend/tests/test_cache_warmup.py
+ * @description 提示词优化缓存预热测试。
+ */
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from backend.config.settings import Settings
+from backend.services import cache_warmup_service as cw
+from backend.services import prompt_cache_service as pcs
+
+SETTINGS = Settings(raw={
+    "models": {"qwen": "qwen-max"},
+    "prompts": {"default_style": "", "role": "r"},
+    "cache_warmup": {"enabled": True, "concurrency": 2, "variants": [{"aspect_ratio": "16:9", "resolution": "1080p"}, {"aspect_ratio": "1:1"}]},
+})
+RUNTIME = {
+    "categories": ["人物", "动物", "机械"],
+    "prompts": {"人物": "特写肖像", "动物": "自然栖息地"},
+    "global": {"common_subject": "雨夜", "global_style": "电影级", "negative_prompt": "模糊"},
+}
+
+
+class FakeClient:
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = []
+        self.running = self.peak = 0
+        self._lock = threading.Lock()
+
+    def refine_prompt(self, prompt, category, default_style, default_negative_prompt, role):
+        with self._lock:
+            self.calls.append(prompt)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.02)
+        with self._lock:
+            self.running -= 1
+        value = {"positive_prompt": "refined " + prompt, "negative_prompt": default_negative_prompt}
+        self.cache.put(pcs.make_key(prompt, category, default_style, default_negative_prompt, role, "qwen-max"), value)
+        return value
+
+
+class TestCacheWarmup(unittest.TestCase):
+    def setUp(self):
+        self.cache = pcs.RefineCache(persist=False)
+        self._patches = [
+            mock.patch.object(cw, "load_settings", return_value=SETTINGS),
+            mock.patch.object(cw, "get_refine_cache", return_value=self.cache),
+            mock.patch("backend.services.runtime_config_service.get_runtime_config", return_value=RUNTIME),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self._patches):
+            p.stop()
+
+    def test_prompt_matches_frontend_composition(self):
+        self.assertEqual(
+            cw.compose_prompt("人物", "特写肖像", "雨夜", "电影级", "16:9", "1080p"),
+            "人物, 雨夜, 特写肖像. Style: 电影级 - Aspect Ratio: 16:9, Resolution: 1080p",
+        )
+        self.assertEqual(cw.compose_prompt("机械", "", "", "Style: x"), "机械. Style: x")
+
+    def test_plan_covers_categories_and_variants(self):
+        jobs = cw.plan(SETTINGS)
+        self.assertEqual(len(jobs), 6)
+        self.assertTrue(all(neg == "模糊" for _, _, neg in jobs))
+
+    def test_run_is_capped_reports_progress_and_skips_cached(self):
+        client = FakeClient(self.cache)
+        warmup = cw.CacheWarmup()
+        first = warmup.run("startup", client=client)
+        self.assertEqual((first["state"], first["total"], first["done"], first["refined"]), ("done", 6, 6, 6))
+        self.assertLessEqual(client.peak, 2)
+        second = warmup.run("config reload", client=client)
+        self.assertEqual((second["cached"], second["refined"], second["runs"]), (6, 0, 2))
+        self.assertEqual(len(client.calls), 6)
+
+    def test_disabled_does_nothing(self):
+        with mock.patch.object(cw, "load_settings", return_value=Settings(raw={})):
+            self.assertFalse(cw.CacheWarmup().start())
+
+
+if __name__ == "__main__":
+    unittest.main()
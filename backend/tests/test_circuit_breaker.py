@@ -0,0 +1,116 @@
+"""
+/**
+ * @file backend/tests/test_circuit_breaker.py
+ * @description 上游熔断器单元测试（错误率/慢调用熔断、快速失败、半开探测、调用方截止时间导致的超时不计入）。
+ */
+"""
+
+import time
+import unittest
+
+import requests
+
+from backend.services import deadline_service as deadlines
+from backend.services.circuit_breaker_service import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class _Resp:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def _breaker(self, **kw):
+        opts = dict(window=4, min_calls=4, error_rate=0.5, slow_call_seconds=10, slow_rate=0.75, open_seconds=0.1)
+        opts.update(kw)
+        return CircuitBreaker("wan", **opts)
+
+    def test_opens_on_error_rate_and_fails_fast(self):
+        b = self._breaker()
+        for code in (200, 503, 200, 500):
+            b.call(lambda: _Resp(code))
+        self.assertEqual(b.state, OPEN)
+        calls = []
+        with self.assertRaises(CircuitOpenError) as ctx:
+            b.call(lambda: calls.append(1))
+        self.assertEqual(calls, [])
+        self.assertEqual(ctx.exception.as_result()["status"], "circuit_open")
+        self.assertEqual(b.stats()["rejected"], 1)
+
+    def test_429_and_success_do_not_trip(self):
+        b = self._breaker()
+        for code in (429, 429, 200, 429):
+            b.call(lambda: _Resp(code))
+        self.assertEqual(b.state, CLOSED)
+
+    def test_exceptions_and_slow_calls_count(self):
+        b = self._breaker(slow_call_seconds=0.01)
+
+        def slow():
+            time.sleep(0.02)
+            return _Resp(200)
+
+        for _ in range(3):
+            b.call(slow)
+        with self.assertRaises(ValueError):
+            b.call(lambda: (_ for _ in ()).throw(ValueError("x")))
+        self.assertEqual(b.state, OPEN)
+
+    def test_timeouts_from_the_callers_deadline_do_not_count(self):
+        b = self._breaker(slow_call_seconds=0.01)
+
+        def timed_out():
+            time.sleep(0.02)
+            raise requests.ReadTimeout("read timed out")
+
+        def run(deadline, fn, exc):
+            token = deadlines.bind(deadline)
+            try:
+                with self.assertRaises(exc):
+                    b.call(fn)
+            finally:
+                deadlines.unbind(token)
+
+        cancelled = deadlines.JobDeadline(time.time() + 60)
+        cancelled.cancel()
+        for _ in range(4):
+            run(deadlines.JobDeadline(time.time() + 0.5), timed_out, requests.ReadTimeout)  # timeout cut to the job's last 0.5 s
+            run(cancelled, timed_out, requests.ReadTimeout)
+            run(None, lambda: (_ for _ in ()).throw(deadlines.JobCancelled("poll")), deadlines.JobCancelled)
+        self.assertEqual((b.state, b.stats()["calls_in_window"]), (CLOSED, 0))
+        for _ in range(4):
+            run(deadlines.JobDeadline(time.time() + 60), timed_out, requests.ReadTimeout)  # upstream really timed out
+        self.assertEqual(b.state, OPEN)
+        time.sleep(0.12)
+        run(deadlines.JobDeadline(time.time() + 0.5), timed_out, requests.ReadTimeout)
+        self.assertEqual(b.state, HALF_OPEN)  # the probe slot was handed back without a verdict
+        b.call(lambda: _Resp(200))
+        self.assertEqual(b.state, CLOSED)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        b = self._breaker()
+        for _ in range(4):
+            b.call(lambda: _Resp(502))
+        time.sleep(0.12)
+        self.assertEqual(b.state, HALF_OPEN)
+        b.call(lambda: _Resp(502))
+        self.assertEqual(b.state, OPEN)
+        time.sleep(0.12)
+        b.call(lambda: _Resp(200))
+        self.assertEqual(b.state, CLOSED)
+        self.assertEqual(b.stats()["times_opened"], 2)
+
+    def test_half_open_limits_concurrent_probes(self):
+        b = self._breaker()
+        for _ in range(4):
+            b.call(lambda: _Resp(500))
+        time.sleep(0.12)
+        b.before_call()
+        with self.assertRaises(CircuitOpenError):
+            b.before_call()
+        b.record(True, 0.0)
+        self.assertEqual(b.state, CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+/**
+ * @file backend/tests/test_deadlines.py
+ * @description 作业截止时间与分阶段超时预算测试。
+ */
+"""
+
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from backend.config.settings import Settings
+from backend.services import background_task_service as bts
+from backend.services import deadline_service as dl
+from backend.services.dashscope_client_service import DashScopeClient
+
+
+class TestJobDeadline(unittest.TestCase):
+    def test_timeout_is_capped_by_stage_budget_and_remaining_time(self):
+        d = dl.JobDeadline.from_config({"submit": 5, "job": 30})
+        self.assertEqual(d.timeout_for("submit", 60), 5)
+        self.assertLessEqual(d.timeout_for("poll"), 30)
+        short = dl.JobDeadline(time.time() + 2, {"download": 120})
+        self.assertLessEqual(short.timeout_for("download", 120), 2)
+        self.assertEqual(dl.JobDeadline.from_config({}, seconds=10).budgets["job"], dl.DEFAULT_BUDGETS["job"])
+
+    def test_expired_deadline_raises_and_reports_stage(self):
+        d = dl.JobDeadline(time.time() - 1)
+        with self.assertRaises(dl.DeadlineExceeded) as cm:
+            d.timeout_for("poll")
+        self.assertEqual(cm.exception.as_result()["stage"], "poll")
+        d.note("download")
+        self.assertEqual(d.timed_out_stage, "poll")
+        self.assertEqual(d.summary()["timed_out"], {"poll": 1, "download": 1})
+
+    def test_outside_a_job_defaults_apply(self):
+        self.assertEqual(dl.timeout_for("submit", 60), 60)
+        with self.assertRaises(requests.Timeout):
+            with dl.guard("submit"):
+                raise requests.Timeout("slow")
+
+    def test_guard_turns_transport_timeout_into_deadline(self):
+        d = dl.JobDeadline(time.time() + 60)
+        token = dl.bind(d)
+        try:
+            with self.assertRaises(dl.DeadlineExceeded):
+                with dl.guard("download"):
+                    raise requests.ReadTimeout("slow")
+        finally:
+            dl.unbind(token)
+        self.assertEqual(d.timed_out_stage, "download")
+
+
+class TestClientDeadlines(unittest.TestCase):
+    def _client(self):
+        return DashScopeClient(settings=Settings(raw={"endpoints": {"wan": "http://x/wan"}, "api_keys": {"dashscope": "k"}}))
+
+    def test_post_uses_deadline_capped_timeout(self):
+        c = self._client()
+        seen = {}
+
+        def post(url, headers=None, json=None, timeout=None):
+            seen["timeout"] = timeout
+            return mock.Mock(status_code=200, text="{}", headers={})
+
+        token = dl.bind(dl.JobDeadline(time.time() + 60, {"submit": 7}))
+        try:
+            with mock.patch.object(c.http, "post", side_effect=post):
+                c._post("wan", "http://x/wan", "k", {})
+        finally:
+            dl.unbind(token)
+        self.assertEqual(seen["timeout"], 7)
+
+    def test_expired_job_fails_fast_with_timeout_result(self):
+        c = self._client()
+        token = dl.bind(dl.JobDeadline(time.time() - 1))
+        try:
+            with mock.patch.object(c.http, "post") as post, mock.patch("builtins.print"):
+                result = c.call_wan("p")
+        finally:
+            dl.unbind(token)
+        post.assert_not_called()
+        self.assertEqual((result["status"], result["stage"]), ("timeout", "submit"))
+
+    def test_final_status(self):
+        self.assertEqual(bts._final_status([{"status": "timeout"}, {"status": "error"}]), "timeout")
+        self.assertEqual(bts._final_status([{"status": "timeout"}, {"status": "success"}]), "completed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+/**
+ * @file backend/tests/test_fair_queue.py
+ * @description 按用户公平的作业队列（DRR、优先级、单用户运行上限、排队深度）测试。
+ */
+"""
+
+import unittest
+
+from backend.services import fair_queue_service as fq
+
+
+def drain(queue, n):
+    order = []
+    for _ in range(n):
+        item = queue.get(timeout=1)
+        order.append(item["job_id"])
+        queue.done(item)
+    return order
+
+
+class TestFairJobQueue(unittest.TestCase):
+    def test_single_image_job_is_not_stuck_behind_bulk_batches(self):
+        q = fq.FairJobQueue(quantum=4, max_running_per_user=0)
+        for i in range(3):
+            q.put({"job_id": f"big{i}"}, user="a", cost=50)
+        q.put({"job_id": "small"}, user="b", cost=1)
+        self.assertEqual(drain(q, 1), ["small"])
+        self.assertEqual(drain(q, 3), ["big0", "big1", "big2"])
+
+    def test_priority_weights_share_images(self):
+        q = fq.FairJobQueue(quantum=1, max_running_per_user=0)
+        for i in range(8):
+            q.put({"job_id": f"bulk{i}"}, user="a", priority="bulk")
+            q.put({"job_id": f"ia{i}"}, user="b", priority="interactive")
+        first = drain(q, 5)
+        self.assertEqual(sum(j.startswith("ia") for j in first), 4)
+
+    def test_running_cap_per_user(self):
+        q = fq.FairJobQueue(max_running_per_user=1)
+        q.put({"job_id": "a1"}, user="a")
+        q.put({"job_id": "a2"}, user="a")
+        first = q.get(timeout=1)
+        with self.assertRaises(TimeoutError):
+            q.get(timeout=0.05)
+        q.done(first)
+        self.assertEqual(q.get(timeout=1)["job_id"], "a2")
+
+    def test_depths_and_position(self):
+        q = fq.FairJobQueue()
+        q.put({"job_id": "x"}, user="a", priority="bulk", cost=10)
+        q.put({"job_id": "y"}, user="a", priority="bulk", cost=5)
+        q.put({"job_id": "z"}, user="b", priority="nonsense")
+        depths = q.depths()
+        self.assertEqual((depths["a"]["queued_jobs"], depths["a"]["queued_images"]), (2, 15))
+        self.assertEqual(depths["b"]["by_priority"], {"normal": 1})
+        self.assertEqual((q.position("y"), q.qsize()), (2, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+/**
+ * @file backend/tests/test_fake_dashscope_server.py
+ * @description 离线 DashScope 替身服务测试（对话与各类 Qwen 返回格式、同步/异步生成、任务查询、下载、故障注入），
+ *              以及 refine_prompt / 批量 / 打包翻译经真实 HTTP 调用替身服务时无需回退。
+ */
+"""
+
+import json
+import random
+import socket
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+import uvicorn
+from fastapi.testclient import TestClient
+
+from backend.config.settings import Settings
+from backend.scripts.fake_dashscope_server import FAKE_NEGATIVE, create_app, endpoints_for, sample
+from backend.services import DashScopeClient
+from backend.services import dashscope_client_service as dcs
+from backend.services import prompt_cache_service as pcs
+from backend.services import qwen_batch_service as qbs
+from backend.services.translation_service import _translate_packed
+
+FAST = {
+    "qwen": {"latency": 0, "content_chars": 50},
+    "generation": {"latency": 0, "render_latency": 0},
+    "tasks": {"latency": 0},
+    "download": {"latency": 0, "image_bytes": 1000},
+}
+
+
+def _profile(**overrides):
+    p = {k: dict(v) for k, v in FAST.items()}
+    for route, values in overrides.items():
+        p[route].update(values)
+    return p
+
+
+class TestFakeDashScope(unittest.TestCase):
+    def test_chat_completion_shape(self):
+        c = TestClient(create_app(_profile(), seed=1))
+        r = c.post("/compatible-mode/v1/chat/completions", json={"model": "qwen-max", "messages": [{"role": "user", "content": "a cat"}]})
+        self.assertEqual(r.status_code, 200)
+        content = r.json()["choices"][0]["message"]["content"]
+        self.assertTrue(content.startswith("a cat"))
+        self.assertEqual(len(content), 50)
+
+    def _chat(self, c, content):
+        r = c.post("/compatible-mode/v1/chat/completions", json={"model": "qwen-max", "messages": [{"role": "user", "content": content}]})
+        return r.json()["choices"][0]["message"]["content"]
+
+    def test_chat_answers_in_the_requested_shape(self):
+        c = TestClient(create_app(_profile(), seed=1))
+        refine = 'x\n- User Prompt: a cat\nOutput Format (Strict JSON):\n{\n  "positive_prompt": "...",\n  "negative_prompt": "..."\n}'
+        data = json.loads(self._chat(c, refine))
+        self.assertEqual(set(data), {"positive_prompt", "negative_prompt"})
+        self.assertTrue(data["positive_prompt"].startswith("a cat"))
+        bilingual = refine.replace('"negative_prompt": "..."', '"negative_prompt": "...",\n  "positive_prompt_zh": "...",\n  "negative_prompt_zh": "..."')
+        self.assertEqual(len(json.loads(self._chat(c, bilingual))), 4)
+        self.assertEqual(self._chat(c, 'Translate the following text to Chinese. Only return the translated text: "dog"'), "译文：dog")
+        packed = "Translate each value ... same numeric keys ...:\n" + json.dumps({"1": "a", "2": "b"})
+        self.assertEqual(json.loads(self._chat(c, packed)), {"1": "译文：a", "2": "译文：b"})
+        batch = "Below are 2 independent requests in a JSON object keyed by number. ...:\n" + json.dumps({"1": refine, "2": "hello"})
+        answers = json.loads(self._chat(c, batch))
+        self.assertEqual(answers["1"]["negative_prompt"], FAKE_NEGATIVE)
+        self.assertTrue(answers["2"].startswith("hello"))
+
+    def test_async_task_lifecycle_and_download(self):
+        c = TestClient(create_app(_profile(), seed=1))
+        r = c.post("/api/v1/services/aigc/multimodal-generation/generation", json={"model": "wan2.6-t2i", "parameters": {"n": 2}})
+        task_id = r.json()["output"]["task_id"]
+        out = c.get(f"/api/v1/tasks/{task_id}").json()["output"]
+        self.assertEqual(out["task_status"], "SUCCEEDED")
+        self.assertEqual(len(out["results"]), 2)
+        img = c.get(out["results"][0]["url"].split("testserver", 1)[1])
+        self.assertEqual(img.headers["content-type"], "image/png")
+        self.assertEqual(len(img.content), 1000)
+        self.assertEqual(c.get("/api/v1/tasks/missing").json()["output"]["task_status"], "UNKNOWN")
+
+    def test_sync_mode_returns_image_directly(self):
+        c = TestClient(create_app(_profile(), seed=1))
+        r = c.post("/api/v1/services/aigc/multimodal-generation/generation", json={"model": "z-image-turbo"})
+        content = r.json()["output"]["choices"][0]["message"]["content"]
+        self.assertTrue(content[0]["image"].endswith(".png"))
+
+    def test_fault_injection(self):
+        c = TestClient(create_app(_profile(generation={"rate_429": 1.0, "retry_after": 3}, tasks={"error_rate": 1.0}), seed=1))
+        r = c.post("/api/v1/services/aigc/multimodal-generation/generation", json={"model": "wan2.6-t2i"})
+        self.assertEqual(r.status_code, 429)
+        self.assertEqual(r.headers["Retry-After"], "3")
+        self.assertEqual(c.get("/api/v1/tasks/x").status_code, 500)
+        counters = c.get("/_stats").json()["counters"]
+        self.assertEqual(counters["generation"]["throttled"], 1)
+        self.assertEqual(counters["tasks"]["errors"], 1)
+
+    def test_sample_distributions(self):
+        rng = random.Random(0)
+        self.assertEqual(sample(0.5, rng), 0.5)
+        self.assertEqual(sample({"dist": "fixed", "value": 2}, rng), 2.0)
+        for _ in range(20):
+            self.assertTrue(1 <= sample({"dist": "uniform", "min": 1, "max": 2}, rng) <= 2)
+            self.assertGreaterEqual(sample({"dist": "normal", "mean": 0, "stddev": 1}, rng), 0.0)
+            self.assertGreater(sample({"dist": "lognormal", "median": 1, "sigma": 0.5}, rng), 0.0)
+
+
+class TestAgainstFakeServer(unittest.TestCase):
+    """The real client over HTTP: Qwen answers parse, so nothing falls back to the input prompt."""
+
+    @classmethod
+    def setUpClass(cls):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        cls.server = uvicorn.Server(uvicorn.Config(create_app(_profile(), seed=1), host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=cls.server.run, daemon=True).start()
+        end = time.time() + 10
+        while not cls.server.started and time.time() < end:
+            time.sleep(0.02)
+        cls.endpoints = endpoints_for(f"http://127.0.0.1:{port}")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.should_exit = True
+
+    def _client(self, refine_mode):
+        return DashScopeClient(settings=Settings(raw={
+            "endpoints": self.endpoints, "api_keys": {"dashscope": "k"},
+            "models": {"qwen": "qwen-max"}, "parameters": {"refine_mode": refine_mode},
+        }))
+
+    def test_refine_prompt_succeeds_without_fallback(self):
+        for mode in ("separate", "bilingual"):
+            prompt = f"a cat {uuid.uuid4().hex[:6]}"
+            with mock.patch.object(dcs, "get_refine_cache", return_value=pcs.RefineCache(persist=False)), \
+                    mock.patch.object(qbs, "batching_enabled", return_value=False), mock.patch("builtins.print"):
+                refined = self._client(mode).refine_prompt(prompt, "animal", "photo", "low quality", "role")
+            self.assertTrue(refined["positive_prompt"].startswith(prompt))
+            self.assertNotEqual(refined["positive_prompt"], prompt)
+            self.assertEqual(refined["negative_prompt"], FAKE_NEGATIVE)
+            self.assertEqual(refined["positive_prompt_zh"], "译文：" + refined["positive_prompt"])
+
+    def test_batched_and_packed_answers_parse(self):
+        client = self._client("separate")
+        batcher = qbs.QwenMicroBatcher(window_ms=50, max_items=4)
+        futures = [batcher.submit(client, p) for p in ("hello", 'x\n- User Prompt: a dog\n  "positive_prompt": "...",')]
+        results = [f.result(timeout=10) for f in futures]
+        self.assertTrue(all(r["status"] == "success" for r in results))
+        self.assertEqual(json.loads(results[1]["output"])["negative_prompt"], FAKE_NEGATIVE)
+        self.assertEqual((batcher.stats()["batched_items"], batcher.stats()["fallbacks"]), (2, 0))
+        self.assertEqual(_translate_packed(client, ["one", "two"], None), {"one": "译文：one", "two": "译文：two"})
+
+
+if __name__ == "__main__":
+    unittest.main()
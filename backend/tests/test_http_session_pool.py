@@ -0,0 +1,87 @@
+"""
+/**
+ * @file backend/tests/test_http_session_pool.py
+ * @description 上游连接池单元测试（本地 HTTP 服务，验证 keep-alive 复用与统计，以及配置变更重建时关闭旧会话、旧池调用转到新池）。
+ */
+"""
+
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from backend.config.settings import Settings
+from backend.services import http_session_service as hss
+from backend.services.http_session_service import HTTPSessionPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHTTPSessionPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_sequential_calls_reuse_one_connection(self):
+        pool = HTTPSessionPool(pool_connections=1, pool_maxsize=2)
+        for _ in range(5):
+            r = pool.get(self.base + "/x", timeout=5)
+            self.assertEqual(r.text, "ok")
+        host = pool.stats()["hosts"][self.base]
+        self.assertEqual(host["requests"], 5)
+        self.assertEqual(host["connections_opened"], 1)
+        self.assertEqual(host["idle_connections"], 1)
+        self.assertGreater(host["reuse_ratio"], 0.5)
+        pool.close()
+
+    def test_same_host_shares_session(self):
+        pool = HTTPSessionPool()
+        self.assertIs(pool.session_for(self.base + "/a"), pool.session_for(self.base + "/b?q=1"))
+        self.assertIsNot(pool.session_for(self.base + "/a"), pool.session_for("http://localhost:1/a"))
+        pool.close()
+
+    def test_rebuild_on_config_change_closes_replaced_sessions(self):
+        small, large = Settings(raw={"http_pool": {"pool_maxsize": 2}}), Settings(raw={"http_pool": {"pool_maxsize": 4}})
+        with mock.patch.object(hss, "_POOL", None), mock.patch.object(hss, "_POOL_CFG", None), \
+                mock.patch.object(hss, "_POOL_SETTINGS", None):
+            with mock.patch.object(hss, "load_settings", return_value=small):
+                old = hss.get_http_pool()
+                with mock.patch.object(hss, "_pool_config", side_effect=AssertionError("re-read unchanged settings")):
+                    self.assertIs(hss.get_http_pool(), old)
+                old.get(self.base + "/x", timeout=5)
+                session = old.session_for(self.base)
+            with mock.patch.object(hss, "load_settings", return_value=large), \
+                    mock.patch.object(session, "close", wraps=session.close) as close:
+                new = hss.get_http_pool()
+                self.assertIsNot(new, old)
+                close.assert_called_once()
+                self.assertEqual(old.stats()["hosts"], {})
+                # a caller still holding the old pool is served by the new one
+                self.assertIs(old.session_for(self.base + "/y"), new.session_for(self.base))
+                self.assertEqual(old.get(self.base + "/x", timeout=5).text, "ok")
+                self.assertEqual(old.stats()["hosts"], {})
+                self.assertEqual(new.stats()["hosts"][self.base]["requests"], 1)
+            new.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+/**
+ * @file backend/tests/test_job_cancel.py
+ * @description 作业取消测试：排队中的作业直接移出队列；运行中的作业跳过未开始的任务、停止轮询，保留已完成结果并以 cancelled 结束。
+ */
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from backend.db import connection
+from backend.services import background_task_service as bts
+from backend.services import deadline_service as deadlines
+from backend.services import fair_queue_service as fq
+from backend.services.model_admission_service import ModelAdmission
+from backend.services.task_poller_service import TaskPoller
+
+
+class TestJobCancel(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._patch = mock.patch.object(connection, "DB_PATH", os.path.join(self._dir.name, "app.db"))
+        self._patch.start()
+        connection.init_db()
+
+    def tearDown(self):
+        self._patch.stop()
+        self._dir.cleanup()
+
+    def test_queued_job_is_removed_and_cancelled(self):
+        job_id = str(uuid.uuid4())
+        with mock.patch.object(bts, "_JOB_QUEUE", fq.FairJobQueue()) as queue:
+            bts.submit_job_request(job_id, {"count": 3, "user_id": "u"}, mock.Mock(), mock.Mock())
+            result = bts.cancel_job(job_id)
+            self.assertEqual((result["status"], result["removed_from_queue"]), ("cancelled", True))
+            self.assertEqual(queue.qsize(), 0)
+        status = bts.get_job_status(job_id)
+        self.assertEqual((status["status"], status["ready"]), ("cancelled", True))
+        self.assertFalse(bts.cancel_job(job_id)["cancelled"])
+        self.assertIsNone(bts.cancel_job(str(uuid.uuid4())))
+
+    def test_running_job_skips_pending_tasks_and_records_partial_results(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def process(params):
+            calls.append(params["prompt"])
+            started.set()
+            release.wait(5)
+            return {"status": "success", "url": "/api/images/a/raw", "saved_path": "/o/a.png"}
+
+        def generator(context):
+            return [{"service": "wan", "model": "m", "prompt": f"p{i}"} for i in range(3)]
+
+        job_id = str(uuid.uuid4())
+        deadline = deadlines.JobDeadline(time.time() + 60)
+        with mock.patch.object(bts, "get_model_admission", return_value=ModelAdmission({"m": 1})), \
+                mock.patch.object(bts, "_add_record") as add_record:
+            bts.start_job_dispatcher()
+            bts.submit_job_request(job_id, {"count": 3}, generator, process, deadline=deadline)
+            self.assertTrue(started.wait(5))
+            self.assertEqual(bts.cancel_job(job_id)["removed_from_queue"], False)
+            self.assertTrue(bts.get_job_status(job_id)["cancel_requested"])
+            release.set()
+            end = time.time() + 5
+            while time.time() < end and not bts.get_job_status(job_id)["ready"]:
+                time.sleep(0.02)
+
+        status = bts.get_job_status(job_id)
+        self.assertEqual(status["status"], "cancelled")
+        self.assertEqual(calls, ["p0"])
+        self.assertEqual([r["status"] for r in status["results"]], ["success", "cancelled", "cancelled"])
+        meta, items, _ = add_record.call_args[0]
+        self.assertEqual((meta["status"], len(items)), ("cancelled", 1))
+        with self.assertRaises(deadlines.JobCancelled):
+            deadline.timeout_for("poll")
+
+    def test_task_admitted_after_cancel_gets_its_own_result(self):
+        job_id = str(uuid.uuid4())
+        with bts._STATUS_LOCK:
+            bts._TASK_STORE[job_id] = bts.TaskStatus(job_id, "running", 1)
+            bts._TASK_STORE[job_id].cancel_requested = True
+        with mock.patch.object(bts, "get_model_admission", return_value=ModelAdmission({"m": 1})):
+            result = bts._submit_admitted({"service": "wan", "model": "m"}, mock.Mock(), job_id).result(timeout=5)
+        result["saved_path"] = "/o/x.png"  # record building adds fields to results
+        self.assertEqual(result["status"], "cancelled")
+        self.assertNotIn("saved_path", bts._CANCELLED_RESULT)
+
+    def test_poller_cancel_resolves_waiter(self):
+        poller = TaskPoller(initial_interval=60)
+        future = poller.track("t1", "http://example.invalid/t1", {})
+        self.assertTrue(poller.cancel("t1", deadlines.JobCancelled("poll")))
+        self.assertEqual(future.exception(timeout=1).as_result()["status"], "cancelled")
+        self.assertFalse(poller.cancel("t1"))
+        self.assertEqual(poller.stats()["tracked"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
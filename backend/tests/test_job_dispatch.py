@@ -0,0 +1,79 @@
+"""
+/**
+ * @file backend/tests/test_job_dispatch.py
+ * @description 多槽位作业调度测试：作业的提示词优化阶段可并发，并记录排队等待时间；模型准入按用户轮转，单张作业不排在他人批量作业的剩余图片之后。
+ */
+"""
+
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from backend.services import background_task_service as bts
+from backend.services.model_admission_service import ModelAdmission
+
+
+class TestJobDispatch(unittest.TestCase):
+    def test_jobs_overlap_across_slots_and_report_queue_wait(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def generator(context):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.2)  # stands in for the Qwen refinement
+            with lock:
+                state["running"] -= 1
+            return [{"service": "wan", "prompt": "p", "model": "wan2.6-t2i"}]
+
+        with mock.patch.object(bts, "_job_slots", return_value=2), mock.patch.object(bts, "_add_record"):
+            bts.start_job_dispatcher()
+            self.assertGreaterEqual(bts.dispatcher_stats()["slots"], 2)
+            job_ids = [str(uuid.uuid4()) for _ in range(2)]
+            for job_id in job_ids:
+                bts.submit_job_request(job_id, {"count": 1}, generator, lambda p: {"status": "success"})
+            deadline = time.time() + 5
+            while time.time() < deadline and not all(bts.get_job_status(j)["ready"] for j in job_ids):
+                time.sleep(0.02)
+
+        statuses = [bts.get_job_status(j) for j in job_ids]
+        self.assertEqual([s["status"] for s in statuses], ["completed", "completed"])
+        self.assertEqual(state["peak"], 2)
+        self.assertTrue(all(s["queue_wait_ms"] is not None for s in statuses))
+
+    def test_single_image_job_overtakes_queued_batch_images(self):
+        lock = threading.Lock()
+        finished = []
+
+        def process(params):
+            time.sleep(0.02)
+            with lock:
+                finished.append(params["prompt"])
+            return {"status": "success"}
+
+        def generator(context):
+            return [{"service": "wan", "model": "m", "prompt": f"{context['user_id']}{i}"} for i in range(context["count"])]
+
+        admission = ModelAdmission({"m": 2})
+        with mock.patch.object(bts, "get_model_admission", return_value=admission), mock.patch.object(bts, "_add_record"):
+            bts.start_job_dispatcher()
+            big, small = str(uuid.uuid4()), str(uuid.uuid4())
+            bts.submit_job_request(big, {"count": 50, "user_id": "bulk"}, generator, process)
+            deadline = time.time() + 5
+            while time.time() < deadline and admission.stats().get("m", {}).get("queued", 0) < 40:
+                time.sleep(0.005)
+            bts.submit_job_request(small, {"count": 1, "user_id": "solo"}, generator, process)
+            while time.time() < deadline and not all(bts.get_job_status(j)["ready"] for j in (big, small)):
+                time.sleep(0.02)
+
+        self.assertEqual(len(finished), 51)
+        # the lone image is admitted within a round or two, not after the batch's ~40 queued images
+        self.assertLess(finished.index("solo0"), 15)
+        self.assertEqual(bts.get_job_status(small)["status"], "completed")
+
+
+if __name__ == "__main__":
+    unittest.main()
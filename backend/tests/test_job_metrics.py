@@ -0,0 +1,78 @@
+"""
+/**
+ * @file backend/tests/test_job_metrics.py
+ * @description 作业分阶段耗时统计与压测汇总测试。
+ */
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import time
+import unittest
+
+from backend.scripts.bench_generate import percentile, summarize
+from backend.services import job_metrics_service as jm
+
+
+class TestJobTimings(unittest.TestCase):
+    def test_stage_outside_job_is_noop(self):
+        with jm.job_stage("submit"):
+            pass
+        self.assertIsNone(jm.current())
+
+    def test_bound_stages_accumulate_across_threads_and_coroutines(self):
+        t = jm.JobTimings()
+        token = jm.bind(t)
+        try:
+            with jm.job_stage("refine_prompt"):
+                time.sleep(0.01)
+
+            @jm.timed_stage("download")
+            def download():
+                time.sleep(0.005)
+
+            @jm.timed_stage("poll")
+            async def poll():
+                await asyncio.sleep(0.005)
+
+            with concurrent.futures.ThreadPoolExecutor(2) as pool:
+                for f in [pool.submit(contextvars.copy_context().run, download) for _ in range(2)]:
+                    f.result()
+            asyncio.run(poll())
+        finally:
+            jm.unbind(token)
+        t.finish()
+        s = t.summary()
+        self.assertTrue(s["finished"])
+        self.assertEqual(s["stages"]["download"]["count"], 2)
+        self.assertEqual(s["stages"]["poll"]["count"], 1)
+        self.assertGreaterEqual(s["stages"]["refine_prompt"]["total_ms"], 10)
+        self.assertIsNone(jm.current())
+
+
+class TestBenchSummary(unittest.TestCase):
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize(self):
+        jobs = [
+            {"status": "completed", "latency_ms": 100.0, "submit_ms": 5.0, "images": 2, "requested": 2,
+             "timings": {"stages": {"submit": {"total_ms": 10.0}, "poll": {"total_ms": 80.0}}}},
+            {"status": "completed", "latency_ms": 300.0, "submit_ms": 7.0, "images": 1, "requested": 2,
+             "timings": {"stages": {"submit": {"total_ms": 30.0}}}},
+            {"status": "submit_error", "requested": 2},
+        ]
+        s = summarize(jobs, 2.0)
+        self.assertEqual(s["images_per_s"], 1.5)
+        self.assertEqual(s["jobs_per_s"], 1.0)
+        self.assertEqual(s["status"], {"completed": 2, "submit_error": 1})
+        self.assertEqual(s["stages_ms"]["submit"]["n"], 2)
+        self.assertEqual(s["stages_ms"]["poll"]["p99"], 80.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+/**
+ * @file backend/tests/test_job_status_store.py
+ * @description 有界作业状态存储（TTL 淘汰、数量上限、结果精简、从 records 表回查且不持有状态锁）测试。
+ */
+"""
+
+import os
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+
+from backend.db import connection
+from backend.db.repositories import ItemsRepo, RecordsRepo
+from backend.services import background_task_service as bts
+from backend.services import job_status_service as jss
+
+
+class TestJobStatusStore(unittest.TestCase):
+    def test_finished_jobs_expire_and_active_jobs_stay(self):
+        store = jss.JobStatusStore(max_jobs=100, ttl_seconds=60)
+        store["active"] = "a"
+        store["done"] = "d"
+        store.mark_finished("done", now=1000)
+        self.assertEqual(store.sweep(now=1059), 0)
+        self.assertEqual(store.sweep(now=1061), 1)
+        self.assertNotIn("done", store)
+        self.assertIn("active", store)
+
+    def test_max_jobs_evicts_oldest_finished_first(self):
+        store = jss.JobStatusStore(max_jobs=3, ttl_seconds=3600)
+        for i in range(3):
+            store[f"j{i}"] = i
+        store.mark_finished("j1")
+        store.mark_finished("j0")
+        store["j3"] = 3
+        self.assertEqual(sorted(store), ["j0", "j2", "j3"])
+        store["j4"] = 4
+        self.assertEqual(sorted(store), ["j2", "j3", "j4"])  # over the cap with nothing left to evict
+        self.assertEqual(store.stats()["evicted"], 2)
+
+    def test_compact_results_drops_inline_images(self):
+        big = "data:image/png;base64," + "A" * 5000
+        out = jss.compact_results([{"status": "success", "url": big, "saved_path": "/x.png"},
+                                   {"status": "success", "url": "data:image/png;base64,AA"}])
+        self.assertEqual(out[0], {"status": "success", "saved_path": "/x.png"})
+        self.assertEqual(out[1]["url"], "data:image/png;base64,AA")
+
+    def test_evicted_job_is_rebuilt_from_its_record(self):
+        with tempfile.TemporaryDirectory() as d, mock.patch.object(connection, "DB_PATH", os.path.join(d, "app.db")):
+            connection.init_db()
+            job_id = str(uuid.uuid4())
+            rid = RecordsRepo().create_or_update({"job_id": job_id, "count": 2, "status": "completed", "content_hash": job_id})
+            ItemsRepo().insert_many(rid, [
+                {"seed": "1", "relative_url": "/api/images/a/raw", "absolute_path": "/o/a.png"},
+                {"seed": "2", "relative_url": "/api/images/b/raw", "absolute_path": "/o/b.png"},
+            ])
+            status = bts.get_job_status(job_id)
+            self.assertIsNone(bts.get_job_status(str(uuid.uuid4())))
+        self.assertEqual((status["status"], status["ready"], status["progress"]["percent"]), ("completed", True, 100))
+        self.assertEqual([r["url"] for r in status["results"]], ["/api/images/a/thumb", "/api/images/b/thumb"])
+
+    def test_database_fallback_runs_outside_the_status_lock(self):
+        held = []
+        with mock.patch.object(bts, "_stored_job_status", side_effect=lambda j: held.append(bts._STATUS_LOCK.locked())):
+            bts.get_job_status(str(uuid.uuid4()))
+        self.assertEqual(held, [False])
+
+
+if __name__ == "__main__":
+    unittest.main()
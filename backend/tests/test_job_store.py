@@ -0,0 +1,180 @@
+"""
+/**
+ * @file backend/tests/test_job_store.py
+ * @description 持久化作业队列（批量写入、租约过期接管、重启后恢复与状态回查、认领失败）测试。
+ */
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from backend.db import connection
+from backend.db.repositories import UpstreamTasksRepo
+from backend.services import background_task_service as bts
+from backend.services import job_store_service as js
+from backend.services import upstream_task_service as upstream_tasks
+from backend.services.dashscope_client_service import DashScopeClient
+
+
+def generator(context):
+    return [{"service": "test", "prompt": f"p{i}"} for i in range(context["count"])]
+
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._patch = mock.patch.object(connection, "DB_PATH", os.path.join(self._dir.name, "app.db"))
+        self._patch.start()
+        connection.init_db()
+        self.processed = []
+        js.register_kind("test", generator, self._process)
+        self.store = js.JobStore(lease_seconds=30, max_attempts=2)
+
+    def tearDown(self):
+        self._patch.stop()
+        self._dir.cleanup()
+
+    def _process(self, params):
+        self.processed.append(params["prompt"])
+        return {"status": "success", "url": params["prompt"]}
+
+    def _expire(self, job_id):
+        self.store.update(job_id, lease_until=0)
+        self.store.flush()
+
+    def test_disabled_unless_configured(self):
+        self.assertFalse(js.store_enabled(mock.Mock(job_store={})))
+        self.assertTrue(js.store_enabled(mock.Mock(job_store={"enabled": True})))
+
+    def test_updates_are_coalesced_into_one_batch(self):
+        self.store.create("j1", "test", {"count": 2}, "u", "normal", 2)
+        self.store.update("j1", state="processing")
+        self.store.update("j1", state="running", completed_tasks=1)
+        self.store.task_done("j1", 0, {"status": "success"})
+        self.assertEqual(self.store.flush(), 2)
+        row = self.store.load("j1")
+        self.assertEqual((row["state"], row["completed_tasks"], row["context"]), ("running", 1, {"count": 2}))
+        self.assertEqual(self.store.stats()["flushes"], 1)
+
+    def test_expired_lease_is_taken_over_with_finished_tasks(self):
+        self.store.create("j2", "test", {"count": 2}, "u", "bulk", 2)
+        self.store.claim("j2")
+        self.store.task_done("j2", 0, {"status": "success", "url": "a"})
+        self.store.task_done("j2", 1, {"status": "failed"})
+        recovered = []
+        self.store._on_recover = lambda row, finished: recovered.append((row["job_id"], row["priority"], finished))
+        self.assertEqual(self.store.reap(), 0)  # lease still valid
+        self._expire("j2")
+        self.assertEqual(self.store.reap(), 1)
+        self.assertEqual(recovered, [("j2", "bulk", {0: {"result": {"status": "success", "url": "a"}, "params": {}}})])
+        self.assertEqual(self.store.reap(), 0)  # the take-over renewed the lease
+
+    def test_job_is_abandoned_after_max_attempts(self):
+        self.store.create("j3", "test", {"count": 1}, "u", "normal", 1)
+        self.store.claim("j3")
+        self.store.claim("j3")
+        self._expire("j3")
+        self.store._on_recover = mock.Mock()
+        self.assertEqual(self.store.reap(), 0)
+        self.store.flush()
+        self.assertEqual(self.store.load("j3")["state"], "failed")
+        self.store._on_recover.assert_not_called()
+
+    def test_finished_jobs_are_purged_by_age_and_count(self):
+        store = js.JobStore(retention_seconds=3600, max_finished_jobs=2)
+        for i in range(4):
+            store.create(f"p{i}", "test", {"count": 1}, "u", "normal", 1)
+            store.task_done(f"p{i}", 0, {"status": "success"})
+            if i < 3:
+                store.update(f"p{i}", state="completed")
+            store.flush()
+            time.sleep(0.01)
+        self.assertEqual(store.purge(), 1)  # only the oldest finished job is over the cap
+        self.assertIsNone(store.load("p0"))
+        self.assertEqual(store._repo.tasks("p0"), [])
+        self.assertEqual(store.purge(now=time.time() + 3601), 2)
+        self.assertEqual([store.load(f"p{i}") is None for i in range(4)], [True, True, True, False])
+        self.assertEqual(len(store._repo.tasks("p3")), 1)  # active jobs are never purged
+        self.assertEqual(store.stats()["purged"], 3)
+
+    def test_recovered_job_reruns_only_unfinished_tasks_and_status_survives(self):
+        job_id = str(uuid.uuid4())
+        store = js.JobStore(flush_ms=10)
+        store.create(job_id, "test", {"count": 2, "user_id": "u"}, "u", "normal", 2)
+        store.task_done(job_id, 0, {"status": "success", "url": "saved"}, {"prompt": "p0"})
+        store.flush()
+        with mock.patch.object(js, "_STORE", store), mock.patch.object(js, "store_enabled", return_value=True), \
+                mock.patch.object(bts, "_add_record"):
+            bts.start_job_dispatcher()
+            bts._recover_job(store.load(job_id), store.finished_tasks(job_id))
+            deadline = time.time() + 5
+            while time.time() < deadline and not bts.get_job_status(job_id)["ready"]:
+                time.sleep(0.02)
+            self.assertEqual(self.processed, ["p1"])
+            store.flush()
+            with bts._STATUS_LOCK:
+                del bts._TASK_STORE[job_id]  # as after a restart
+            status = bts.get_job_status(job_id)
+        self.assertEqual(status["status"], "completed")
+        self.assertEqual([r["url"] for r in status["results"]], ["saved", "p1"])
+
+    def test_recovered_job_collects_submitted_upstream_task_instead_of_rerunning(self):
+        job_id = str(uuid.uuid4())
+        store = js.JobStore(flush_ms=10)
+        store.create(job_id, "test", {"count": 2, "user_id": "u"}, "u", "normal", 2)
+        store.task_done(job_id, 0, {"status": "success", "url": "saved"}, {"prompt": "p0"})
+        store.flush()
+        UpstreamTasksRepo().insert({
+            "task_id": "t1", "job_id": job_id, "task_index": 1, "model": "m", "prefix": "wan", "category": "c",
+            "resolution": "", "n": 1, "meta": json.dumps({"job": {}, "task": {"seed": 7}}),
+            "status": upstream_tasks.SUBMITTED, "created_at": time.time(),
+        })
+        collected = {"status": "success", "url": "collected"}
+        with mock.patch.object(js, "_STORE", store), mock.patch.object(js, "store_enabled", return_value=True):
+            client = mock.Mock()
+            self.assertEqual(upstream_tasks.resume_pending(client), 0)  # the job store owns this job
+            client._collect_task.assert_not_called()
+            with mock.patch.object(bts, "_add_record"), \
+                    mock.patch.object(DashScopeClient, "_collect_task", return_value=collected) as collect, \
+                    mock.patch.object(DashScopeClient, "to_data_url_if_local", side_effect=lambda r: r):
+                bts.start_job_dispatcher()
+                bts._recover_job(store.load(job_id), store.finished_tasks(job_id))
+                deadline = time.time() + 5
+                while time.time() < deadline and not bts.get_job_status(job_id)["ready"]:
+                    time.sleep(0.02)
+        self.assertEqual(self.processed, [])
+        self.assertEqual(collect.call_args[0][0], "t1")
+        status = bts.get_job_status(job_id)
+        self.assertEqual([r["url"] for r in status["results"]], ["saved", "collected"])
+        self.assertEqual(UpstreamTasksRepo().by_job(job_id), [])  # cleared once the job finished
+
+    def test_failed_claim_fails_the_job_and_frees_the_user_slot(self):
+        store = js.JobStore(flush_ms=10)
+        user = str(uuid.uuid4())
+        # more jobs than the user's running cap (2): a leaked slot would leave the last one queued
+        job_ids = [str(uuid.uuid4()) for _ in range(3)]
+        with mock.patch.object(js, "_STORE", store), mock.patch.object(js, "store_enabled", return_value=True), \
+                mock.patch.object(bts, "_add_record"), \
+                mock.patch.object(store, "claim", side_effect=RuntimeError("database is locked")):
+            bts.start_job_dispatcher()
+            for job_id in job_ids:
+                bts.submit_job_request(job_id, {"count": 1, "user_id": user}, generator, self._process, kind="test")
+            deadline = time.time() + 5
+            while time.time() < deadline and not all(bts.get_job_status(j)["ready"] for j in job_ids):
+                time.sleep(0.02)
+            store.flush()
+        statuses = [bts.get_job_status(j) for j in job_ids]
+        self.assertEqual([s["status"] for s in statuses], ["failed"] * 3)
+        self.assertIn("database is locked", statuses[0]["results"][0]["message"])
+        self.assertEqual(self.processed, [])
+        self.assertNotIn(user, bts._JOB_QUEUE.depths())  # running slot handed back after each failed claim
+        self.assertEqual(store.load(job_ids[0])["state"], "failed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+/**
+ * @file backend/tests/test_model_admission.py
+ * @description 按模型并发准入单元测试（上限生效、排队不占线程、热更新、按用户与优先级轮转准入）。
+ */
+"""
+
+import concurrent.futures
+import threading
+import time
+import unittest
+
+from backend.services.model_admission_service import ModelAdmission
+
+
+class TestModelAdmission(unittest.TestCase):
+    def setUp(self):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+        self.lock = threading.Lock()
+        self.running = {"wan": 0, "z": 0}
+        self.peak = {"wan": 0, "z": 0}
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown(wait=True)
+
+    def _work(self, model):
+        with self.lock:
+            self.running[model] += 1
+            self.peak[model] = max(self.peak[model], self.running[model])
+        self.release.wait(5)
+        with self.lock:
+            self.running[model] -= 1
+        return model
+
+    def _submit(self, adm, model):
+        return adm.submit(model, lambda: self.executor.submit(self._work, model))
+
+    def test_limits_are_enforced_per_model(self):
+        adm = ModelAdmission({"wan": 2, "z": 4})
+        futures = [self._submit(adm, "wan") for _ in range(5)] + [self._submit(adm, "z") for _ in range(5)]
+        time.sleep(0.2)
+        stats = adm.stats()
+        self.assertEqual(stats["wan"]["running"], 2)
+        self.assertEqual(stats["wan"]["queued"], 3)
+        self.assertEqual(stats["z"]["running"], 4)
+        self.release.set()
+        results = [f.result(timeout=5) for f in futures]
+        self.assertEqual(results.count("wan"), 5)
+        self.assertEqual(self.peak["wan"], 2)
+        self.assertEqual(self.peak["z"], 4)
+        self.assertEqual(adm.stats()["wan"]["running"], 0)
+
+    def test_hot_reload_admits_queued_tasks(self):
+        adm = ModelAdmission({"wan": 1})
+        futures = [self._submit(adm, "wan") for _ in range(3)]
+        time.sleep(0.1)
+        self.assertEqual(adm.stats()["wan"]["queued"], 2)
+        adm.set_limits({"wan": 3})
+        time.sleep(0.1)
+        self.assertEqual(adm.stats()["wan"]["running"], 3)
+        self.release.set()
+        for f in futures:
+            f.result(timeout=5)
+
+    def test_failures_propagate_and_free_the_slot(self):
+        adm = ModelAdmission({"wan": 1})
+
+        def boom():
+            raise RuntimeError("x")
+
+        bad = adm.submit("wan", lambda: self.executor.submit(boom))
+        with self.assertRaises(RuntimeError):
+            bad.result(timeout=5)
+        self.release.set()
+        self.assertEqual(self._submit(adm, "wan").result(timeout=5), "wan")
+
+    def test_waiting_tasks_are_admitted_round_robin_per_flow(self):
+        adm = ModelAdmission({"wan": 1})
+        order = []
+        blocker = self._submit(adm, "wan")
+        futures = [adm.submit("wan", lambda i=i: self.executor.submit(order.append, f"a{i}"), ("bulk", "a")) for i in range(6)]
+        futures.append(adm.submit("wan", lambda: self.executor.submit(order.append, "b0"), ("interactive", "b")))
+        futures.append(adm.submit("wan", lambda: self.executor.submit(order.append, "c0"), ("normal", "c"), cost=2))
+        self.assertEqual(adm.stats()["wan"]["queued"], 8)
+        self.release.set()
+        blocker.result(timeout=5)
+        for f in futures:
+            f.result(timeout=5)
+        self.assertEqual(order[:3], ["a0", "b0", "c0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,58 +1,72 @@
-import os
-import sys
-import types
+"""
+/**
+ * @file backend/tests/test_prompt_inheritance.py
+ * @description 提示词继承测试：生成器只优化第一步并把后续步骤标记为 chain_pending，由串行执行器逐步基于上一步的优化结果计算增量。
+ */
+"""
 
-ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-if ROOT not in sys.path:
-    sys.path.insert(0, ROOT)
+import unittest
+import uuid
+from unittest import mock
 
-from backend.controllers import generate_controller as gc
 from backend.config.settings import Settings
+from backend.controllers import generate_controller as gc
+from backend.services import background_task_service as bts
+from backend.services import dashscope_client_service as dsc
+
+SETTINGS = Settings(raw={
+    "prompts": {"default_style": "photorealistic", "default_negative_prompt": "low quality"},
+    "models": {"qwen": "qwen-max"},
+    "parameters": {"enable_prompt_update_request": True},
+})
+CONTEXT = {
+    "prompt": "BASE",
+    "category": "cat",
+    "negative_prompt": "",
+    "count": 2,
+    "service": "wan",
+    "model": "wan2.6-t2i",
+    "size": "1024*1024",
+    "prompt_extend": True,
+    "resolution": "1K",
+    "aspect_ratio": "16:9",
+}
+
+
+class DeltaClient:
+    def __init__(self, settings=None):
+        pass
+
+    def refine_prompt_with_delta(self, base_positive, category, default_style, default_negative_prompt, role, change_ratio=0.1):
+        return {"positive_prompt": {"POS1": "POS2"}.get(base_positive, base_positive), "negative_prompt": "NEG2"}
+
+
+class TestPromptInheritance(unittest.TestCase):
+    def _tasks(self):
+        with mock.patch.object(gc, "load_settings", return_value=SETTINGS), \
+                mock.patch.object(gc.client, "refine_prompt", return_value={"positive_prompt": "POS1", "negative_prompt": "NEG1"}), \
+                mock.patch("builtins.print"):
+            return gc._task_generator(dict(CONTEXT))
+
+    def test_generator_refines_first_step_and_leaves_the_chain_pending(self):
+        tasks = self._tasks()
+        self.assertEqual(len(tasks), 2)
+        self.assertEqual((tasks[0]["prompt"], tasks[0]["refined_positive"]), ("POS1", "POS1"))
+        self.assertIsNone(tasks[0].get("inherited_prompt"))
+        self.assertIsNone(tasks[0].get("chain_pending"))
+        self.assertTrue(tasks[1]["chain_pending"])
+        self.assertTrue(tasks[1]["inherited_prompt"])
+
+    def test_chain_inherits_the_previous_refined_prompt(self):
+        tasks = self._tasks()
+        with mock.patch.object(dsc, "DashScopeClient", DeltaClient), \
+                mock.patch.object(bts, "_add_record"), mock.patch("builtins.print"):
+            bts._execute_tasks_serial(str(uuid.uuid4()), tasks, lambda p: {"status": "success"}, CONTEXT, SETTINGS)
+        self.assertEqual((tasks[1]["prompt"], tasks[1]["refined_positive"]), ("POS2", "POS2"))
+        self.assertEqual(tasks[1]["negative_prompt"], "NEG2")
+        self.assertTrue(tasks[1]["inherited_prompt"])
+        self.assertNotIn("chain_pending", tasks[1])
 
-class FakeSettings(Settings):
-    def __init__(self):
-        super().__init__(raw={
-            "enable_prompt_update_request": True,
-            "prompts": {
-                "default_style": "photorealistic",
-                "default_negative_prompt": "low quality"
-            },
-            "models": {"qwen": "qwen-max"}
-        })
-
-def test_inheritance():
-    # Patch load_settings to return fake settings
-    gc.load_settings = lambda: FakeSettings()
-    # Patch client.refine_prompt to simulate behavior:
-    # If input is 'BASE', return POS1/NEG1; if input is 'POS1', return POS2/NEG2
-    def fake_refine(prompt, category, default_style, default_negative_prompt, role):
-        if prompt == "BASE":
-            return {"positive_prompt": "POS1", "negative_prompt": "NEG1"}
-        if prompt == "POS1":
-            return {"positive_prompt": "POS2", "negative_prompt": "NEG2"}
-        return {"positive_prompt": prompt, "negative_prompt": default_negative_prompt}
-    gc.client.refine_prompt = fake_refine
-    context = {
-        "prompt": "BASE",
-        "category": "cat",
-        "negative_prompt": "",
-        "count": 2,
-        "service": "wan",
-        "model": "wan2.6-t2i",
-        "size": "1024*1024",
-        "prompt_extend": True,
-        "resolution": "1K",
-        "aspect_ratio": "16:9",
-    }
-    tasks = gc._task_generator(context)
-    assert len(tasks) == 2
-    assert tasks[0]["prompt"] == "POS1"
-    assert tasks[0]["refined_positive"] == "POS1"
-    assert tasks[0].get("inherited_prompt") is None
-    assert tasks[1]["prompt"] == "POS2"
-    assert tasks[1]["refined_positive"] == "POS2"
-    assert tasks[1].get("inherited_prompt") is True
 
 if __name__ == "__main__":
-    test_inheritance()
-    print("ok")
+    unittest.main()
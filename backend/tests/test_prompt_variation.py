@@ -0,0 +1,69 @@
+"""
+/**
+ * @file backend/tests/test_prompt_variation.py
+ * @description 本地确定性提示词变体引擎测试。
+ */
+"""
+
+import unittest
+import uuid
+from unittest import mock
+
+from backend.config.settings import Settings
+from backend.services import background_task_service as bts
+from backend.services import dashscope_client_service as dsc
+from backend.services import prompt_variation_service as pv
+
+SETTINGS = Settings(raw={
+    "prompts_map": {"植物": "魔幻植物，生物发光"},
+    "prompt_variation": {"engine": "qwen", "vocab": {"lighting": ["moonlight"]}, "categories": {"植物": {"texture": ["velvet petals"]}}},
+    "parameters": {"enable_prompt_update_request": True, "prompt_delta_ratio": 0.1},
+})
+
+
+class TestPromptVariation(unittest.TestCase):
+    def test_vocabulary_merges_defaults_config_and_category_prompt(self):
+        vocab = pv.vocabulary("植物", SETTINGS)
+        self.assertIn("moonlight", vocab["lighting"])
+        self.assertIn("velvet petals", vocab["texture"])
+        self.assertIn("macro lens", vocab["lens"])
+        self.assertEqual(vocab["category"], ["魔幻植物", "生物发光"])
+
+    def test_same_seed_same_variant(self):
+        a = pv.vary("a glowing fern", "植物", 0.1, seed=42, settings=SETTINGS)
+        self.assertEqual(a, pv.vary("a glowing fern", "植物", 0.1, seed=42, settings=SETTINGS))
+        self.assertTrue(a["positive_prompt"].startswith("a glowing fern" + pv.SEPARATOR))
+        seeds = {pv.vary("a glowing fern", "植物", 0.1, seed=s, settings=SETTINGS)["positive_prompt"] for s in range(20)}
+        self.assertGreater(len(seeds), 1)
+
+    def test_chain_changes_a_few_modifiers_and_keeps_the_core(self):
+        prompt = "a glowing fern"
+        previous = set()
+        for step in range(6):
+            prompt = pv.vary(prompt, "植物", 0.1, seed=step, settings=SETTINGS)["positive_prompt"]
+            core, _, tail = prompt.partition(pv.SEPARATOR)
+            mods = set(tail.split(", "))
+            self.assertEqual(core, "a glowing fern")
+            self.assertLessEqual(len(mods - previous), 1)  # ratio 0.1 re-draws one facet per step
+            previous = mods
+        self.assertEqual(prompt.count(pv.SEPARATOR), 1)
+
+    def test_engine_selection(self):
+        self.assertEqual(pv.select_engine(None, SETTINGS), "qwen")
+        self.assertEqual(pv.select_engine("local", SETTINGS), "local")
+        self.assertEqual(pv.select_engine("bogus", SETTINGS), "qwen")
+
+    def test_local_engine_skips_qwen_in_inherited_jobs(self):
+        tasks = [{"prompt": "P", "refined_positive": "P", "refined_negative": "N", "seed": 1}] + [
+            {"prompt": "P", "seed": i, "chain_pending": True, "delta_ratio": 0.1} for i in range(2, 4)]
+        with mock.patch.object(dsc.DashScopeClient, "refine_prompt_with_delta") as delta, \
+                mock.patch.object(bts, "_add_record"), mock.patch("builtins.print"):
+            bts._execute_tasks_serial(str(uuid.uuid4()), tasks, lambda p: {"status": "success"},
+                                      {"category": "植物", "delta_engine": "local"}, SETTINGS)
+        delta.assert_not_called()
+        self.assertTrue(all(t["prompt"].startswith("P" + pv.SEPARATOR) for t in tasks[1:]))
+        self.assertEqual(tasks[2]["refined_negative"], "N")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+/**
+ * @file backend/tests/test_qwen_batch.py
+ * @description Qwen 微批处理（窗口合并、编号拆分、单条回退、错误共享、不受单个作业截止时间 / 取消影响）测试。
+ */
+"""
+
+import json
+import re
+import threading
+import time
+import unittest
+from unittest import mock
+
+from backend.config.settings import Settings
+from backend.services import deadline_service as deadlines
+from backend.services import qwen_batch_service as qb
+
+
+class FakeClient:
+    def __init__(self, skip=(), batch_error=None):
+        self.settings = Settings(raw={"models": {"qwen": "qwen-test"}})
+        self.prompts = []
+        self.deadlines = []
+        self.skip = set(skip)
+        self.batch_error = batch_error
+        self._lock = threading.Lock()
+
+    def call_qwen(self, prompt, model=None):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.deadlines.append(deadlines.current())
+        if prompt.startswith("Below are"):
+            if self.batch_error:
+                return dict(self.batch_error)
+            items = json.loads(re.search(r"\{.*\}", prompt, re.S).group(0))
+            answers = {k: ({"positive_prompt": v.upper()} if v.startswith("refine") else v.upper())
+                       for k, v in items.items() if v not in self.skip}
+            return {"status": "success", "output": json.dumps(answers)}
+        return {"status": "success", "output": "single:" + prompt}
+
+
+class TestQwenMicroBatcher(unittest.TestCase):
+    def _submit_all(self, batcher, client, prompts):
+        futures = [batcher.submit(client, p) for p in prompts]
+        return [f.result(timeout=5) for f in futures]
+
+    def test_window_merges_and_demultiplexes(self):
+        client = FakeClient()
+        batcher = qb.QwenMicroBatcher(window_ms=50, max_items=8)
+        results = self._submit_all(batcher, client, ["refine cat", "hello", "world"])
+        self.assertEqual(len(client.prompts), 1)
+        self.assertEqual(json.loads(results[0]["output"]), {"positive_prompt": "REFINE CAT"})
+        self.assertEqual([r["output"] for r in results[1:]], ["HELLO", "WORLD"])
+        self.assertEqual(batcher.stats()["batched_items"], 3)
+
+    def test_full_bucket_is_sent_at_once_and_lone_requests_go_alone(self):
+        client = FakeClient()
+        batcher = qb.QwenMicroBatcher(window_ms=10_000, max_items=2)
+        self.assertEqual([r["output"] for r in self._submit_all(batcher, client, ["a", "b"])], ["A", "B"])
+        lone = qb.QwenMicroBatcher(window_ms=1)
+        self.assertEqual(lone.submit(client, "x").result(timeout=5)["output"], "single:x")
+
+    def test_unparsed_items_fall_back_to_single_calls(self):
+        client = FakeClient(skip={"b"})
+        batcher = qb.QwenMicroBatcher(window_ms=50)
+        results = self._submit_all(batcher, client, ["a", "b"])
+        self.assertEqual([r["output"] for r in results], ["A", "single:b"])
+        self.assertEqual(batcher.stats()["fallbacks"], 1)
+
+    def test_batch_error_reaches_every_item_without_single_resends(self):
+        client = FakeClient(batch_error={"status": "error", "code": 429, "message": "throttled"})
+        batcher = qb.QwenMicroBatcher(window_ms=50)
+        results = self._submit_all(batcher, client, ["a", "b", "c"])
+        self.assertEqual(len(client.prompts), 1)
+        self.assertEqual([r["code"] for r in results], [429] * 3)
+        self.assertEqual((batcher.stats()["failed_batches"], batcher.stats()["fallbacks"]), (1, 0))
+
+    def _submit_under(self, batcher, client, prompt, deadline):
+        token = deadlines.bind(deadline)
+        try:
+            return batcher.submit(client, prompt)
+        finally:
+            deadlines.unbind(token)
+
+    def test_batch_runs_outside_the_first_callers_job(self):
+        client = FakeClient()
+        batcher = qb.QwenMicroBatcher(window_ms=50)
+        now = time.time()
+        cancelled = deadlines.JobDeadline(now + 60)
+        futures = [
+            self._submit_under(batcher, client, "short", deadlines.JobDeadline(now + 5)),
+            self._submit_under(batcher, client, "gone", cancelled),
+            self._submit_under(batcher, client, "long", deadlines.JobDeadline(now + 30)),
+        ]
+        cancelled.cancel()
+        results = [f.result(timeout=5) for f in futures]
+        self.assertEqual(results[1]["status"], "cancelled")
+        self.assertEqual([results[0]["output"], results[2]["output"]], ["SHORT", "LONG"])
+        self.assertEqual(len(client.prompts), 1)
+        batch_deadline = client.deadlines[0]
+        self.assertFalse(batch_deadline.cancelled)
+        self.assertEqual(batch_deadline.expires_at, now + 30)
+
+    def test_helper_calls_directly_when_disabled(self):
+        client = mock.Mock()
+        with mock.patch.object(qb, "load_settings", return_value=Settings(raw={})):
+            qb.call_qwen(client, "p")
+        client.call_qwen.assert_called_once_with("p", model=None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+/**
+ * @file backend/tests/test_rate_limit.py
+ * @description 上游限流与重试单元测试（令牌桶、429/503 重试、Retry-After、计数、任务提交不因 5xx 重发）。
+ */
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import requests
+
+from backend.services.rate_limit_service import RateLimiter, RetryPolicy, TokenBucket
+
+# path -> list of status codes answered in order; last one repeats
+SCRIPTS = {
+    "/flaky": [503, 429, 200],
+    "/down": [502],
+    "/bad": [400],
+    "/submit502": [502, 200],
+    "/submit504": [504, 200],
+    "/submit503": [503, 200],
+}
+HITS = {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        script = SCRIPTS[self.path]
+        n = HITS.get(self.path, 0)
+        HITS[self.path] = n + 1
+        code = script[min(n, len(script) - 1)]
+        body = b"{}"
+        self.send_response(code)
+        if code == 429:
+            self.send_header("Retry-After", "0.05")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_wait(self):
+        b = TokenBucket(rate=10, burst=2)
+        self.assertEqual(b.try_acquire(), 0.0)
+        self.assertEqual(b.try_acquire(), 0.0)
+        wait = b.try_acquire()
+        self.assertTrue(0 < wait <= 0.1)
+        time.sleep(wait)
+        self.assertEqual(b.try_acquire(), 0.0)
+
+    def test_pause_blocks_tokens(self):
+        b = TokenBucket(rate=100, burst=5)
+        b.pause(0.2)
+        self.assertGreater(b.try_acquire(), 0.1)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_exponential_capped_and_hint(self):
+        p = RetryPolicy(base_delay=1.0, max_delay=3.0, jitter=0)
+        self.assertEqual([p.delay(i) for i in (1, 2, 3, 4)], [1.0, 2.0, 3.0, 3.0])
+        self.assertEqual(p.delay(1, hint=5.0), 5.0)
+
+
+class TestRateLimiterCall(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def _limiter(self, attempts=3):
+        return RateLimiter({"wan": {"rate": 50, "burst": 5}}, RetryPolicy(max_attempts=attempts, base_delay=0.01, max_delay=0.05, jitter=0))
+
+    def _send(self, path):
+        return lambda: requests.post(self.base + path, json={})
+
+    def test_retries_until_success(self):
+        limiter = self._limiter()
+        resp = limiter.call("wan", "k1", self._send("/flaky"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(HITS["/flaky"], 3)
+        c = limiter.stats()["counters"]["wan"]
+        self.assertEqual(c["retried"], 2)
+        self.assertEqual(c["upstream_429"], 1)
+        self.assertEqual(c["gave_up"], 0)
+
+    def test_gives_up_and_does_not_retry_client_errors(self):
+        limiter = self._limiter(attempts=2)
+        self.assertEqual(limiter.call("wan", "k1", self._send("/down")).status_code, 502)
+        self.assertEqual(HITS["/down"], 2)
+        self.assertEqual(limiter.call("wan", "k1", self._send("/bad")).status_code, 400)
+        self.assertEqual(HITS["/bad"], 1)
+        self.assertEqual(limiter.stats()["counters"]["wan"]["gave_up"], 1)
+
+    def test_non_idempotent_calls_only_retry_connect_errors(self):
+        limiter = self._limiter()
+        calls = []
+
+        def timed_out():
+            calls.append(1)
+            raise requests.ReadTimeout("slow")
+
+        with self.assertRaises(requests.ReadTimeout):
+            limiter.call("wan", "k1", timed_out, idempotent=False)
+        self.assertEqual(len(calls), 1)
+        with self.assertRaises(requests.ReadTimeout):
+            limiter.call("wan", "k1", timed_out)
+        self.assertEqual(len(calls), 4)
+        with self.assertRaises(requests.ConnectionError):
+            limiter.call("wan", "k1", lambda: requests.post("http://127.0.0.1:9/", json={}), idempotent=False)
+        self.assertEqual(limiter.stats()["counters"]["wan"]["retried"], 4)
+
+    def test_submission_is_sent_once_on_502_and_504(self):
+        limiter = self._limiter()
+        for path in ("/submit502", "/submit504"):
+            resp = limiter.call("wan", "k1", self._send(path), idempotent=False)
+            self.assertEqual((resp.status_code, HITS[path]), (int(path[-3:]), 1))
+        self.assertEqual(limiter.call("wan", "k1", self._send("/submit503"), idempotent=False).status_code, 200)
+        self.assertEqual(HITS["/submit503"], 2)
+        self.assertEqual(limiter.stats()["counters"]["wan"]["retried"], 1)
+
+        sent = []
+
+        async def send_async():
+            sent.append(1)
+            return SimpleNamespace(status_code=502, headers={})
+
+        resp = asyncio.run(limiter.acall("wan", "k1", send_async, idempotent=False))
+        self.assertEqual((resp.status_code, len(sent)), (502, 1))
+
+    def test_buckets_are_per_key_and_endpoint(self):
+        limiter = RateLimiter({"wan": {"rate": 1, "burst": 1}})
+        self.assertEqual(limiter.try_acquire("wan", "a"), 0.0)
+        self.assertGreater(limiter.try_acquire("wan", "a"), 0)
+        self.assertEqual(limiter.try_acquire("wan", "b"), 0.0)
+        self.assertEqual(limiter.try_acquire("qwen", "a"), 0.0)
+        self.assertEqual(limiter.stats()["counters"]["wan"]["throttled"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+/**
+ * @file backend/tests/test_refine_cache.py
+ * @description 提示词优化两级缓存（LRU + TTL + SQLite）测试。
+ */
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from backend.config.settings import Settings
+from backend.db import connection
+from backend.services import DashScopeClient
+from backend.services import dashscope_client_service as dcs
+from backend.services import prompt_cache_service as pcs
+
+VALUE = {"positive_prompt": "a cat", "negative_prompt": "blurry", "positive_prompt_zh": "一只猫", "negative_prompt_zh": "模糊"}
+
+
+class TestRefineCache(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._patch = mock.patch.object(connection, "DB_PATH", os.path.join(self._dir.name, "app.db"))
+        self._patch.start()
+        connection.init_db()
+
+    def tearDown(self):
+        self._patch.stop()
+        self._dir.cleanup()
+
+    def test_key_is_normalized_and_includes_model(self):
+        k = pcs.make_key("A  Cat ", "animal", "", "", "role", "qwen-max")
+        self.assertEqual(k, pcs.make_key("a cat", "Animal", "", "", "role", "qwen-max"))
+        self.assertNotEqual(k, pcs.make_key("a cat", "animal", "", "", "role", "qwen-plus"))
+
+    def test_lru_eviction_and_ttl(self):
+        cache = pcs.RefineCache(max_entries=2, ttl_seconds=60, persist=False)
+        for k in ("a", "b"):
+            cache.put(k, VALUE)
+        cache.get("a")
+        cache.put("c", VALUE)  # evicts b, the least recently used
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), VALUE)
+        with mock.patch("time.time", return_value=time.time() + 120):
+            self.assertIsNone(cache.get("a"))
+        s = cache.stats()
+        self.assertEqual((s["evictions"], s["expired"], s["size"]), (1, 1, 1))
+
+    def test_sqlite_tier_survives_a_new_process(self):
+        pcs.RefineCache(persist=True).put("k", VALUE, model="qwen-max")
+        fresh = pcs.RefineCache(persist=True)
+        self.assertEqual(fresh.get("k"), VALUE)
+        self.assertEqual(fresh.get("k"), VALUE)
+        s = fresh.stats()
+        self.assertEqual((s["db_hits"], s["hits"], s["misses"]), (1, 1, 0))
+        expired = pcs.RefineCache(ttl_seconds=1, persist=True)
+        with mock.patch("time.time", return_value=time.time() + 10):
+            self.assertIsNone(expired.get("k"))
+            self.assertEqual(expired.purge_expired(), 1)
+
+    def test_clients_share_cache_and_hits_keep_zh(self):
+        cache = pcs.RefineCache(persist=True)
+        settings = Settings(raw={"models": {"qwen": "qwen-max"}})
+        qwen = {"status": "success", "output": json.dumps({"positive_prompt": "a cat", "negative_prompt": "blurry"})}
+        with mock.patch.object(dcs, "get_refine_cache", return_value=cache), mock.patch("builtins.print"):
+            first, second = DashScopeClient(settings=settings), DashScopeClient(settings=settings)
+            with mock.patch.object(first, "call_qwen", return_value=qwen) as call, \
+                    mock.patch.object(first, "_translate", side_effect=lambda t: {"a cat": "一只猫", "blurry": "模糊"}[t]):
+                self.assertEqual(first.refine_prompt("A cat", "animal", "", "", "r"), VALUE)
+            with mock.patch.object(second, "call_qwen") as call2:
+                self.assertEqual(second.refine_prompt("a cat", "animal", "", "", "r"), VALUE)
+        self.assertEqual(call.call_count, 1)
+        call2.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
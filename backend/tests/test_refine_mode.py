@@ -0,0 +1,69 @@
+"""
+/**
+ * @file backend/tests/test_refine_mode.py
+ * @description 提示词优化方式（bilingual 一次返回中英文 / separate 单独翻译）测试。
+ */
+"""
+
+import json
+import unittest
+from unittest import mock
+
+from backend.config.settings import Settings
+from backend.services import DashScopeClient
+from backend.services import dashscope_client_service as dcs
+from backend.services import prompt_cache_service as pcs
+
+
+def _client(mode):
+    return DashScopeClient(settings=Settings(raw={"parameters": {"refine_mode": mode}}))
+
+
+def _answer(**fields):
+    return {"status": "success", "output": "```json\n" + json.dumps(fields, ensure_ascii=False) + "\n```"}
+
+
+class TestRefineMode(unittest.TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.object(dcs, "get_refine_cache", return_value=pcs.RefineCache(persist=False)),
+            mock.patch("builtins.print"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _run(self, mode, answer, delta=False):
+        c = _client(mode)
+        with mock.patch.object(c, "call_qwen", return_value=answer) as qwen, \
+                mock.patch.object(c, "_translate", side_effect=lambda t: f"译:{t}") as translate:
+            if delta:
+                out = c.refine_prompt_with_delta("base", "animal", "", "", "r")
+            else:
+                out = c.refine_prompt("cat", "animal", "", "", "r")
+        return out, qwen, translate
+
+    def test_bilingual_needs_one_qwen_call(self):
+        answer = _answer(positive_prompt="a cat", negative_prompt="blurry", positive_prompt_zh="一只猫", negative_prompt_zh="模糊")
+        for delta in (False, True):
+            out, qwen, translate = self._run("bilingual", answer, delta=delta)
+            self.assertEqual((out["positive_prompt_zh"], out["negative_prompt_zh"]), ("一只猫", "模糊"))
+            self.assertIn("positive_prompt_zh", qwen.call_args[0][0])
+            translate.assert_not_called()
+
+    def test_bilingual_falls_back_for_missing_fields(self):
+        out, _, translate = self._run("bilingual", _answer(positive_prompt="a cat", negative_prompt="blurry", positive_prompt_zh="一只猫"))
+        self.assertEqual((out["positive_prompt_zh"], out["negative_prompt_zh"]), ("一只猫", "译:blurry"))
+        self.assertEqual(translate.call_count, 1)
+
+    def test_separate_mode_ignores_inline_zh(self):
+        answer = _answer(positive_prompt="a cat", negative_prompt="blurry", positive_prompt_zh="一只猫", negative_prompt_zh="模糊")
+        out, qwen, translate = self._run("separate", answer)
+        self.assertEqual(out["positive_prompt_zh"], "译:a cat")
+        self.assertNotIn("positive_prompt_zh", qwen.call_args[0][0])
+        self.assertEqual(translate.call_count, 2)
+        self.assertEqual(Settings(raw={"parameters": {"refine_mode": "other"}}).refine_mode, "separate")
+
+
+if __name__ == "__main__":
+    unittest.main()
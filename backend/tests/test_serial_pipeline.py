@@ -0,0 +1,112 @@
+"""
+/**
+ * @file backend/tests/test_serial_pipeline.py
+ * @description 提示词继承链的流水线执行测试：每步增量只计算一次，且与图片生成重叠。
+ */
+"""
+
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from backend.config.settings import Settings
+from backend.controllers import generate_controller as gc
+from backend.services import background_task_service as bts
+from backend.services import dashscope_client_service as dsc
+from backend.services import deadline_service as deadlines
+
+SETTINGS = Settings(raw={
+    "prompts": {"default_style": "photo", "default_negative_prompt": "low quality"},
+    "models": {"qwen": "qwen-max"},
+    "parameters": {"enable_prompt_update_request": True, "prompt_delta_ratio": 0.05},
+})
+REFINE_S, GEN_S = 0.1, 0.3
+
+
+class ChainClient:
+    bases = []
+
+    def __init__(self, settings=None):
+        pass
+
+    def refine_prompt_with_delta(self, base_positive, category, default_style, default_negative_prompt, role, change_ratio=0.1):
+        time.sleep(REFINE_S)
+        self.bases.append(base_positive)
+        return {"positive_prompt": base_positive + "+", "negative_prompt": "NEG"}
+
+
+class TestSerialPipeline(unittest.TestCase):
+    def setUp(self):
+        ChainClient.bases = []
+
+    def _tasks(self, count):
+        refined = {"positive_prompt": "P", "negative_prompt": "N"}
+        with mock.patch.object(gc, "load_settings", return_value=SETTINGS), \
+                mock.patch.object(gc.client, "refine_prompt", return_value=refined) as refine, \
+                mock.patch.object(gc.client, "refine_prompt_with_delta") as delta, mock.patch("builtins.print"):
+            tasks = gc._task_generator({"prompt": "BASE", "category": "c", "count": count, "service": "wan"})
+        refine.assert_called_once()
+        delta.assert_not_called()  # left to the chain executor
+        return tasks
+
+    def test_deltas_run_once_and_overlap_generation(self):
+        tasks = self._tasks(4)
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def process(params):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(GEN_S)
+            with lock:
+                running[0] -= 1
+            return {"status": "success", "prompt": params["prompt"]}
+
+        with mock.patch.object(dsc, "DashScopeClient", ChainClient), \
+                mock.patch.object(bts, "_add_record"), mock.patch("builtins.print"):
+            start = time.time()
+            bts._execute_tasks_serial(str(uuid.uuid4()), tasks, process, {"category": "c"}, SETTINGS)
+            elapsed = time.time() - start
+
+        self.assertEqual(ChainClient.bases, ["P", "P+", "P++"])
+        self.assertEqual([t["prompt"] for t in tasks], ["P", "P+", "P++", "P+++"])
+        self.assertTrue(all("chain_pending" not in t for t in tasks))
+        self.assertGreater(peak[0], 1)
+        # lockstep would take 3 * REFINE_S + 4 * GEN_S = 1.5s
+        self.assertLess(elapsed, 3 * REFINE_S + 2 * GEN_S)
+
+    def _run(self, tasks, process, recovered=None):
+        job_id = str(uuid.uuid4())
+        with bts._STATUS_LOCK:
+            bts._TASK_STORE[job_id] = bts.TaskStatus(job_id, "running", len(tasks))
+        with mock.patch.object(dsc, "DashScopeClient", ChainClient), \
+                mock.patch.object(bts, "_add_record"), mock.patch("builtins.print"):
+            bts._execute_tasks_serial(job_id, tasks, process, {"category": "c"}, SETTINGS, recovered=recovered)
+        return bts.get_job_status(job_id)
+
+    def test_recovered_steps_are_kept_and_the_chain_continues_from_them(self):
+        tasks = self._tasks(3)
+        recovered = {
+            0: {"result": {"status": "success", "prompt": "R"}, "params": {"prompt": "R", "refined_positive": "R"}},
+            1: {"result": {"status": "success", "prompt": "R+"}, "params": {"prompt": "R+", "refined_positive": "R+"}},
+        }
+        process = mock.Mock(side_effect=lambda p: {"status": "success", "prompt": p["prompt"]})
+        status = self._run(tasks, process, recovered)
+        self.assertEqual(ChainClient.bases, ["R+"])
+        self.assertEqual([c.args[0]["prompt"] for c in process.call_args_list], ["R++"])
+        self.assertEqual([r["prompt"] for r in status["results"]], ["R", "R+", "R++"])
+
+    def test_deadline_and_cancel_end_steps_as_timeout_and_cancelled(self):
+        for exc, expected in ((deadlines.DeadlineExceeded("refine"), "timeout"), (deadlines.JobCancelled("refine"), "cancelled")):
+            with mock.patch.object(ChainClient, "refine_prompt_with_delta", side_effect=exc):
+                status = self._run(self._tasks(3), lambda p: {"status": "success"})
+            self.assertEqual([r["status"] for r in status["results"]], ["success", expected, expected])
+        status = self._run(self._tasks(2), mock.Mock(side_effect=deadlines.DeadlineExceeded("poll")))
+        self.assertEqual([r["status"] for r in status["results"]], ["timeout", "timeout"])
+        self.assertEqual(status["status"], "timeout")
+
+
+if __name__ == "__main__":
+    unittest.main()
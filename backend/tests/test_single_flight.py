@@ -0,0 +1,191 @@
+"""
+/**
+ * @file backend/tests/test_single_flight.py
+ * @description 相同 Qwen 请求在途合并（single-flight）测试（含等待者按自身截止时间与取消放弃等待）。
+ */
+"""
+
+import json
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from backend.config.settings import Settings
+from backend.services import DashScopeClient
+from backend.services import dashscope_client_service as dcs
+from backend.services import deadline_service as deadlines
+from backend.services import prompt_cache_service as pcs
+from backend.services.single_flight_service import SingleFlight
+from backend.services.translation_service import translate_zh_en
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight("t")
+        calls = []
+        gate = threading.Event()
+
+        def slow():
+            calls.append(1)
+            gate.wait(2)
+            return {"v": 1}
+
+        with ThreadPoolExecutor(5) as pool:
+            futures = [pool.submit(flight.do, "k", slow) for _ in range(5)]
+            time.sleep(0.1)
+            gate.set()
+            results = [f.result() for f in futures]
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"v": 1}] * 5)
+        self.assertEqual(len({id(r) for r in results}), 5)
+        self.assertEqual(flight.stats(), {"in_flight": 0, "leaders": 1, "followers": 4, "errors": 0, "retried": 0, "gave_up": 0})
+        flight.do("k", slow)  # finished flights are not cached
+        self.assertEqual(len(calls), 2)
+
+    def test_leader_error_reaches_followers(self):
+        flight = SingleFlight("t")
+        gate = threading.Event()
+
+        def boom():
+            gate.wait(2)
+            raise RuntimeError("x")
+
+        with ThreadPoolExecutor(3) as pool:
+            futures = [pool.submit(flight.do, "k", boom) for _ in range(3)]
+            time.sleep(0.1)
+            gate.set()
+            for f in futures:
+                with self.assertRaises(RuntimeError):
+                    f.result()
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_followers_retry_when_the_leader_hits_its_own_deadline(self):
+        flight = SingleFlight("t")
+        gate = threading.Event()
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                gate.wait(2)
+                raise deadlines.DeadlineExceeded("refine")
+            time.sleep(0.2)
+            return {"v": 2}
+
+        with ThreadPoolExecutor(3) as pool:
+            leader = pool.submit(flight.do, "k", call, (deadlines.DeadlineExceeded,))
+            time.sleep(0.05)
+            followers = [pool.submit(flight.do, "k", call, (deadlines.DeadlineExceeded,)) for _ in range(2)]
+            time.sleep(0.05)
+            gate.set()
+            with self.assertRaises(deadlines.DeadlineExceeded):
+                leader.result()
+            self.assertEqual([f.result() for f in followers], [{"v": 2}] * 2)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(flight.stats()["retried"], 2)
+
+    def test_follower_stops_waiting_at_its_own_deadline_or_cancel(self):
+        flight = SingleFlight("t")
+        gate = threading.Event()
+
+        def slow():
+            gate.wait(5)
+            return {"v": 1}
+
+        def follow(deadline):
+            token = deadlines.bind(deadline)
+            try:
+                started = time.monotonic()
+                with self.assertRaises(deadlines.DeadlineExceeded) as ctx:
+                    flight.do("k", slow)
+                return ctx.exception, time.monotonic() - started
+            finally:
+                deadlines.unbind(token)
+
+        cancelled = deadlines.JobDeadline(time.time() + 60)
+        with ThreadPoolExecutor(3) as pool:
+            leader = pool.submit(flight.do, "k", slow)
+            time.sleep(0.05)
+            short = pool.submit(follow, deadlines.JobDeadline(time.time() + 0.2))
+            cancel = pool.submit(follow, cancelled)
+            time.sleep(0.05)
+            cancelled.cancel()
+            exc, waited = short.result(timeout=2)
+            self.assertNotIsInstance(exc, deadlines.JobCancelled)
+            self.assertLess(waited, 1)
+            exc, waited = cancel.result(timeout=2)
+            self.assertIsInstance(exc, deadlines.JobCancelled)
+            self.assertLess(waited, 1)
+            self.assertFalse(leader.done())
+            gate.set()
+            self.assertEqual(leader.result(timeout=2), {"v": 1})
+        self.assertEqual(flight.stats()["gave_up"], 2)
+
+
+class TestCoalescedQwenCalls(unittest.TestCase):
+    def _slow_qwen(self, output):
+        calls = []
+
+        def call_qwen(prompt, model=None):
+            calls.append(prompt)
+            time.sleep(0.2)
+            return {"status": "success", "output": output}
+
+        return calls, call_qwen
+
+    def test_refine_prompt_burst_makes_one_qwen_call(self):
+        client = DashScopeClient(settings=Settings(raw={"models": {"qwen": "qwen-max"}}))
+        calls, call_qwen = self._slow_qwen(json.dumps({"positive_prompt": "a cat", "negative_prompt": "blurry"}))
+        cache = pcs.RefineCache(persist=False)
+        with mock.patch.object(dcs, "get_refine_cache", return_value=cache), mock.patch("builtins.print"), \
+                mock.patch.object(client, "call_qwen", side_effect=call_qwen), \
+                mock.patch.object(client, "_translate", side_effect=lambda t: t + "_zh"):
+            with ThreadPoolExecutor(4) as pool:
+                results = list(pool.map(lambda _: client.refine_prompt("cat", "animal", "", "", "r"), range(4)))
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r["positive_prompt_zh"] == "a cat_zh" for r in results))
+
+    def _refine_burst(self, outputs, n=3):
+        client = DashScopeClient(settings=Settings(raw={"models": {"qwen": "qwen-max"}}))
+        calls = []
+
+        def call_qwen(prompt, model=None):
+            calls.append(prompt)
+            time.sleep(0.2)
+            return outputs[min(len(calls), len(outputs)) - 1]
+
+        with mock.patch.object(dcs, "get_refine_cache", return_value=pcs.RefineCache(persist=False)), mock.patch("builtins.print"), \
+                mock.patch.object(client, "call_qwen", side_effect=call_qwen), \
+                mock.patch.object(client, "_translate", side_effect=lambda t: t + "_zh"):
+            with ThreadPoolExecutor(n) as pool:
+                results = list(pool.map(lambda _: client.refine_prompt("cat", "animal", "", "neg", "r"), range(n)))
+        return calls, results
+
+    def test_refine_cut_short_by_leader_deadline_is_not_shared(self):
+        ok = {"status": "success", "output": json.dumps({"positive_prompt": "a cat", "negative_prompt": "blurry"})}
+        calls, results = self._refine_burst([{"status": "timeout", "stage": "refine", "message": "late"}, ok])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(sorted(r["positive_prompt"] for r in results), ["a cat", "a cat", "cat"])
+
+    def test_refine_failure_reaches_every_caller_as_its_own_fallback(self):
+        calls, results = self._refine_burst([{"status": "success", "output": "not json"}])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"positive_prompt": "cat", "negative_prompt": "neg", "positive_prompt_zh": None, "negative_prompt_zh": None}] * 3)
+        self.assertEqual(len({id(r) for r in results}), 3)
+
+    def test_translate_paths_coalesce(self):
+        client = DashScopeClient(settings=Settings(raw={"models": {"qwen": "qwen-max"}}))
+        calls, call_qwen = self._slow_qwen("你好")
+        with mock.patch.object(client, "call_qwen", side_effect=call_qwen):
+            with ThreadPoolExecutor(3) as pool:
+                out = list(pool.map(lambda _: client._translate("hello"), range(3)))
+                zh_en = list(pool.map(lambda _: translate_zh_en("hi", client=client), range(3)))
+        self.assertEqual(out, ["你好"] * 3)
+        self.assertEqual(zh_en, [{"status": "success", "output": "你好"}] * 3)
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
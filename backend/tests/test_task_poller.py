@@ -0,0 +1,119 @@
+"""
+/**
+ * @file backend/tests/test_task_poller.py
+ * @description 集中任务轮询器单元测试（自适应间隔、Retry-After、终态与错误处理）。
+ */
+"""
+
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from backend.services import task_poller_service
+from backend.services.circuit_breaker_service import CircuitBreaker
+from backend.services.task_poller_service import TaskPollError, TaskPollTimeout, TaskPoller, next_poll_delay
+
+# task_id -> list of (status_code, task_status) answered in order; last one repeats
+SCRIPTS = {
+    "ok": [(200, "PENDING"), (200, "RUNNING"), (200, "SUCCEEDED")],
+    "throttled": [(429, None), (200, "SUCCEEDED")],
+    "failed": [(200, "FAILED")],
+    "broken": [(400, None)],
+    "flaky": [(500, None), (503, None), (200, "garbage"), (200, "SUCCEEDED")],
+    "down": [(502, None)],
+    "forever": [(200, "RUNNING")],
+}
+HITS = {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        task_id = self.path.rsplit("/", 1)[-1]
+        script = SCRIPTS[task_id]
+        n = HITS.get(task_id, 0)
+        HITS[task_id] = n + 1
+        code, status = script[min(n, len(script) - 1)]
+        body = json.dumps({"output": {"task_id": task_id, "task_status": status}}).encode()
+        if status == "garbage":
+            body = b"<html>"
+        self.send_response(code)
+        if code == 429:
+            self.send_header("Retry-After", "0.05")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestNextPollDelay(unittest.TestCase):
+    def test_backoff_is_capped(self):
+        delays = [next_poll_delay(i, initial=1.0, maximum=4.0, backoff=2.0, jitter=0) for i in range(6)]
+        self.assertEqual(delays, [1.0, 2.0, 4.0, 4.0, 4.0, 4.0])
+
+    def test_jitter_bounds_and_hint_floor(self):
+        for _ in range(50):
+            d = next_poll_delay(0, initial=1.0, jitter=0.2)
+            self.assertTrue(0.8 <= d <= 1.2)
+        self.assertEqual(next_poll_delay(0, initial=1.0, jitter=0, hint=7.0), 7.0)
+
+
+class TestTaskPoller(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}/tasks/"
+        cls.poller = TaskPoller(initial_interval=0.01, max_interval=0.05, backoff=2.0, jitter=0.1, workers=2)
+        # repeated 5xx open the breaker; keep it private and short so it only delays polls
+        breaker = CircuitBreaker("tasks", window=20, min_calls=20, open_seconds=0.05)
+        cls.breaker_patch = mock.patch.object(task_poller_service, "get_circuit_breaker", return_value=breaker)
+        cls.breaker_patch.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.breaker_patch.stop()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def _track(self, task_id, timeout=None):
+        return self.poller.track(task_id, self.base + task_id, {}, timeout=timeout)
+
+    def test_completes_many_tasks(self):
+        futures = {tid: self._track(tid) for tid in ("ok", "throttled", "failed")}
+        self.assertEqual(futures["ok"].result(timeout=5)["output"]["task_status"], "SUCCEEDED")
+        self.assertEqual(HITS["ok"], 3)
+        self.assertEqual(futures["throttled"].result(timeout=5)["output"]["task_status"], "SUCCEEDED")
+        self.assertEqual(futures["failed"].result(timeout=5)["output"]["task_status"], "FAILED")
+        self.assertGreaterEqual(self.poller.stats()["throttled"], 1)
+
+    def test_http_error_and_timeout(self):
+        with self.assertRaises(TaskPollError) as ctx:
+            self._track("broken").result(timeout=5)
+        self.assertEqual(ctx.exception.code, 400)
+        with self.assertRaises(TaskPollTimeout):
+            self._track("forever", timeout=0.2).result(timeout=5)
+        self.assertEqual(self.poller.stats()["tracked"], 0)
+
+    def test_transient_errors_are_polled_again_until_the_deadline(self):
+        self.assertEqual(self._track("flaky").result(timeout=5)["output"]["task_status"], "SUCCEEDED")
+        self.assertEqual(HITS["flaky"], 4)
+        with self.assertRaises(TaskPollTimeout):
+            self._track("down", timeout=0.2).result(timeout=5)
+        self.assertGreater(HITS["down"], 1)
+        self.assertGreaterEqual(self.poller.stats()["transient_errors"], 4)
+
+    def test_connection_errors_are_polled_again(self):
+        poller = TaskPoller(initial_interval=0.01, max_interval=0.02, jitter=0)
+        with self.assertRaises(TaskPollTimeout):
+            poller.track("gone", "http://127.0.0.1:9/tasks/gone", {}, timeout=0.3).result(timeout=5)
+        self.assertGreater(poller.stats()["transient_errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
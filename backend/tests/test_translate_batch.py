@@ -0,0 +1,76 @@
+"""
+/**
+ * @file backend/tests/test_translate_batch.py
+ * @description 批量翻译（去重、缓存、编号打包）测试。
+ */
+"""
+
+import json
+import re
+import unittest
+from unittest import mock
+
+from fastapi import HTTPException
+
+from backend.config.settings import Settings
+from backend.controllers.translate_controller import translate_batch
+from backend.models.translate_request_model import TranslateBatchRequest
+from backend.services import translation_service as ts
+
+ZH = {"你好": "Hello", "猫": "Cat", "狗": "Dog", "鸟": "Bird"}
+
+
+class FakeClient:
+    def __init__(self, drop=()):
+        self.settings = Settings(raw={"models": {"qwen": "qwen-test"}})
+        self.prompts = []
+        self.drop = set(drop)
+
+    def call_qwen(self, prompt, model=None):
+        self.prompts.append(prompt)
+        match = re.search(r"\{.*\}", prompt, re.S)
+        if match and prompt.startswith("Translate each value"):
+            items = json.loads(match.group(0))
+            return {"status": "success", "output": "```json\n" + json.dumps(
+                {k: ZH[v] for k, v in items.items() if v not in self.drop}) + "\n```"}
+        text = prompt.rsplit('"', 2)[-2]
+        return {"status": "success", "output": ZH[text]}
+
+
+class TestTranslateBatch(unittest.TestCase):
+    def setUp(self):
+        ts._CACHE.clear()
+        self._cfg = mock.patch.object(ts, "_batch_config", return_value={"max_items": 2})
+        self._cfg.start()
+
+    def tearDown(self):
+        self._cfg.stop()
+        ts._CACHE.clear()
+
+    def test_dedupes_packs_and_keeps_input_order(self):
+        client = FakeClient()
+        result = ts.translate_zh_en_batch(["猫", " 狗 ", "", "猫", "鸟"], client=client)
+        self.assertEqual(result["outputs"], ["Cat", "Dog", "", "Cat", "Bird"])
+        self.assertEqual(len(client.prompts), 2)  # 3 unique texts, 2 per call
+        again = ts.translate_zh_en_batch(["鸟", "猫"], client=client)
+        self.assertEqual((again["outputs"], again["cached"]), (["Bird", "Cat"], 2))
+        self.assertEqual(len(client.prompts), 2)
+
+    def test_missing_numbered_answers_fall_back_to_single_calls(self):
+        client = FakeClient(drop={"狗"})
+        result = ts.translate_zh_en_batch(["猫", "狗"], client=client)
+        self.assertEqual(result["outputs"], ["Cat", "Dog"])
+        self.assertTrue(client.prompts[-1].startswith("Translate the following text"))
+        self.assertEqual(ts.translate_zh_en("狗", client=client)["output"], "Dog")
+        self.assertEqual(len(client.prompts), 2)
+
+    def test_controller_propagates_errors(self):
+        failed = {"status": "error", "code": 429, "message": "throttled", "outputs": [None], "failed": [0]}
+        with mock.patch("backend.controllers.translate_controller.translate_zh_en_batch", return_value=failed):
+            with self.assertRaises(HTTPException) as cm:
+                translate_batch(TranslateBatchRequest(texts=["猫"]))
+        self.assertEqual(cm.exception.status_code, 429)
+
+
+if __name__ == "__main__":
+    unittest.main()
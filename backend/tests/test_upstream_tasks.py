@@ -0,0 +1,91 @@
+"""
+/**
+ * @file backend/tests/test_upstream_tasks.py
+ * @description 在途 DashScope 任务持久化与重启恢复测试。
+ */
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from backend.db import connection
+from backend.services import upstream_task_service as ut
+
+
+class _FakeClient:
+    def __init__(self):
+        self.collected = []
+
+    def _collect_task(self, task_id, category="default", prefix="result", resolution=""):
+        self.collected.append((task_id, category, prefix, resolution))
+        return {"status": "success", "url": "u1", "saved_path": "/out/c/a.png",
+                "images": [{"url": "u1", "saved_path": "/out/c/a.png"}, {"url": "u2", "saved_path": "/out/c/b.png"}]}
+
+    def to_data_url_if_local(self, result):
+        return result
+
+
+class TestUpstreamTasks(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._patch = mock.patch.object(connection, "DB_PATH", os.path.join(self._dir.name, "app.db"))
+        self._patch.start()
+        connection.init_db()
+
+    def tearDown(self):
+        self._patch.stop()
+        self._dir.cleanup()
+
+    def _bind(self, job_id, index, **task):
+        context = {"user_id": "u", "prompt": "p", "category": "c", "resolution": "1K", "count": 3}
+        return ut.bind(job_id, index, {"seed": 10, "model": "wan2.6-t2i", "prompt": "P", **task}, context)
+
+    def test_lifecycle_rows(self):
+        ut.remember("t0", prefix="wan", category="c")  # not bound to a job: ignored
+        self.assertEqual(ut._repo.list_all(), [])
+        token = self._bind("job1", 0)
+        try:
+            ut.remember("t1", prefix="wan", category="c", resolution="1K")
+            ut.finish("t1", {"status": "success", "url": "u", "saved_path": "/x.png"})
+            ut.remember("t2", prefix="wan", category="c")
+            ut.finish("t2", {"status": "failed", "message": "boom"})
+        finally:
+            ut.unbind(token)
+        rows = {r["task_id"]: r for r in ut._repo.list_all()}
+        self.assertEqual(rows["t1"]["status"], ut.DOWNLOADED)
+        self.assertEqual((rows["t1"]["job_id"], rows["t1"]["model"], rows["t1"]["resolution"]), ("job1", "wan2.6-t2i", "1K"))
+        self.assertEqual(rows["t2"]["status"], ut.FAILED)
+        ut.forget_job("job1")
+        self.assertEqual(ut._repo.list_all(), [])
+
+    def test_resume_polls_submitted_and_attaches_to_job(self):
+        token = self._bind("job2", 0, n=2, refined_positive="refined")
+        try:
+            ut.remember("t3", prefix="wan", category="c", resolution="1K")
+        finally:
+            ut.unbind(token)
+        token = self._bind("job2", 1, seed=20)
+        try:
+            ut.remember("t4", prefix="wan", category="c")
+            ut.finish("t4", {"status": "success", "url": "u3", "saved_path": "/out/c/c.png"})
+        finally:
+            ut.unbind(token)
+
+        client = _FakeClient()
+        record_service = mock.Mock()
+        with mock.patch("backend.services.record_service.RecordService.instance", return_value=record_service):
+            self.assertEqual(ut.resume_pending(client=client), 3)
+        self.assertEqual(client.collected, [("t3", "c", "wan", "1K")])
+        job_meta, items = record_service.add_record.call_args[0]
+        self.assertEqual(record_service.add_record.call_args[1], {"job_id": "job2"})
+        self.assertEqual(job_meta["refined_positive"], "refined")
+        self.assertEqual(job_meta["user_id"], "u")
+        self.assertEqual([i["seed"] for i in items], [10, 11, 20])
+        self.assertEqual(items[2]["absolute_path"], "/out/c/c.png")
+        self.assertEqual(ut._repo.list_all(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+/**
+ * @file backend/tests/test_wan_batching.py
+ * @description wan 批量生成（parameters.n>1）测试：任务合并、结果拆分与多图保存。
+ */
+"""
+
+import unittest
+from unittest import mock
+
+from backend.config.settings import Settings
+from backend.controllers import generate_controller as gc
+from backend.services import background_task_service as bts
+from backend.services.dashscope_client_service import DashScopeClient
+
+
+def _settings(inherit=False, batch=4):
+    return Settings(raw={
+        "enable_prompt_update_request": inherit,
+        "parameters": {"wan_batch_size": batch},
+        "prompts": {"default_style": "", "default_negative_prompt": "low quality"},
+    })
+
+
+def _context(count, service="wan"):
+    return {"prompt": "P", "category": "c", "negative_prompt": "", "count": count, "service": service, "model": "wan2.6-t2i"}
+
+
+def _refine(prompt, category, default_style, default_negative_prompt, role):
+    return {"positive_prompt": prompt, "negative_prompt": default_negative_prompt}
+
+
+class TestTaskGeneratorBatching(unittest.TestCase):
+    def _tasks(self, settings, context):
+        with mock.patch.object(gc, "load_settings", lambda: settings), mock.patch.object(gc.client, "refine_prompt", _refine):
+            return gc._task_generator(context)
+
+    def test_wan_count_is_split_into_batches(self):
+        tasks = self._tasks(_settings(batch=4), _context(10))
+        self.assertEqual([t.get("n", 1) for t in tasks], [4, 4, 2])
+
+    def test_no_batching_with_inheritance_or_other_services(self):
+        self.assertEqual(len(self._tasks(_settings(batch=4), _context(3, service="z_image"))), 3)
+        self.assertEqual(len(self._tasks(_settings(batch=1), _context(3))), 3)
+        self.assertEqual(_settings(batch=9).wan_batch_size, 4)
+
+
+class TestFanOut(unittest.TestCase):
+    def test_batch_results_become_per_image_entries(self):
+        tasks = [{"seed": 10, "n": 3, "prompt": "p"}, {"seed": 50, "prompt": "q"}]
+        results = [
+            {"status": "success", "url": "a", "images": [{"status": "success", "url": "a"}, {"status": "success", "url": "b"}]},
+            {"status": "success", "url": "c"},
+        ]
+        out_tasks, out_results = bts._fan_out_batches(tasks, results)
+        self.assertEqual([t["seed"] for t in out_tasks], [10, 11, 12, 50])
+        self.assertNotIn("n", out_tasks[0])
+        self.assertEqual([r.get("url") for r in out_results], ["a", "b", None, "c"])
+        self.assertEqual(out_results[2]["status"], "failed")
+
+    def test_failed_batch_fails_every_image(self):
+        out_tasks, out_results = bts._fan_out_batches([{"seed": 1, "n": 2}], [{"status": "error", "message": "x"}])
+        self.assertEqual(len(out_tasks), 2)
+        self.assertEqual([r["status"] for r in out_results], ["error", "error"])
+
+
+class TestClientMultiResult(unittest.TestCase):
+    def test_payload_and_result_urls(self):
+        c = DashScopeClient(settings=Settings(raw={}))
+        with mock.patch("builtins.print"):
+            self.assertEqual(c._build_wan_payload("p", n=3)["parameters"]["n"], 3)
+        output = {"results": [{"url": "u1"}, {"url": "u2"}]}
+        self.assertEqual(c._task_result_urls(output), ["u1", "u2"])
+        data = {"output": {"choices": [{"message": {"content": [{"image": "i1"}, {"image": "i2"}]}}]}}
+        self.assertEqual(c._extract_result_urls(data), ["i1", "i2"])
+
+    def test_save_results_lists_all_images(self):
+        c = DashScopeClient(settings=Settings(raw={}))
+        with mock.patch.object(c, "_download_to_file", side_effect=lambda u, *a, **k: f"/tmp/{u}.png"):
+            r = c._save_results(["u1", "u2"], "c", "wan", task_id="t")
+            single = c._save_results(["u1"], "c", "wan")
+        self.assertEqual(r["saved_path"], "/tmp/u1.png")
+        self.assertEqual([i["saved_path"] for i in r["images"]], ["/tmp/u1.png", "/tmp/u2.png"])
+        self.assertEqual(r["task_id"], "t")
+        self.assertNotIn("images", single)
+
+
+if __name__ == "__main__":
+    unittest.main()
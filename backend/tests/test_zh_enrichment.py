@@ -0,0 +1,130 @@
+"""
+/**
+ * @file backend/tests/test_zh_enrichment.py
+ * @description 中文翻译后台补全与历史回填测试。
+ */
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from backend.config.settings import Settings
+from backend.db import connection
+from backend.services import DashScopeClient
+from backend.services import dashscope_client_service as dcs
+from backend.services import prompt_cache_service as pcs
+from backend.services import zh_enrichment_service as zes
+from backend.services.db_service import DBService
+from backend.services.ingest_service import IngestService
+
+ZH = {"a cat": "一只猫", "blurry": "模糊", "a dog": "一只狗"}
+
+
+class FakeClient:
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+        self._lock = threading.Lock()
+
+    def _translate(self, text):
+        if self.gate is not None:
+            self.gate.wait(5)
+        with self._lock:
+            self.calls.append(text)
+        return ZH[text]
+
+
+class TestZhEnrichment(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._patch = mock.patch.object(connection, "DB_PATH", os.path.join(self._dir.name, "app.db"))
+        self._patch.start()
+        connection.init_db()
+        self.raw = mock.Mock()
+        self._records = mock.patch("backend.services.record_service.RecordService.instance", return_value=self.raw)
+        self._records.start()
+        self.db = DBService()
+
+    def tearDown(self):
+        self._records.stop()
+        self._patch.stop()
+        self._dir.cleanup()
+
+    def _record(self, job_id, pos="a cat", neg="blurry", content_hash=None):
+        return self.db.create_record({
+            "job_id": job_id, "user_id": "u", "session_id": "s", "created_at": "t",
+            "base_prompt": "p", "category_prompt": "c", "refined_positive": pos, "refined_negative": neg,
+            "status": "completed", "item_count": 0, "content_hash": content_hash or f"h-{job_id}",
+        })
+
+    def test_pairs_are_translated_once_and_memoized(self):
+        gate = threading.Event()
+        client = FakeClient(gate)
+        svc = zes.ZhEnrichmentService(concurrency=2, client=client)
+        seen = []
+        for _ in range(3):
+            svc.translate_later("a cat", "blurry", on_done=lambda p, n: seen.append((p, n)))
+        gate.set()
+        svc._executor.shutdown(wait=True)
+        self.assertEqual(client.calls, ["a cat", "blurry"])
+        self.assertEqual(seen, [("一只猫", "模糊")] * 3)
+        self.assertEqual(svc.lookup("a cat", "blurry"), ("一只猫", "模糊"))
+
+    def test_backfill_job_fills_record_and_appends_supplement(self):
+        rec = self._record("job-1")
+        svc = zes.ZhEnrichmentService(client=FakeClient())
+        svc.backfill_job("job-1", "a cat", "blurry")
+        svc._executor.shutdown(wait=True)
+        row = self.db.records.get(rec["id"])
+        self.assertEqual((row["positive_zh"], row["negative_zh"]), ("一只猫", "模糊"))
+        line = self.raw.append_raw.call_args[0][0]
+        self.assertEqual(line["类型"], zes.SUPPLEMENT_TYPE)
+        self.assertEqual((line["job_id"], line["原记录哈希"]), ("job-1", "h-job-1"))
+
+    def test_backfill_history_dedupes_pairs_across_records(self):
+        for i in range(3):
+            self._record(f"job-{i}")
+        self._record("job-dog", pos="a dog")
+        client = FakeClient()
+        summary = zes.ZhEnrichmentService(concurrency=2, client=client).backfill_history(batch_size=2)
+        self.assertEqual(summary, {"scanned": 4, "updated": 4})
+        self.assertEqual(sorted(client.calls), ["a cat", "a dog", "blurry", "blurry"])
+        self.assertEqual(self.db.records.missing_zh(10), [])
+
+    def test_refine_defers_translation_and_patches_cache(self):
+        svc = zes.ZhEnrichmentService(client=FakeClient())
+        cache = pcs.RefineCache(persist=False)
+        settings = Settings(raw={"models": {"qwen": "qwen-max"}, "zh_enrichment": {"enabled": True}})
+        qwen = {"status": "success", "output": json.dumps({"positive_prompt": "a cat", "negative_prompt": "blurry"})}
+        client = DashScopeClient(settings=settings)
+        with mock.patch.object(dcs, "get_refine_cache", return_value=cache), \
+                mock.patch.object(dcs, "get_zh_enrichment", return_value=svc), \
+                mock.patch.object(client, "call_qwen", return_value=qwen), \
+                mock.patch.object(client, "_translate") as translate, mock.patch("builtins.print"):
+            refined = client.refine_prompt("a cat", "animal", "", "", "r")
+            svc._executor.shutdown(wait=True)
+        translate.assert_not_called()
+        self.assertIsNone(refined["positive_prompt_zh"])
+        key = pcs.make_key("a cat", "animal", "", "", "r", "qwen-max")
+        self.assertEqual(cache.get(key)["negative_prompt_zh"], "模糊")
+
+    def test_ingest_applies_supplement_lines(self):
+        entry = {"用户ID": "u", "SessionID": "s", "创建时间": "t", "通用基础提示词": "p", "分类描述提示词": "c",
+                 "优化后正向提示词": "a cat", "优化后反向提示词": "blurry", "生成记录": []}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        import hashlib
+        supplement = zes.supplement_line("job-x", hashlib.sha256(line.encode("utf-8")).hexdigest(), "一只猫", "模糊")
+        path = os.path.join(self._dir.name, "day.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(line + json.dumps(supplement, ensure_ascii=False) + "\n")
+        result = IngestService().ingest_file(path)
+        self.assertEqual((result["inserted"], result["zh_supplements"]), (1, 1))
+        self.assertEqual(self.db.records.missing_zh(10), [])
+
+
+if __name__ == "__main__":
+    unittest.main()